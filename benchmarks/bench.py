@@ -0,0 +1,202 @@
+'''
+Benchmark jalur panas perhitungan: tabel komutasi, valuasi satu peserta, akumulasi nilai akhir,
+penyiapan data grafik, valuasi portofolio berskala dan proyeksi dana.
+
+Dijalankan tanpa Streamlit dari akar repositori:
+
+    python -m benchmarks.bench --output bench.json
+    python -m benchmarks.bench --quick --compare bench.json
+
+Hasil disimpan sebagai JSON (waktu minimum, median dan rata-rata per kasus) agar dapat
+dibandingkan antar-commit.
+'''
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from danapensiun import charts, commutation, portfolio, projection, sensitivity, streaming, valuation
+from danapensiun.mortality import GENDERS, mortality_table
+
+BENCH_RATES = (Decimal('0'), Decimal('0.04'), Decimal('0.15'))
+PORTFOLIO_SIZES = (1_000, 10_000, 100_000)
+
+
+def _timeit(func, repeat):
+    '''Menjalankan func sekali sebagai pemanasan lalu `repeat` kali; mengembalikan daftar durasi (detik).'''
+    func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _record(results, name, params, durations, calls=1):
+    results.append({
+        'name': name,
+        'params': params,
+        'repeat': len(durations),
+        'calls': calls,
+        'min_s': min(durations),
+        'median_s': statistics.median(durations),
+        'mean_s': statistics.fmean(durations),
+    })
+    print(f"{name:<32} {json.dumps(params):<60} median {statistics.median(durations) * 1000:10.3f} ms", file=sys.stderr)
+
+
+def bench_commutation(results, repeat):
+    commutation.default_commutation_cube()
+    # Seluruh grid slider: tepat di grid (potongan kubus) dan bergeser 0,05 bp (dihitung ulang)
+    grid = [k / 1000 for k in range(commutation.CUBE_RATE_STEPS)]
+    off_grid = [rate + 5e-6 for rate in grid]
+    for gender in GENDERS:
+        df_raw = mortality_table(gender)
+        for i in BENCH_RATES:
+            params = {'gender': gender, 'i': str(i)}
+            _record(results, 'commutation.build', params,
+                    _timeit(lambda: commutation.build_commutation_table(df_raw, i), repeat))
+            _record(results, 'commutation.build_decimal', params,
+                    _timeit(lambda: commutation.build_decimal_commutation_table(df_raw, i), repeat))
+        _record(results, 'commutation.matrix', {'gender': gender, 'rates': len(grid), 'source': 'cube'},
+                _timeit(lambda: commutation.commutation_matrix(gender, grid), repeat))
+        _record(results, 'commutation.matrix', {'gender': gender, 'rates': len(grid), 'source': 'computed'},
+                _timeit(lambda: commutation.commutation_matrix(gender, off_grid), repeat))
+
+
+def bench_single_member(results, repeat, stride):
+    '''Valuasi per unit manfaat untuk seluruh kombinasi (e, x, r) yang valid di sidebar.'''
+    i = Decimal('0.04')
+    comm_table = commutation.commutation_table('Laki-Laki', i)
+    combos = [
+        (e, x, r)
+        for r in range(55, 66)
+        for e in range(18, min(60, r - 1) + 1, stride)
+        for x in range(e, r, stride)
+    ]
+
+    Dx, Nx = commutation.commutation_matrix('Laki-Laki', (i,))
+
+    def run_all():
+        for e, x, r in combos:
+            valuation.calculate_unit_benefit_values(comm_table, e, x, r, i)
+
+    def run_all_float():
+        for e, x, r in combos:
+            valuation.calculate_unit_benefit_values_float(Dx[0], Nx[0], e, x, r, i)
+
+    _record(results, 'valuation.single_member_range', {'combos': len(combos), 'stride': stride},
+            _timeit(run_all, max(1, repeat // 5)), calls=len(combos))
+    _record(results, 'valuation.single_member_range_float', {'combos': len(combos), 'stride': stride},
+            _timeit(run_all_float, max(1, repeat // 5)), calls=len(combos))
+
+    _record(results, 'valuation.single_member', {'e': 30, 'x': 40, 'r': 65},
+            _timeit(lambda: valuation.calculate_actuarial_values_excel_logic(
+                comm_table, 30, 40, 65, i, Decimal('0.025'), Decimal(36_000_000), Decimal('0.04')), repeat))
+
+
+def bench_accumulation_and_charts(results, repeat):
+    i = Decimal('0.04')
+    _, df_actuarial_full = valuation.value_member('Laki-Laki', 18, 40, 65, i, Decimal('0.025'), Decimal(36_000_000), Decimal('0.04'))
+    params = {'rows': len(df_actuarial_full)}
+    _record(results, 'valuation.accumulate_final_values', params,
+            _timeit(lambda: valuation.accumulate_final_values(df_actuarial_full, 65, i), repeat))
+    _record(results, 'charts.chart_data', params,
+            _timeit(lambda: charts.chart_data(df_actuarial_full), repeat))
+
+
+def bench_portfolio(results, repeat, sizes):
+    i, k, s = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+    comm_laki = commutation.commutation_table('Laki-Laki', i)
+    comm_perempuan = commutation.commutation_table('Perempuan', i)
+    for n in sizes:
+        members = portfolio.synthetic_members(n)
+        validated, _ = portfolio.validate_members(members, 65)
+        _record(results, 'portfolio.validate', {'members': n},
+                _timeit(lambda: portfolio.validate_members(members, 65), repeat))
+        _record(results, 'portfolio.value', {'members': n},
+                _timeit(lambda: portfolio.calculate_portfolio_values(validated, comm_laki, comm_perempuan, i, k, s), repeat))
+        if n == max(sizes):
+            _record(results, 'portfolio.value', {'members': n, 'workers': os.cpu_count()},
+                    _timeit(lambda: portfolio.calculate_portfolio_values(validated, comm_laki, comm_perempuan, i, k, s, workers=None), repeat))
+            csv_text = members.to_csv(index=False)
+            _record(results, 'streaming.stream_portfolio', {'members': n, 'chunk_size': streaming.STREAM_CHUNK_SIZE // 10},
+                    _timeit(lambda: streaming.stream_portfolio(io.StringIO(csv_text), 65, i, k, s, chunk_size=streaming.STREAM_CHUNK_SIZE // 10), max(1, repeat // 5)))
+        valued, _ = portfolio.calculate_portfolio_values(validated, comm_laki, comm_perempuan, i, k, s)
+        _record(results, 'sensitivity.rate_sensitivities', {'members': n},
+                _timeit(lambda: sensitivity.rate_sensitivities(valued, valued['Manfaat Pensiun (Br)'], i), repeat))
+
+
+def bench_projection(results, repeat, sizes, years=60):
+    i, k, s = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+    for n in sizes:
+        validated, _ = portfolio.validate_members(portfolio.synthetic_members(n), 65)
+        _record(results, 'projection.project_fund', {'members': n, 'years': years},
+                _timeit(lambda: projection.project_fund(validated, i, k, s, years=years), max(1, repeat // 5)))
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    '''Mencetak rasio median terhadap hasil benchmark sebelumnya (< 1 berarti lebih cepat).'''
+    baseline = json.loads(Path(baseline_path).read_text())
+    old = {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in baseline['results']}
+    print(f"\nPerbandingan terhadap {baseline_path} ({baseline.get('git_revision')}):", file=sys.stderr)
+    for r in current['results']:
+        prev = old.get((r['name'], json.dumps(r['params'], sort_keys=True)))
+        if prev:
+            print(f"{r['name']:<32} {json.dumps(r['params']):<60} x{r['median_s'] / prev['median_s']:.2f}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark jalur panas perhitungan dana pensiun.")
+    parser.add_argument('--output', help="File JSON hasil; default stdout.")
+    parser.add_argument('--repeat', type=int, default=10, help="Jumlah pengulangan per kasus. Default 10.")
+    parser.add_argument('--quick', action='store_true', help="Rentang (e, x) dijarangkan dan portofolio maksimal 10k peserta.")
+    parser.add_argument('--compare', help="File JSON benchmark sebelumnya untuk dibandingkan.")
+    args = parser.parse_args(argv)
+
+    results = []
+    bench_commutation(results, args.repeat)
+    bench_single_member(results, args.repeat, stride=5 if args.quick else 1)
+    bench_accumulation_and_charts(results, args.repeat)
+    bench_portfolio(results, args.repeat, PORTFOLIO_SIZES[:2] if args.quick else PORTFOLIO_SIZES)
+    bench_projection(results, args.repeat, PORTFOLIO_SIZES[:2] if args.quick else PORTFOLIO_SIZES)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        sys.stdout.write(text)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,17 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+import functools
+import hashlib
 import io
+import os
 import sys
 import numpy as np 
 from decimal import Decimal
 
+from danapensiun import cache, charts, commutation, depgraph, formulas, mortality, portfolio, profiling, projection, rollforward, sensitivity, solver, stochastic, tables, valuation
+from danapensiun.profiling import stage
+
 
 # --- Konfigurasi Halaman ---
 st.set_page_config(layout="wide", page_title="Kalkulator Dana Pensiun Aktuaria", initial_sidebar_state="expanded")
@@ -20,6 +26,8 @@ if "widget_gender" not in st.session_state:
     st.session_state.widget_interest_rate = 4.0
     st.session_state.widget_benefit_prop = 2.5
     st.session_state.widget_salary_increase = 4.0
+    st.session_state.widget_backend = "float"
+    st.session_state.widget_mortality_table = mortality.DEFAULT_TABLE_ID
 
 # --- Fungsi Reset ---
 def reset_defaults():
@@ -32,459 +40,134 @@ def reset_defaults():
     st.session_state.widget_interest_rate = 4.0
     st.session_state.widget_benefit_prop = 2.5
     st.session_state.widget_salary_increase = 4.0
+    st.session_state.widget_backend = "float"
+    st.session_state.widget_mortality_table = mortality.DEFAULT_TABLE_ID
     if st.session_state.widget_valuation_age < st.session_state.widget_entry_age:
          st.session_state.widget_valuation_age = st.session_state.widget_entry_age
 
+# Jumlah catatan profil tahap yang disimpan per sesi untuk diunduh
+PROFILE_LOG_LIMIT = 500
+# Hasil valuasi file peserta yang disimpan (seluruh sesi) dan umurnya dalam detik
+PORTFOLIO_CACHE_ENTRIES = 4
+PORTFOLIO_CACHE_TTL = 3600
+# Widget unggah file (nilainya tidak dapat diatur lewat session_state)
+UPLOAD_WIDGET_KEYS = ("widget_member_file", "widget_rollforward_start", "widget_rollforward_end")
+# Format tabel durasi, konveksitas dan PV01 (format printf konfigurasi kolom grid)
+RATE_SENSITIVITY_FORMAT = {'Nilai': tables.CURRENCY_FORMAT, 'Durasi Modifikasi': '%,.4f', 'Konveksitas': '%,.4f', 'PV01': tables.CURRENCY_FORMAT}
+# Tabel dengan baris lebih banyak dari ini dimuat bertahap dari server saat digulir (lazy)
+LAZY_GRID_ROWS = 10_000
+# Jumlah lintasan simulasi stokastik yang disimpan di sesi untuk histogram
+STOCHASTIC_SAMPLE_SIZE = 5000
+
 # --- 2. FUNGSI MEMUAT DATA ---
 @st.cache_data
-def load_mortality_data():
-    """Memuat data TMI 2023 untuk Laki-laki dan Perempuan dari string."""
- 
-    # Data TMI 2023 Laki-Laki (x, qx)
-    data_laki_str = """x,qx
-0,0.00979
-1,0.00253
-2,0.00108
-3,0.0007
-4,0.0006
-5,0.00058
-6,0.00057
-7,0.00057
-8,0.00055
-9,0.00052
-10,0.00051
-11,0.0005
-12,0.00052
-13,0.00054
-14,0.00058
-15,0.00062
-16,0.00066
-17,0.0007
-18,0.00073
-19,0.00078
-20,0.00082
-21,0.00087
-22,0.00091
-23,0.00097
-24,0.00102
-25,0.00108
-26,0.00113
-27,0.0012
-28,0.00126
-29,0.00133
-30,0.00139
-31,0.00147
-32,0.00155
-33,0.00163
-34,0.00173
-35,0.00185
-36,0.00198
-37,0.00212
-38,0.00228
-39,0.00247
-40,0.00268
-41,0.00291
-42,0.00317
-43,0.00348
-44,0.00382
-45,0.00418
-46,0.00459
-47,0.00506
-48,0.00561
-49,0.00622
-50,0.00693
-51,0.00774
-52,0.00863
-53,0.00953
-54,0.01046
-55,0.0114
-56,0.01236
-57,0.01332
-58,0.01431
-59,0.01541
-60,0.0166
-61,0.01787
-62,0.0192
-63,0.02059
-64,0.02196
-65,0.02327
-66,0.02457
-67,0.0259
-68,0.02728
-69,0.02873
-70,0.0303
-71,0.032
-72,0.03376
-73,0.03546
-74,0.0371
-75,0.03871
-76,0.04032
-77,0.04193
-78,0.04367
-79,0.04568
-80,0.04811
-81,0.05106
-82,0.05464
-83,0.0589
-84,0.06387
-85,0.06953
-86,0.07592
-87,0.0831
-88,0.09118
-89,0.1003
-90,0.11059
-91,0.1222
-92,0.13522
-93,0.14971
-94,0.1657
-95,0.18317
-96,0.20208
-97,0.22241
-98,0.24408
-99,0.26701
-100,0.29112
-101,0.3163
-102,0.34242
-103,0.36936
-104,0.39697
-105,0.42507
-106,0.45349
-107,0.48203
-108,0.51049
-109,0.53865
-110,0.56627
-111,1.0"""
-
-    # Data TMI 2023 Perempuan (x, qx)
-    data_perempuan_str = """x,qx
-0,0.00788
-1,0.0021
-2,0.0009
-3,0.00058
-4,0.00049
-5,0.00047
-6,0.00047
-7,0.00047
-8,0.00045
-9,0.00044
-10,0.00043
-11,0.00044
-12,0.00045
-13,0.00047
-14,0.0005
-15,0.00053
-16,0.00056
-17,0.00059
-18,0.00063
-19,0.00067
-20,0.00072
-21,0.00077
-22,0.00082
-23,0.00087
-24,0.00092
-25,0.00097
-26,0.00102
-27,0.00107
-28,0.00113
-29,0.00118
-30,0.00123
-31,0.00129
-32,0.00135
-33,0.00142
-34,0.00149
-35,0.00158
-36,0.00168
-37,0.00179
-38,0.00192
-39,0.00206
-40,0.00223
-41,0.00242
-42,0.00263
-43,0.00288
-44,0.00316
-45,0.00346
-46,0.00379
-47,0.00418
-48,0.00461
-49,0.00508
-50,0.0056
-51,0.00618
-52,0.0068
-53,0.00741
-54,0.00804
-55,0.00871
-56,0.0094
-57,0.01008
-58,0.01078
-59,0.01152
-60,0.01231
-61,0.0131
-62,0.0139
-63,0.01471
-64,0.0155
-65,0.01623
-66,0.01695
-67,0.0177
-68,0.01847
-69,0.01926
-70,0.02012
-71,0.02107
-72,0.02208
-73,0.02311
-74,0.02416
-75,0.02527
-76,0.02643
-77,0.02766
-78,0.02902
-79,0.03062
-80,0.03251
-81,0.0347
-82,0.0372
-83,0.03999
-84,0.04304
-85,0.0464
-86,0.05013
-87,0.05437
-88,0.05927
-89,0.06502
-90,0.07182
-91,0.07987
-92,0.08933
-93,0.10035
-94,0.11302
-95,0.1274
-96,0.1435
-97,0.16135
-98,0.18096
-99,0.20235
-100,0.22557
-101,0.25065
-102,0.27761
-103,0.30649
-104,0.33727
-105,0.36994
-106,0.40447
-107,0.44081
-108,0.47886
-109,0.51853
-110,0.55968
-111,1.0"""
-
+def load_mortality_data(table_id):
+    """Memuat data qx Laki-laki dan Perempuan dari registri tabel mortalita (file .npy di-memory-map)."""
     try:
-        df_laki = pd.read_csv(io.StringIO(data_laki_str))
-        df_perempuan = pd.read_csv(io.StringIO(data_perempuan_str))
-        
-        df_laki['qx'] = df_laki['qx'].clip(upper=1.0)
-        df_perempuan['qx'] = df_perempuan['qx'].clip(upper=1.0)
-
-        return df_laki, df_perempuan
+        return mortality.load_mortality_data(table_id)
     except Exception as e:
-        st.error(f"Terjadi kesalahan internal saat membaca data TMI: {e}")
+        st.error(f"Terjadi kesalahan saat membaca tabel mortalita {table_id}: {e}")
         return None, None
 
 # --- 3. FUNGSI PERHITUNGAN ---
-@st.cache_data
-def build_commutation_table(df_raw_mortality, i, l0=100000):
-    '''Membangun tabel komutasi (lx, Dx, Nx) dari data qx TMI. Menggunakan Decimal untuk presisi.'''
-    if df_raw_mortality is None or 'qx' not in df_raw_mortality.columns:
-        return pd.DataFrame() 
-
-    df = df_raw_mortality.copy().set_index('x')
-    df['px'] = 1 - df['qx']
-    
-    df['lx'] = 0.0
-    df.loc[0, 'lx'] = float(l0)
-    for x in range(1, len(df)):
-        prev_x = df.index[x-1]
-        curr_x = df.index[x]
-        if prev_x in df.index and curr_x in df.index:
-             df.loc[curr_x, 'lx'] = df.loc[prev_x, 'lx'] * df.loc[prev_x, 'px']
-            
-    v = Decimal(1) / (Decimal(1) + i)
-    
-    df['v^x'] = df.index.map(lambda x_val: v ** x_val)
-    df['Dx'] = df['lx'].apply(Decimal) * df['v^x']
-    
-    df['Nx'] = Decimal(0)
-    last_age = df.index.max()
-    if last_age in df.index:
-        df.loc[last_age, 'Nx'] = df.loc[last_age, 'Dx']
-        for x in range(last_age - 1, -1, -1):
-            if x in df.index and (x + 1) in df.index:
-                df.loc[x, 'Nx'] = df.loc[x + 1, 'Nx'] + df.loc[x, 'Dx']
-        
-    return df.reset_index()
-
-@st.cache_data
-def calculate_actuarial_values_excel_logic(comm_table, x_entry, x_now, r, i, k, gaji_masuk, s):
-    '''
-    Menghitung nilai aktuaria dengan LOGIKA YANG BENAR untuk EAN (Basis Usia Masuk e).
-    '''
-    if comm_table is None or comm_table.empty:
-         return {}, pd.DataFrame() 
-
-    # --- 1. Mapping Data Komutasi ---
-    D = comm_table.set_index('x')['Dx'].to_dict()
-    N = comm_table.set_index('x')['Nx'].to_dict()
-    
-    def get_D(x): return D.get(x, Decimal(0))
-    def get_N(x): return N.get(x, Decimal(0))
-    
-    metrics = {}
-    actuarial_data = []
-    
-    # --- 2. Parameter Kunci (e dan r) ---
-    D_entry = get_D(x_entry)  # De
-    N_entry = get_N(x_entry)  # Ne
-    D_r = get_D(r)            # Dr
-    N_r = get_N(r)            # Nr
-
-    # --- 3. Hitung PVFB Awal (PVFB_e) ---
-    # S_{r-1} = S_e * (1+s)^(r-e-1)
-    Sr_minus_1 = ((Decimal(1) + s)**(r - x_entry - 1)) * gaji_masuk
-    metrics['Sr_minus_1'] = Sr_minus_1
-    
-    # B_r = k * (r - e) * S_{r-1}
-    B_r = k * Decimal(r - x_entry) * Sr_minus_1
-    metrics['B_r'] = B_r
-    
-    # PVFB_e = Br * (Dr / De)
-    if D_entry > 0:
-        PVFB_at_entry = B_r * (D_r / D_entry)
-    else:
-        PVFB_at_entry = Decimal(0)
-        
-    metrics['PVFB_entry_AAN'] = PVFB_at_entry 
-
-    # --- 4. HITUNG NC EAN (PERBAIKAN UTAMA: PAKAI De) ---
-    # Rumus Draf Eq (14): NC = PVFB_e * (De / (Ne - Nr))
-    # Pembagi (Anuitas di usia e) = (Ne - Nr) / De
-    
-    pembilang_annuitas = N_entry - N_r
-    
-    if D_entry > 0 and pembilang_annuitas != 0:
-        # Ini bentuk lain dari PVFB_e / a_ddot_e
-        # Sama dengan: PVFB_e * (De / (Ne - Nr))
-        NC_EAN_FIXED = PVFB_at_entry * (D_entry / pembilang_annuitas)
+# Inti perhitungan ada di paket `danapensiun` (dapat dipakai tanpa Streamlit) dan di-cache di sana
+# dengan kunci kecil (id tabel, gender, suku bunga dalam bp, e, x, r, ...), bukan dengan DataFrame.
+@st.cache_data(show_spinner="Menilai peserta...", max_entries=PORTFOLIO_CACHE_ENTRIES, ttl=PORTFOLIO_CACHE_TTL)
+def value_member_file(file_digest, file_name, _file_bytes, r_default, i, k, s, table_id, _workers=1):
+    """
+    Valuasi file peserta beserta sensitivitas suku bunga totalnya. Kunci cache adalah digest isi
+    file dan asumsi; isi file (_file_bytes) tidak di-hash Streamlit. Jumlah proses (_workers) juga
+    bukan bagian kunci karena hasilnya identik.
+    """
+    buffer = io.BytesIO(_file_bytes)
+    buffer.name = file_name
+    df_members_raw = portfolio.read_member_file(buffer)
+    hasil, totals, ditolak = portfolio.value_portfolio(df_members_raw, r_default, i, k, s, table_id, _workers)
+    rate_sens = sensitivity.rate_sensitivities(hasil, hasil['Manfaat Pensiun (Br)'], i, table_id) if not hasil.empty else None
+    return hasil, totals, ditolak, rate_sens
+
+@st.cache_data(show_spinner="Menghitung roll-forward...", max_entries=PORTFOLIO_CACHE_ENTRIES, ttl=PORTFOLIO_CACHE_TTL)
+def roll_forward_files(digest_awal, name_awal, _bytes_awal, digest_akhir, name_akhir, _bytes_akhir, r_default, i, k, s, i_akhir, table_id):
+    """Roll-forward antara dua file snapshot peserta; kunci cache adalah digest kedua file dan asumsi."""
+    snapshots = []
+    for file_name, file_bytes in ((name_awal, _bytes_awal), (name_akhir, _bytes_akhir)):
+        buffer = io.BytesIO(file_bytes)
+        buffer.name = file_name
+        df_valid, alasan = portfolio.validate_members(portfolio.read_member_file(buffer), r_default)
+        snapshots.append((df_valid[alasan == ''].reset_index(drop=True), int((alasan != '').sum())))
+    (df_awal, ditolak_awal), (df_akhir, ditolak_akhir) = snapshots
+    ringkasan, per_peserta = rollforward.roll_forward(df_awal, df_akhir, i, k, s, i_akhir, table_id)
+    return ringkasan, per_peserta, ditolak_awal, ditolak_akhir
+
+def store_upload(widget_key, state_key):
+    """
+    Menyimpan isi file unggahan (nama, bytes, digest) di sesi saat pengguna mengunggah atau membuang
+    file. Widget unggah di tab yang tidak dibuka tidak dirender sehingga isinya hilang; salinan di
+    sesi tetap ada sampai dihapus.
+    """
+    uploaded = st.session_state.get(widget_key)
+    if uploaded is None:
+        st.session_state.pop(state_key, None)
     else:
-        NC_EAN_FIXED = Decimal(0)
-
-    # --- 5. LOOP PERHITUNGAN TAHUNAN ---
-
-    for x_loop in range(x_entry, r):
-        D_x = get_D(x_loop)
-        N_x = get_N(x_loop)
-        # Variabel Dinamis Tahun Berjalan
-        if D_x > 0:
-            PVFB_x = B_r * (D_r / D_x)
-            anuitas_x_term = (N_x - N_r) / D_x # a_ddot_{x:r-x|}
-        else:
-            PVFB_x = Decimal(0)
-            anuitas_x_term = Decimal(0)
-
-        # ==========================================
-        # METODE EAN (Entry Age Normal)
-        # ==========================================
-        nc_ean_x = NC_EAN_FIXED 
-        al_ean_x = PVFB_x - (nc_ean_x * anuitas_x_term)
-
-        # ==========================================
-        # METODE AAN (Attained Age Normal)
-        # ==========================================
-        if anuitas_x_term > 0:
-            nc_aan_x = PVFB_at_entry / anuitas_x_term
-        else:
-            nc_aan_x = Decimal(0)
-        al_aan_x = PVFB_x - (nc_aan_x * anuitas_x_term)
-
-        # ==========================================
-        # METODE PUC (Projected Unit Credit)
-        # ==========================================
-        # PUC: NC = PVFB_x / (r-e)
-        # AL = ((x-e)/(r-e)) * PVFB_x
-        if r > x_entry:
-            accrual_fraction = Decimal(x_loop - x_entry) / Decimal(r - x_entry)
-            nc_puc_x = PVFB_x / Decimal(r - x_entry)
-            al_puc_x = accrual_fraction * PVFB_x
-        else:
-            accrual_fraction = Decimal(0)
-            nc_puc_x = Decimal(0)
-            al_puc_x = Decimal(0)
-
-        actuarial_data.append({
-            "Usia": x_loop,
-            "Iuran Normal (EAN)": nc_ean_x, 
-            "Iuran Normal (AAN)": nc_aan_x,
-            "Iuran Normal (PUC)": nc_puc_x,
-            "Kewajiban Aktuaria (EAN)": al_ean_x,
-            "Kewajiban Aktuaria (AAN)": al_aan_x,
-            "Kewajiban Aktuaria (PUC)": al_puc_x,
-            "PVFB": PVFB_x
-        })
-
-    df_actuarial_full = pd.DataFrame(actuarial_data)
-    
-    # --- 6. Output Dashboard (Usia Valuasi) ---
-    metrics['PVFB_x_now'] = B_r * (get_D(r) / get_D(x_now)) if get_D(x_now) > 0 else Decimal(0)
-    
-    try:
-        row_now = df_actuarial_full[df_actuarial_full['Usia'] == x_now]
-        if not row_now.empty:
-            metrics['NC_ean_now'] = row_now['Iuran Normal (EAN)'].values[0]
-            metrics['AL_ean_now'] = row_now['Kewajiban Aktuaria (EAN)'].values[0]
-            metrics['AL_aan_now'] = row_now['Kewajiban Aktuaria (AAN)'].values[0]
-            metrics['NC_aan_x_now'] = row_now['Iuran Normal (AAN)'].values[0]
-        else:
-            raise IndexError
-    except IndexError:
-        metrics['NC_ean_now'] = Decimal(0)
-        metrics['AL_ean_now'] = Decimal(0)
-        metrics['AL_aan_now'] = Decimal(0)
-        metrics['NC_aan_x_now'] = Decimal(0)
-
-    # --- 7. Nilai Akhir (Future Value) ---
-    NA_ean = Decimal(0)
-    NA_aan = Decimal(0)
-    
-    if not df_actuarial_full.empty:
-        for index, row in df_actuarial_full.iterrows():
-            umur_iuran = row['Usia']
-            if umur_iuran < r:
-                interest_factor = (Decimal(1) + i)**(r - umur_iuran)
-                NA_ean += row['Iuran Normal (EAN)'] * interest_factor
-                NA_aan += row['Iuran Normal (AAN)'] * interest_factor
-                
-    metrics['NA_ean_total'] = NA_ean
-    metrics['NA_aan_total'] = NA_aan
-
-    # --- 8. Data Formula Visual ---
-    try:
-        row_first = df_actuarial_full.iloc[0]
-        row_last = df_actuarial_full.iloc[-1]
-        x_first = int(row_first['Usia'])
-        
-        metrics['NA_ean_term_first'] = row_first['Iuran Normal (EAN)'] * ((Decimal(1) + i)**(r - x_first))
-        metrics['NA_ean_term_last'] = row_last['Iuran Normal (EAN)'] * ((Decimal(1) + i)**1) 
-        metrics['NA_aan_term_first'] = row_first['Iuran Normal (AAN)'] * ((Decimal(1) + i)**(r - x_first))
-        metrics['NA_aan_term_last'] = row_last['Iuran Normal (AAN)'] * ((Decimal(1) + i)**1)
-        
-        if len(df_actuarial_full) > 1:
-             row_second = df_actuarial_full.iloc[1]
-             x_second = int(row_second['Usia'])
-             metrics['NA_ean_term_second'] = row_second['Iuran Normal (EAN)'] * ((Decimal(1) + i)**(r - x_second))
-             metrics['NA_aan_term_second'] = row_second['Iuran Normal (AAN)'] * ((Decimal(1) + i)**(r - x_second))
-        else:
-            metrics['NA_ean_term_second'] = Decimal(0)
-            metrics['NA_aan_term_second'] = Decimal(0)
-    except:
-        pass 
-
-    return metrics, df_actuarial_full
+        data = uploaded.getvalue()
+        st.session_state[state_key] = (uploaded.name, data, hashlib.blake2b(data, digest_size=16).hexdigest())
+
+def forget_upload(state_key):
+    st.session_state.pop(state_key, None)
+
+def apply_solver_result(variabel, nilai):
+    """
+    Menerapkan hasil solver satu peserta ke input sidebar (dibulatkan ke langkah widget). Tombolnya
+    ada di dalam fragmen, jadi sidebar baru diperbarui setelah rerun seluruh aplikasi (rerun_app).
+    """
+    st.session_state.rerun_app = True
+    if variabel == 'k':
+        st.session_state.widget_benefit_prop = min(max(round(nilai * 100, 1), 0.0), 10.0)
+    elif variabel == 'i':
+        st.session_state.widget_interest_rate = min(max(round(nilai * 100, 1), 0.0), 15.0)
+    elif variabel == 'gaji':
+        st.session_state.widget_initial_salary = max(int(round(nilai)), 1_000_000)
+    elif variabel == 'manfaat':
+        st.session_state.show_target_benefit = True
+        st.session_state.widget_use_target_benefit = "Ya"
+        st.session_state.widget_target_benefit = max(int(round(nilai)), 1_000_000)
 
 # --- 4. UI STREAMLIT ---
 
+# Hanya tab yang dibuka yang dirender, sehingga widget di tab lain tidak ada pada rerun ini dan
+# Streamlit akan membuang nilainya. Menulis ulang nilainya ke session_state mempertahankannya.
+# Widget unggah file tidak dapat ditulis; isinya disimpan terpisah oleh store_upload.
+for widget_key in [key for key in st.session_state if key.startswith("widget_") and key not in UPLOAD_WIDGET_KEYS]:
+    st.session_state[widget_key] = st.session_state[widget_key]
+
+# Profil waktu per tahap untuk rerun ini (lihat expander debug di bawah)
+profiler = profiling.StageProfiler().install()
+
+def record_profile(records):
+    """Menambahkan catatan profil ke log sesi (PROFILE_LOG_LIMIT catatan terakhir) untuk diunduh."""
+    profile_log = st.session_state.setdefault('profile_log', [])
+    profile_log.extend(records)
+    del profile_log[:-PROFILE_LOG_LIMIT]
+
+def profiled_fragment(render):
+    """
+    st.fragment yang juga mencatat profil saat fragmen dijalankan ulang sendiri: profiler rerun
+    penuh sudah ditutup di akhir skrip, jadi tahapnya masuk ke profiler baru yang dicatat ke log sesi.
+    """
+    @functools.wraps(render)
+    def run_fragment():
+        with profiling.fragment(record_profile):
+            render()
+    return st.fragment(run_fragment)
+
+# Tabel mortalita dari registri (data/mortality); tabel yang sudah tidak ada diganti default
+mortality_table_ids = mortality.table_ids()
+if st.session_state.get('widget_mortality_table') not in mortality_table_ids:
+    st.session_state.widget_mortality_table = mortality.DEFAULT_TABLE_ID
+
 # Muat data di awal
-df_laki_raw, df_perempuan_raw = load_mortality_data()
+with stage('mortalitas'):
+    df_laki_raw, df_perempuan_raw = load_mortality_data(st.session_state.widget_mortality_table)
 
 st.title("📊 Dashboard Perhitungan Dana Pensiun")
 st.caption("Dashboard interaktif untuk menghitung nilai-nilai aktuaria program dana pensiun.")
@@ -494,7 +177,10 @@ with st.sidebar:
     st.header("⚙️ Parameter Simulasi")
 
     st.subheader("👤 Data Peserta")
-    jenis_kelamin = st.selectbox("Jenis Kelamin", options=["Perempuan", "Laki-Laki"], key="widget_gender", help="Pilih jenis kelamin peserta sesuai TMI 2023.")
+    st.selectbox(
+        "Tabel Mortalita", options=mortality_table_ids, key="widget_mortality_table", format_func=mortality.table_label,
+        help="Tabel dari registri data/mortality (dan DANAPENSIUN_MORTALITY_PATH). Tabel baru cukup ditambahkan sebagai file manifest JSON dan CSV.")
+    jenis_kelamin = st.selectbox("Jenis Kelamin", options=["Perempuan", "Laki-Laki"], key="widget_gender", help="Pilih jenis kelamin peserta sesuai tabel mortalita.")
 
     col1, col2 = st.columns(2)
     with col1:
@@ -531,7 +217,14 @@ with st.sidebar:
         "Proporsi Gaji (k) %", min_value=0.0, max_value=10.0, step=0.1,
         help="Persentase gaji pokok yang menjadi manfaat pensiun tahunan (misal 2,5% per tahun masa kerja).", key="widget_benefit_prop")
 
+    st.selectbox(
+        "Backend Numerik", options=list(valuation.BACKENDS), key="widget_backend",
+        format_func=lambda b: {"float": "Float64 (cepat)", "decimal": "Decimal (eksak)"}[b],
+        help="Float64 untuk penggunaan interaktif; Decimal sebagai referensi eksak untuk angka yang akan ditandatangani.")
+    st.toggle("Cek Selisih Float64 vs Decimal", value=False, key="widget_backend_check", help="Hitung kedua backend dan tampilkan selisih relatif maksimum untuk parameter saat ini.")
+
     st.button("Reset ke Default", on_click=reset_defaults, use_container_width=True, key="reset_default_btn")
+    st.toggle("Mode Debug (Profil Tahap)", value=False, key="widget_debug_profile", help="Tampilkan waktu, cache hit/miss dan alokasi per tahap perhitungan di bagian bawah halaman.")
 
     current_x_now = st.session_state.get('widget_valuation_age', 40)
     current_r = st.session_state.get('widget_retirement_age', 65)
@@ -582,309 +275,241 @@ with st.sidebar:
     if not valid:
         st.stop()
 
+# Helper function untuk format Rupiah (presisi 2) - UNTUK UI
+def format_rp(val):
+    if not isinstance(val, Decimal):
+        val = Decimal(str(val))
+    # Dibulatkan ke sen lalu + 0 agar -0,00 (sisa pembatalan float) tampil sebagai 0,00
+    val = val.quantize(Decimal('0.01')) + 0
+    # Format: ribuan titik, desimal koma
+    s = f"{val:,.2f}"
+    s = s.replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"Rp {s}"
+
+def data_grid(df, formats=None, styles=None, **kwargs):
+    """
+    st.dataframe dengan format angka per kolom lewat konfigurasi kolom grid (format printf),
+    bukan Styler per sel. formats: {kolom: format} atau satu format untuk semua kolom; kolom
+    Decimal dikonversi ke float64. styles: DataFrame CSS (tables.highlight_styles) untuk tabel
+    kecil. Tabel besar dimuat bertahap dari server saat digulir.
+    """
+    df = tables.display_numbers(df)
+    if isinstance(formats, str):
+        formats = dict.fromkeys(df.columns, formats)
+    column_config = {kolom: st.column_config.NumberColumn(format=fmt) for kolom, fmt in (formats or {}).items()}
+    data = df.style.apply(lambda _: styles, axis=None) if styles is not None else df
+    lazy = styles is None and len(df) > LAZY_GRID_ROWS
+    return st.dataframe(data, column_config=column_config, lazy=lazy, use_container_width=True, **kwargs)
+
 # --- 5. PROSES PERHITUNGAN UTAMA ---
 
-if df_laki_raw is not None and df_perempuan_raw is not None:
+if df_laki_raw is None or df_perempuan_raw is None:
+    st.error("❌ Gagal memuat data mortalitas internal. Perhitungan tidak dapat dilanjutkan.")
+    st.warning("Pastikan manifest dan file data tabel mortalita di data/mortality lengkap dan valid.")
+    st.stop()
+
+# Ambil nilai dari session_state
+jenis_kelamin_state = st.session_state.widget_gender
+x_entry_state = st.session_state.widget_entry_age
+x_now_state = st.session_state.widget_valuation_age
+r_state = st.session_state.widget_retirement_age
+gaji_masuk_state = st.session_state.widget_initial_salary
+i_percent_state = st.session_state.widget_interest_rate
+k_percent_state = st.session_state.widget_benefit_prop
+s_percent_state = st.session_state.widget_salary_increase
+
+# Konversi ke Decimal untuk akurasi
+i_state = Decimal(str(i_percent_state)) / Decimal(100)
+k_state = Decimal(str(k_percent_state)) / Decimal(100)
+s_state = Decimal(str(s_percent_state)) / Decimal(100)
+gaji_masuk_state = Decimal(gaji_masuk_state)
+
+# Cek apakah menggunakan target manfaat pensiun
+use_target_benefit_state = st.session_state.get('widget_use_target_benefit', False)
+target_benefit_state = st.session_state.get('widget_target_benefit', None)
+
+# Jika target manfaat diaktifkan, B_r diambil langsung dari input target (gaji dan k diabaikan)
+if use_target_benefit_state and target_benefit_state is not None and target_benefit_state > 0:
+    target_benefit_active_state = Decimal(target_benefit_state)
+else:
+    target_benefit_active_state = None
+
+table_id_state = st.session_state.widget_mortality_table
+table_label_state = mortality.table_label(table_id_state)
+backend_state = st.session_state.get('widget_backend', 'float')
+
+# Graf dependensi: setiap simpul hanya dihitung jika dibutuhkan tab yang sedang dibuka dan jika
+# input yang memengaruhinya berubah; hasil simpul disimpan di cache bersama yang berbatas memori
+# (DANAPENSIUN_CACHE_MAX_MB). Mengubah Usia Valuasi (x) misalnya tidak menyentuh tabel komutasi
+# maupun manfaat B_r.
+graph = depgraph.DependencyGraph()
+graph.set_inputs(
+    gender=jenis_kelamin_state, e=x_entry_state, x=x_now_state, r=r_state, gaji=gaji_masuk_state,
+    i=i_state, s=s_state, k=k_state, target=target_benefit_active_state, backend=backend_state, table_id=table_id_state)
+
+@graph.node('gender', 'i', 'table_id')
+def comm_table(gender, i, table_id):
+    with stage('komutasi', caches=[commutation.commutation_table]):
+        return commutation.commutation_table(gender, i, table_id)
+
+@graph.node('e', 'r', 'k', 'gaji', 's', 'target')
+def benefit(e, r, k, gaji, s, target):
+    """(B_r, S_{r-1}); dengan target manfaat, B_r = target dan gaji diabaikan."""
+    if target is not None:
+        return target, Decimal(0)
+    return valuation.projected_benefit(e, r, k, gaji, s)
+
+# Jadwal per unit manfaat di-cache per (gender, i, e, r); B_r hanya menskalakannya dan usia
+# valuasi x hanya memilih barisnya, sehingga geser x, k, gaji atau s tidak menghitung ulang jadwal
+@graph.node('gender', 'e', 'r', 'i', 'backend', 'table_id')
+def base_schedule(gender, e, r, i, backend, table_id):
+    with stage('valuasi', caches=[valuation.base_schedule]):
+        return valuation.base_schedule(gender, e, r, i, backend, table_id)
+
+@graph.node('base_schedule', 'benefit')
+def schedule(base_schedule, benefit):
+    """(metrics, df_actuarial_full) untuk manfaat B_r; metrik di usia x ada di member_values."""
+    return base_schedule.scaled(*benefit)
+
+@graph.node('schedule')
+def chart_data(schedule):
+    return charts.chart_data(schedule[1])
+
+@graph.node('schedule', 'x')
+def member_values(schedule, x):
+    """Nilai aktuaria utama di usia valuasi (dibaca dari baris usia x) dan suku nilai akhir."""
+    metrics, df_actuarial_full = schedule
+    values = {name: metrics.get(name, Decimal(0)) for name in (
+        'B_r', 'Sr_minus_1', 'PVFB_entry_AAN',
+        'NA_ean_total', 'NA_aan_total', 'NA_puc_total',
+        'NA_ean_term_first', 'NA_ean_term_second', 'NA_ean_term_last',
+        'NA_aan_term_first', 'NA_aan_term_second', 'NA_aan_term_last',
+        'NA_puc_term_first', 'NA_puc_term_second', 'NA_puc_term_last')}
+    row_columns = {**valuation.AGE_METRIC_COLUMNS, 'NC_puc_now': 'Iuran Normal (PUC)', 'AL_puc_now': 'Kewajiban Aktuaria (PUC)'}
+    values.update(dict.fromkeys(row_columns, Decimal(0)))
+    if not df_actuarial_full.empty:
+        j = x - int(df_actuarial_full['Usia'].iat[0])
+        if 0 <= j < len(df_actuarial_full):
+            row_now = df_actuarial_full.iloc[j]
+            values.update({name: row_now[kolom] for name, kolom in row_columns.items()})
+    return values
+
+@graph.node('comm_table', 'e', 'x', 'r')
+def comm_values(comm_table, e, x, r):
+    """Nilai komutasi di usia masuk, valuasi dan pensiun beserta anuitas untuk tab formula."""
+    if comm_table is None or comm_table.empty:
+        return dict.fromkeys(('Dx_now', 'Nx_now', 'Dx_entry', 'Nx_entry', 'Dx_r', 'Nx_r', 'anuitas_now', 'anuitas_entry', 'anuitas_entry_to_now'), Decimal(0))
+    comm_table_dict_D = comm_table.set_index('x')['Dx'].to_dict()
+    comm_table_dict_N = comm_table.set_index('x')['Nx'].to_dict()
+    values = {
+        'Dx_now': comm_table_dict_D.get(x, Decimal(0)), 'Nx_now': comm_table_dict_N.get(x, Decimal(0)),
+        'Dx_entry': comm_table_dict_D.get(e, Decimal(0)), 'Nx_entry': comm_table_dict_N.get(e, Decimal(0)),
+        'Dx_r': comm_table_dict_D.get(r, Decimal(0)), 'Nx_r': comm_table_dict_N.get(r, Decimal(0)),
+    }
+    Dx_now, Nx_now, Dx_entry, Nx_entry, Nx_r = (values[name] for name in ('Dx_now', 'Nx_now', 'Dx_entry', 'Nx_entry', 'Nx_r'))
+    values['anuitas_now'] = (Nx_now - Nx_r) / Dx_now if Dx_now > 0 else Decimal(0)
+    values['anuitas_entry'] = (Nx_entry - Nx_r) / Dx_entry if Dx_entry > 0 else Decimal(0)
+    values['anuitas_entry_to_now'] = (Nx_entry - Nx_now) / Dx_entry if Dx_entry > 0 else Decimal(0)
+    return values
+
+@graph.node('gender', 'e', 'x', 'r', 'i', 'benefit', 'table_id')
+def rate_sens(gender, e, x, r, i, benefit, table_id):
+    with stage('durasi'):
+        return sensitivity.member_rate_sensitivities(gender, e, x, r, i, benefit[0], table_id)
+
+@graph.node('gender', 'e', 'x', 'r', 'i', 'table_id')
+def backend_diff(gender, e, x, r, i, table_id):
+    with stage('cek_backend', caches=[valuation.base_schedule]):
+        return valuation.backend_difference(gender, e, x, r, i, table_id)
+
+if st.session_state.get('widget_backend_check', False):
+    st.sidebar.caption(f"Selisih relatif maksimum Float64 vs Decimal untuk parameter ini: **{graph.get('backend_diff'):.2e}**")
+
+def active_portfolio(show_errors=False):
+    """
+    Valuasi file peserta yang tersimpan di sesi: (hasil, total, ditolak, sensitivitas, kunci kecil)
+    atau None. File disimpan di sesi (bukan dibaca dari widget unggah) agar tab lain tetap dapat
+    memakainya walaupun tab Valuasi Portofolio tidak sedang dibuka.
+    """
+    upload = st.session_state.get('portfolio_upload')
+    if upload is None:
+        return None
+    name, data, digest = upload
+    try:
+        hasil, totals, ditolak, rate_sens = value_member_file(
+            digest, name, data, r_state, i_state, k_state, s_state, table_id_state, int(st.session_state.get('widget_portfolio_workers', 1)))
+    except Exception as e:
+        if show_errors:
+            st.error(f"Gagal membaca file peserta: {e}")
+        return None
+    return hasil, totals, ditolak, rate_sens, (digest, r_state, commutation.rate_bp(i_state), k_state, s_state, table_id_state)
+
+def portfolio_members():
+    """(hasil per peserta, kunci) dari file peserta tersimpan, atau (None, None)."""
+    portfolio_result = active_portfolio()
+    return (None, None) if portfolio_result is None else (portfolio_result[0], portfolio_result[4])
+
+# --- 6. TAMPILKAN OUTPUT ---
+# Setiap tab adalah fragmen: widget di dalam tab hanya menjalankan ulang tab tersebut, dan hanya
+# tab yang sedang dibuka yang dirender (st.tabs dengan on_change="rerun").
+
+# --- ISI TAB SUMMARY ---
+@profiled_fragment
+def render_summary():
+    v = graph.get('member_values')
+    B_r, Sr_minus_1, PVFB_x_now = v['B_r'], v['Sr_minus_1'], v['PVFB_x_now']
+    NC_ilp_now, NC_aan_x_now, NC_puc_now = v['NC_ean_now'], v['NC_aan_x_now'], v['NC_puc_now']
+    AL_ilp_x_now, AL_aan_x_now, AL_puc_now = v['AL_ean_now'], v['AL_aan_now'], v['AL_puc_now']
+    NA_ean_total, NA_aan_total, NA_puc_total = v['NA_ean_total'], v['NA_aan_total'], v['NA_puc_total']
+    df_actuarial_full = graph.get('schedule')[1]
+
+    st.header(f"📈 Ringkasan Hasil Perhitungan (Usia Valuasi: {x_now_state})")
+    st.caption(f"Perhitungan menggunakan metode **Entry Age Normal (EAN)**, **Attained Age Normal (AAN)**, dan **Projected Unit Credit (PUC)**.")
+    st.divider()
+
+    st.subheader("Nilai Aktuaria Utama")
+    # Baris 1: Manfaat Pensiun Tahunan dan Nilai Sekarang Manfaat
+    col_s1, col_s2, col_s3 = st.columns(3)
+    with col_s1:
+        st.metric("Manfaat Pensiun Tahunan (Br)", format_rp(B_r), help=f"Dihitung: {k_state*100:.1f}% x {r_state-x_entry_state} thn x Gaji Akhir Proyeksi ({format_rp(Sr_minus_1)})")
+    with col_s2:
+        st.metric(f"Nilai Sekarang Manfaat (PVFB)", format_rp(PVFB_x_now), help=f"Present value manfaat pensiun di usia {x_now_state}.")
+    # col_s3 dibiarkan kosong
+
+    # Baris 2: Nilai Akhir Total Iuran EAN, AAN, PUC
+    col_s4, col_s5, col_s6 = st.columns(3)
+    with col_s4:
+        st.metric("Nilai Akhir Total Iuran EAN", format_rp(NA_ean_total), help=f"Akumulasi iuran EAN hingga usia {r_state}.")
+    with col_s5:
+        st.metric("Nilai Akhir Total Iuran AAN", format_rp(NA_aan_total), help=f"Akumulasi iuran AAN hingga usia {r_state}.")
+    with col_s6:
+        st.metric("Nilai Akhir Total Iuran PUC", format_rp(NA_puc_total), help=f"Akumulasi iuran PUC hingga usia {r_state}.")
     
-    # Ambil nilai dari session_state
-    jenis_kelamin_state = st.session_state.widget_gender
-    x_entry_state = st.session_state.widget_entry_age
-    x_now_state = st.session_state.widget_valuation_age
-    r_state = st.session_state.widget_retirement_age
-    gaji_masuk_state = st.session_state.widget_initial_salary
-    i_percent_state = st.session_state.widget_interest_rate
-    k_percent_state = st.session_state.widget_benefit_prop
-    s_percent_state = st.session_state.widget_salary_increase
+    st.divider()
+    st.subheader(f"Detail Metode di Usia {x_now_state}")
+    col_m1, col_m2, col_m3 = st.columns(3)
+    with col_m1:
+        st.markdown("##### Entry Age Normal (EAN)")
+        st.metric(f"Iuran Normal (NC)", format_rp(NC_ilp_now), help="Iuran tahunan pada usia valuasi.") 
+        st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_ilp_x_now), help="Target dana terkumpul saat ini.")
+    with col_m2:
+        st.markdown("##### Attained Age Normal (AAN)")
+        st.metric(f"Iuran Normal (NC)", format_rp(NC_aan_x_now), help="Iuran tahunan saat ini.")
+        st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_aan_x_now), help="Target dana terkumpul saat ini.")
+    with col_m3:
+        st.markdown("##### Projected Unit Credit (PUC)")
+        st.metric(f"Iuran Normal (NC)", format_rp(NC_puc_now), help="Iuran normal tahun berjalan metode PUC.")
+        st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_puc_now), help="Kewajiban aktuaria metode PUC.")
+
+    st.divider()
+
+    st.subheader("📊 Visualisasi & Detail Perhitungan")
     
-    # Konversi ke Decimal untuk akurasi
-    i_state = Decimal(str(i_percent_state)) / Decimal(100)
-    k_state = Decimal(str(k_percent_state)) / Decimal(100)
-    s_state = Decimal(str(s_percent_state)) / Decimal(100)
-    gaji_masuk_state = Decimal(gaji_masuk_state)
-
-    # Cek apakah menggunakan target manfaat pensiun
-    use_target_benefit_state = st.session_state.get('widget_use_target_benefit', False)
-    target_benefit_state = st.session_state.get('widget_target_benefit', None)
-
-    df_raw = df_perempuan_raw if jenis_kelamin_state == "Perempuan" else df_laki_raw
-
-    # Jika target manfaat diaktifkan, override gaji dan k
-    if use_target_benefit_state and target_benefit_state is not None and target_benefit_state > 0:
-        # Hitung B_r langsung dari input target
-        # Untuk konsistensi, gaji_masuk_state tetap dipakai untuk perhitungan lain jika diperlukan
-        # k_state diabaikan
-        custom_B_r = Decimal(target_benefit_state)
-        # Pastikan comm_table sudah didefinisikan sebelum dipakai
-        comm_table = build_commutation_table(df_raw, i_state, l0=100000)
-        # Buat fungsi pengganti untuk calculate_actuarial_values_excel_logic
-        def calculate_actuarial_values_with_target(comm_table, x_entry, x_now, r, i, k, gaji_masuk, s):
-            # Panggil fungsi asli tapi override B_r
-            # Salin kode aslinya, tapi ganti B_r
-            # --- 1. Mapping Data Komutasi ---
-            D = comm_table.set_index('x')['Dx'].to_dict()
-            N = comm_table.set_index('x')['Nx'].to_dict()
-            def get_D(x): return D.get(x, Decimal(0))
-            def get_N(x): return N.get(x, Decimal(0))
-            metrics = {}
-            actuarial_data = []
-            D_entry = get_D(x_entry)
-            N_entry = get_N(x_entry)
-            D_r = get_D(r)
-            N_r = get_N(r)
-            # B_r override
-            B_r = custom_B_r
-            metrics['B_r'] = B_r
-            metrics['Sr_minus_1'] = Decimal(0)  # Tidak relevan
-            # PVFB_e = Br * (Dr / De)
-            if D_entry > 0:
-                PVFB_at_entry = B_r * (D_r / D_entry)
-            else:
-                PVFB_at_entry = Decimal(0)
-            metrics['PVFB_entry_AAN'] = PVFB_at_entry
-            pembilang_annuitas = N_entry - N_r
-            if D_entry > 0 and pembilang_annuitas != 0:
-                NC_EAN_FIXED = PVFB_at_entry * (D_entry / pembilang_annuitas)
-            else:
-                NC_EAN_FIXED = Decimal(0)
-            for x_loop in range(x_entry, r):
-                D_x = get_D(x_loop)
-                N_x = get_N(x_loop)
-                if D_x > 0:
-                    PVFB_x = B_r * (D_r / D_x)
-                    anuitas_x_term = (N_x - N_r) / D_x
-                else:
-                    PVFB_x = Decimal(0)
-                    anuitas_x_term = Decimal(0)
-                nc_ean_x = NC_EAN_FIXED
-                al_ean_x = PVFB_x - (nc_ean_x * anuitas_x_term)
-                if anuitas_x_term > 0:
-                    nc_aan_x = PVFB_at_entry / anuitas_x_term
-                else:
-                    nc_aan_x = Decimal(0)
-                al_aan_x = PVFB_x - (nc_aan_x * anuitas_x_term)
-                if r > x_entry:
-                    accrual_fraction = Decimal(x_loop - x_entry) / Decimal(r - x_entry)
-                    nc_puc_x = PVFB_x / Decimal(r - x_entry)
-                    al_puc_x = accrual_fraction * PVFB_x
-                else:
-                    accrual_fraction = Decimal(0)
-                    nc_puc_x = Decimal(0)
-                    al_puc_x = Decimal(0)
-                actuarial_data.append({
-                    "Usia": x_loop,
-                    "Iuran Normal (EAN)": nc_ean_x,
-                    "Iuran Normal (AAN)": nc_aan_x,
-                    "Iuran Normal (PUC)": nc_puc_x,
-                    "Kewajiban Aktuaria (EAN)": al_ean_x,
-                    "Kewajiban Aktuaria (AAN)": al_aan_x,
-                    "Kewajiban Aktuaria (PUC)": al_puc_x,
-                    "PVFB": PVFB_x
-                })
-            df_actuarial_full = pd.DataFrame(actuarial_data)
-            # Output dashboard (Usia Valuasi)
-            metrics['PVFB_x_now'] = B_r * (get_D(r) / get_D(x_now)) if get_D(x_now) > 0 else Decimal(0)
-            try:
-                row_now = df_actuarial_full[df_actuarial_full['Usia'] == x_now]
-                if not row_now.empty:
-                    metrics['NC_ean_now'] = row_now['Iuran Normal (EAN)'].values[0]
-                    metrics['AL_ean_now'] = row_now['Kewajiban Aktuaria (EAN)'].values[0]
-                    metrics['AL_aan_now'] = row_now['Kewajiban Aktuaria (AAN)'].values[0]
-                    metrics['NC_aan_x_now'] = row_now['Iuran Normal (AAN)'].values[0]
-                else:
-                    raise IndexError
-            except IndexError:
-                metrics['NC_ean_now'] = Decimal(0)
-                metrics['AL_ean_now'] = Decimal(0)
-                metrics['AL_aan_now'] = Decimal(0)
-                metrics['NC_aan_x_now'] = Decimal(0)
-            NA_ean = Decimal(0)
-            NA_aan = Decimal(0)
-            if not df_actuarial_full.empty:
-                for index, row in df_actuarial_full.iterrows():
-                    umur_iuran = row['Usia']
-                    if umur_iuran < r:
-                        interest_factor = (Decimal(1) + i)**(r - umur_iuran)
-                        NA_ean += row['Iuran Normal (EAN)'] * interest_factor
-                        NA_aan += row['Iuran Normal (AAN)'] * interest_factor
-            metrics['NA_ean_total'] = NA_ean
-            metrics['NA_aan_total'] = NA_aan
-            # NA PUC
-            NA_puc = Decimal(0)
-            if not df_actuarial_full.empty:
-                for index, row in df_actuarial_full.iterrows():
-                    umur_iuran = row['Usia']
-                    if umur_iuran < r:
-                        interest_factor = (Decimal(1) + i)**(r - umur_iuran)
-                        NA_puc += row['Iuran Normal (PUC)'] * interest_factor
-            metrics['NA_puc_total'] = NA_puc
-            return metrics, df_actuarial_full
-        metrics, df_actuarial_full = calculate_actuarial_values_with_target(
-            comm_table, x_entry_state, x_now_state, r_state, i_state, k_state, gaji_masuk_state, s_state
-        )
-    else:
-        comm_table = build_commutation_table(df_raw, i_state, l0=100000)
-        metrics, df_actuarial_full = calculate_actuarial_values_excel_logic(
-            comm_table, x_entry_state, x_now_state, r_state, i_state, k_state, gaji_masuk_state, s_state
-        )
-
-    # Metrics
-    B_r = metrics.get('B_r', Decimal(0))
-    Sr_minus_1 = metrics.get('Sr_minus_1', Decimal(0))
-    PVFB_x_now = metrics.get('PVFB_x_now', Decimal(0))
-    PVFB_entry_AAN = metrics.get('PVFB_entry_AAN', Decimal(0))
-    NC_ilp_now = metrics.get('NC_ean_now', Decimal(0))
-    NC_aan_x_now = metrics.get('NC_aan_x_now', Decimal(0))
-    NA_ean_total = metrics.get('NA_ean_total', Decimal(0))
-    NA_aan_total = metrics.get('NA_aan_total', Decimal(0))
-    AL_ilp_x_now = metrics.get('AL_ean_now', Decimal(0))
-    AL_aan_x_now = metrics.get('AL_aan_now', Decimal(0))
-    # PUC
-    # Ambil dari df_actuarial_full
-    NC_puc_now = Decimal(0)
-    AL_puc_now = Decimal(0)
     if not df_actuarial_full.empty:
-        row_now = df_actuarial_full[df_actuarial_full['Usia'] == x_now_state]
-        if not row_now.empty:
-            NC_puc_now = row_now['Iuran Normal (PUC)'].values[0]
-            AL_puc_now = row_now['Kewajiban Aktuaria (PUC)'].values[0]
+        with stage('grafik'):
+            df_chart_nc, y_domain, df_chart_al, y_domain_al = graph.get('chart_data')
 
-
-    # Nilai Komutasi
-    if comm_table is not None and not comm_table.empty:
-        comm_table_dict_D = comm_table.set_index('x')['Dx'].to_dict()
-        comm_table_dict_N = comm_table.set_index('x')['Nx'].to_dict()
-        
-        Dx_now = comm_table_dict_D.get(x_now_state, Decimal(0))
-        Nx_now = comm_table_dict_N.get(x_now_state, Decimal(0))
-        Dx_entry = comm_table_dict_D.get(x_entry_state, Decimal(0))
-        Nx_entry = comm_table_dict_N.get(x_entry_state, Decimal(0))
-        Dx_r = comm_table_dict_D.get(r_state, Decimal(0))
-        Nx_r = comm_table_dict_N.get(r_state, Decimal(0))
-        
-        anuitas_now_formula = (Nx_now - Nx_r) / Dx_now if Dx_now > 0 else Decimal(0)
-        anuitas_entry_formula = (Nx_entry - Nx_r) / Dx_entry if Dx_entry > 0 else Decimal(0)
-        anuitas_entry_to_now_formula = (Nx_entry - Nx_now) / Dx_entry if Dx_entry > 0 else Decimal(0)
-    else:
-        Dx_now, Nx_now, Dx_entry, Nx_entry, Dx_r, Nx_r = (Decimal(0),) * 6
-        anuitas_now_formula, anuitas_entry_formula, anuitas_entry_to_now_formula = (Decimal(0),) * 3
-
-    # --- 6. TAMPILKAN OUTPUT ---
-
-    # Ambil nilai NA_ean_term_first, NA_ean_term_second, NA_ean_term_last, NA_aan_term_first, NA_aan_term_second, NA_aan_term_last dari metrics
-    NA_ean_term_first = metrics.get('NA_ean_term_first', Decimal(0))
-    NA_ean_term_second = metrics.get('NA_ean_term_second', Decimal(0))
-    NA_ean_term_last = metrics.get('NA_ean_term_last', Decimal(0))
-    NA_aan_term_first = metrics.get('NA_aan_term_first', Decimal(0))
-    NA_aan_term_second = metrics.get('NA_aan_term_second', Decimal(0))
-    NA_aan_term_last = metrics.get('NA_aan_term_last', Decimal(0))
-
-    # Hitung NA_puc_total dan term jika belum ada di metrics
-    NA_puc_total = Decimal(0)
-    NA_puc_term_first = Decimal(0)
-    NA_puc_term_second = Decimal(0)
-    NA_puc_term_last = Decimal(0)
-    if not df_actuarial_full.empty:
-        for idx, row in df_actuarial_full.iterrows():
-            umur_iuran = row['Usia']
-            if umur_iuran < r_state:
-                interest_factor = (Decimal(1) + i_state)**(r_state - umur_iuran)
-                NA_puc_total += row['Iuran Normal (PUC)'] * interest_factor
-                if idx == 0:
-                    NA_puc_term_first = row['Iuran Normal (PUC)'] * ((Decimal(1) + i_state)**(r_state - umur_iuran))
-                elif idx == 1:
-                    NA_puc_term_second = row['Iuran Normal (PUC)'] * ((Decimal(1) + i_state)**(r_state - umur_iuran))
-                elif umur_iuran == r_state - 1:
-                    NA_puc_term_last = row['Iuran Normal (PUC)'] * ((Decimal(1) + i_state)**1)
-
-    # Helper function untuk format Rupiah (presisi 2) - UNTUK UI
-    import locale
-    def format_rp(val):
-        if not isinstance(val, Decimal):
-            val = Decimal(str(val))
-        # Format: ribuan titik, desimal koma
-        s = f"{val:,.2f}"
-        s = s.replace(",", "_").replace(".", ",").replace("_", ".")
-        return f"Rp {s}"
-    
-    # Helper function untuk format angka (presisi 7) - UNTUK TAB FORMULA
-    def format_calc(val):
-        if not isinstance(val, Decimal):
-            val = Decimal(str(val))
-        s = f"{val:,.7f}"
-        s = s.replace(",", "_").replace(".", ",").replace("_", ".")
-        return s
-    
-    # Helper function untuk format angka tanpa koma (untuk LaTeX)
-    def format_latex_num(val):
-        if not isinstance(val, Decimal):
-            val = Decimal(str(val))
-        # Hasilkan string angka dengan 7 desimal, gunakan titik untuk LaTeX
-        return f"{val:.7f}"
-
-    tab_summary, tab_formula, tab_commutation = st.tabs([
-        "📊 Ringkasan & Detail", 
-        "🔬 Formula Perhitungan",
-        "🧮 Tabel Komutasi" 
-        ])
-
-    # --- ISI TAB SUMMARY ---
-    with tab_summary:
-        st.header(f"📈 Ringkasan Hasil Perhitungan (Usia Valuasi: {x_now_state})")
-        st.caption(f"Perhitungan menggunakan metode **Entry Age Normal (EAN)**, **Attained Age Normal (AAN)**, dan **Projected Unit Credit (PUC)**.")
-        st.divider()
-
-        st.subheader("Nilai Aktuaria Utama")
-        # Baris 1: Manfaat Pensiun Tahunan dan Nilai Sekarang Manfaat
-        col_s1, col_s2, col_s3 = st.columns(3)
-        with col_s1:
-            st.metric("Manfaat Pensiun Tahunan (Br)", format_rp(B_r), help=f"Dihitung: {k_state*100:.1f}% x {r_state-x_entry_state} thn x Gaji Akhir Proyeksi ({format_rp(Sr_minus_1)})")
-        with col_s2:
-            st.metric(f"Nilai Sekarang Manfaat (PVFB)", format_rp(PVFB_x_now), help=f"Present value manfaat pensiun di usia {x_now_state}.")
-        # col_s3 dibiarkan kosong
-
-        # Baris 2: Nilai Akhir Total Iuran EAN, AAN, PUC
-        col_s4, col_s5, col_s6 = st.columns(3)
-        with col_s4:
-            st.metric("Nilai Akhir Total Iuran EAN", format_rp(NA_ean_total), help=f"Akumulasi iuran EAN hingga usia {r_state}.")
-        with col_s5:
-            st.metric("Nilai Akhir Total Iuran AAN", format_rp(NA_aan_total), help=f"Akumulasi iuran AAN hingga usia {r_state}.")
-        with col_s6:
-            st.metric("Nilai Akhir Total Iuran PUC", format_rp(NA_puc_total), help=f"Akumulasi iuran PUC hingga usia {r_state}.")
-        
-        st.divider()
-        st.subheader(f"Detail Metode di Usia {x_now_state}")
-        col_m1, col_m2, col_m3 = st.columns(3)
-        with col_m1:
-            st.markdown("##### Entry Age Normal (EAN)")
-            st.metric(f"Iuran Normal (NC)", format_rp(NC_ilp_now), help="Iuran tahunan pada usia valuasi.") 
-            st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_ilp_x_now), help="Target dana terkumpul saat ini.")
-        with col_m2:
-            st.markdown("##### Attained Age Normal (AAN)")
-            st.metric(f"Iuran Normal (NC)", format_rp(NC_aan_x_now), help="Iuran tahunan saat ini.")
-            st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_aan_x_now), help="Target dana terkumpul saat ini.")
-        with col_m3:
-            st.markdown("##### Projected Unit Credit (PUC)")
-            st.metric(f"Iuran Normal (NC)", format_rp(NC_puc_now), help="Iuran normal tahun berjalan metode PUC.")
-            st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_puc_now), help="Kewajiban aktuaria metode PUC.")
-
-        st.divider()
-
-        st.subheader("📊 Visualisasi & Detail Perhitungan")
-        
-        if not df_actuarial_full.empty:
-            df_chart_data = df_actuarial_full.astype(float)
-            
             st.markdown("##### Perbandingan Pola Iuran Normal Tahunan")
-            df_chart_nc = df_chart_data[['Usia', 'Iuran Normal (AAN)', 'Iuran Normal (EAN)', 'Iuran Normal (PUC)']].melt('Usia', var_name='Metode', value_name='Iuran Tahunan')
-            
-            try:
-                y_max = df_chart_nc['Iuran Tahunan'].max()
-                y_min = df_chart_nc['Iuran Tahunan'].min() 
-                y_padding = (y_max - y_min) * 0.1 
-                y_domain = [max(0, y_min - y_padding), y_max + y_padding] 
-            except Exception: 
-                 y_domain = [0, 1000000] 
-            
             chart_nc = alt.Chart(df_chart_nc).mark_line(point=True).encode(
                 x=alt.X('Usia', axis=alt.Axis(title='Usia Peserta')), 
                 y=alt.Y('Iuran Tahunan', axis=alt.Axis(title='Iuran Tahunan (Rp)'), scale=alt.Scale(domain=y_domain, clamp=True)), 
@@ -900,16 +525,6 @@ if df_laki_raw is not None and df_perempuan_raw is not None:
             st.altair_chart(chart_nc, use_container_width=True)
 
             st.markdown("##### Perbandingan Grafik Kewajiban Aktuaria")
-            df_chart_al = df_chart_data[['Usia', 'Kewajiban Aktuaria (AAN)', 'Kewajiban Aktuaria (EAN)', 'Kewajiban Aktuaria (PUC)']].melt('Usia', var_name='Metode', value_name='Kewajiban Aktuaria')
-
-            try:
-                y_max_al = df_chart_al['Kewajiban Aktuaria'].max()
-                y_min_al = df_chart_al['Kewajiban Aktuaria'].min() 
-                y_padding_al = (y_max_al - y_min_al) * 0.1 
-                y_domain_al = [max(0, y_min_al - y_padding_al), y_max_al + y_padding_al] 
-            except Exception: 
-                 y_domain_al = [0, 1000000]
-            
             chart_al = alt.Chart(df_chart_al).mark_line(point=True).encode(
                 x=alt.X('Usia', axis=alt.Axis(title='Usia Peserta')), 
                 y=alt.Y('Kewajiban Aktuaria', axis=alt.Axis(title='Kewajiban Aktuaria (Rp)'), scale=alt.Scale(domain=y_domain_al, clamp=True)), 
@@ -925,287 +540,704 @@ if df_laki_raw is not None and df_perempuan_raw is not None:
             st.altair_chart(chart_al, use_container_width=True)
 
 
-            # --- Ringkasan Interpretasi ---
-            st.subheader("💡 Ringkasan Interpretasi")
+        # --- Ringkasan Interpretasi ---
+        st.subheader("💡 Ringkasan Interpretasi")
 
-            # Interpretasi Pola Grafik (EAN, AAN, PUC)
-            interpretation_graph = (
-                "Pada grafik, iuran **AAN** (putih) dimulai paling rendah namun meningkat tajam menjelang pensiun. "
-                "Iuran **EAN** (biru) naik lebih landai dan stabil. "
-                "Iuran **PUC** (hijau) cenderung naik secara bertahap, mengikuti akumulasi masa kerja, dan berada di antara EAN dan AAN pada sebagian besar usia."
-            )
+        # Interpretasi Pola Grafik (EAN, AAN, PUC)
+        interpretation_graph = (
+            "Pada grafik, iuran **AAN** (putih) dimulai paling rendah namun meningkat tajam menjelang pensiun. "
+            "Iuran **EAN** (biru) naik lebih landai dan stabil. "
+            "Iuran **PUC** (hijau) cenderung naik secara bertahap, mengikuti akumulasi masa kerja, dan berada di antara EAN dan AAN pada sebagian besar usia."
+        )
 
-            # Interpretasi Nilai Akhir (Total Biaya)
-            if NA_ean_total <= NA_aan_total and NA_ean_total <= NA_puc_total:
-                interpretation_na = f"Metode **EAN** menghasilkan total iuran terendah ({format_rp(NA_ean_total)}), diikuti **PUC** ({format_rp(NA_puc_total)}), lalu **AAN** ({format_rp(NA_aan_total)})."
-            elif NA_puc_total <= NA_ean_total and NA_puc_total <= NA_aan_total:
-                interpretation_na = f"Metode **PUC** menghasilkan total iuran terendah ({format_rp(NA_puc_total)}), diikuti **EAN** ({format_rp(NA_ean_total)}), lalu **AAN** ({format_rp(NA_aan_total)})."
-            else:
-                interpretation_na = f"Metode **AAN** menghasilkan total iuran terendah ({format_rp(NA_aan_total)}), diikuti **PUC** ({format_rp(NA_puc_total)}), lalu **EAN** ({format_rp(NA_ean_total)})."
-
-            # Interpretasi Kewajiban Aktuaria Saat Ini
-            if AL_ilp_x_now >= AL_aan_x_now and AL_ilp_x_now >= AL_puc_now:
-                interpretation_al = f"Kewajiban Aktuaria terbesar saat ini adalah **EAN** ({format_rp(AL_ilp_x_now)}), diikuti **AAN** ({format_rp(AL_aan_x_now)}), lalu **PUC** ({format_rp(AL_puc_now)})."
-            elif AL_aan_x_now >= AL_ilp_x_now and AL_aan_x_now >= AL_puc_now:
-                interpretation_al = f"Kewajiban Aktuaria terbesar saat ini adalah **AAN** ({format_rp(AL_aan_x_now)}), diikuti **EAN** ({format_rp(AL_ilp_x_now)}), lalu **PUC** ({format_rp(AL_puc_now)})."
-            else:
-                interpretation_al = f"Kewajiban Aktuaria terbesar saat ini adalah **PUC** ({format_rp(AL_puc_now)}), diikuti **EAN** ({format_rp(AL_ilp_x_now)}), lalu **AAN** ({format_rp(AL_aan_x_now)})."
-
-            # Interpretasi Iuran Normal Saat Ini
-            if NC_ilp_now <= NC_aan_x_now and NC_ilp_now <= NC_puc_now:
-                interpretation_nc = f"Iuran normal saat ini paling rendah: **EAN** ({format_rp(NC_ilp_now)}), lalu **PUC** ({format_rp(NC_puc_now)}), lalu **AAN** ({format_rp(NC_aan_x_now)})."
-            elif NC_puc_now <= NC_ilp_now and NC_puc_now <= NC_aan_x_now:
-                interpretation_nc = f"Iuran normal saat ini paling rendah: **PUC** ({format_rp(NC_puc_now)}), lalu **EAN** ({format_rp(NC_ilp_now)}), lalu **AAN** ({format_rp(NC_aan_x_now)})."
-            else:
-                interpretation_nc = f"Iuran normal saat ini paling rendah: **AAN** ({format_rp(NC_aan_x_now)}), lalu **PUC** ({format_rp(NC_puc_now)}), lalu **EAN** ({format_rp(NC_ilp_now)})."
-
-            st.markdown("Berikut adalah kesimpulan utama dari perbandingan ketiga metode:")
-            st.markdown(f"* **Pola Iuran:** {interpretation_graph}")
-            st.markdown(f"* **Total Biaya (Nilai Akhir):** {interpretation_na}")
-            st.markdown(f"* **Kewajiban Saat Ini (Usia {x_now_state}):** {interpretation_al}")
-            st.markdown(f"* **Iuran Saat Ini (Usia {x_now_state}):** {interpretation_nc}")
-            
-            st.divider() # Pemisah sebelum tabel rinci
-
-            st.markdown("##### Tabel Rinci Perhitungan per Usia")
-            cols_to_show = [
-                'PVFB',
-                'Iuran Normal (EAN)',
-                'Iuran Normal (AAN)',
-                'Iuran Normal (PUC)',
-                'Kewajiban Aktuaria (EAN)',
-                'Kewajiban Aktuaria (AAN)',
-                'Kewajiban Aktuaria (PUC)'
-            ]
-            
-            df_display = df_actuarial_full.set_index('Usia')[cols_to_show]
-            df_display = df_actuarial_full.set_index('Usia')[cols_to_show]
-            
-            def highlight_row(row):
-                if row.name == x_now_state:
-                    return ['background-color: #2b6aca; color: white;'] * len(row) 
-                return [''] * len(row) 
-
-            st.dataframe(df_display.style.apply(highlight_row, axis=1).format("Rp {:,.2f}"), use_container_width=True, height=600)
-            st.caption(f"Tabel ini menunjukkan nilai aktuaria per tahun dari usia masuk ({x_entry_state}) hingga pensiun ({r_state-1}). Baris usia valuasi ({x_now_state}) ditandai.")
-
-    # --- ISI TAB FORMULA ---
-    with tab_formula:
-        st.header("🔬 Detail Formula Perhitungan")
-        st.info(f"Asumsi: Suku Bunga (i) = **{i_percent_state:.1f}%**, Kenaikan Gaji (s) = **{s_percent_state:.1f}%**, TMI 2023 **{jenis_kelamin_state}**.")
+        # Interpretasi Nilai Akhir (Total Biaya)
+        if NA_ean_total <= NA_aan_total and NA_ean_total <= NA_puc_total:
+            interpretation_na = f"Metode **EAN** menghasilkan total iuran terendah ({format_rp(NA_ean_total)}), diikuti **PUC** ({format_rp(NA_puc_total)}), lalu **AAN** ({format_rp(NA_aan_total)})."
+        elif NA_puc_total <= NA_ean_total and NA_puc_total <= NA_aan_total:
+            interpretation_na = f"Metode **PUC** menghasilkan total iuran terendah ({format_rp(NA_puc_total)}), diikuti **EAN** ({format_rp(NA_ean_total)}), lalu **AAN** ({format_rp(NA_aan_total)})."
+        else:
+            interpretation_na = f"Metode **AAN** menghasilkan total iuran terendah ({format_rp(NA_aan_total)}), diikuti **PUC** ({format_rp(NA_puc_total)}), lalu **EAN** ({format_rp(NA_ean_total)})."
+
+        # Interpretasi Kewajiban Aktuaria Saat Ini
+        if AL_ilp_x_now >= AL_aan_x_now and AL_ilp_x_now >= AL_puc_now:
+            interpretation_al = f"Kewajiban Aktuaria terbesar saat ini adalah **EAN** ({format_rp(AL_ilp_x_now)}), diikuti **AAN** ({format_rp(AL_aan_x_now)}), lalu **PUC** ({format_rp(AL_puc_now)})."
+        elif AL_aan_x_now >= AL_ilp_x_now and AL_aan_x_now >= AL_puc_now:
+            interpretation_al = f"Kewajiban Aktuaria terbesar saat ini adalah **AAN** ({format_rp(AL_aan_x_now)}), diikuti **EAN** ({format_rp(AL_ilp_x_now)}), lalu **PUC** ({format_rp(AL_puc_now)})."
+        else:
+            interpretation_al = f"Kewajiban Aktuaria terbesar saat ini adalah **PUC** ({format_rp(AL_puc_now)}), diikuti **EAN** ({format_rp(AL_ilp_x_now)}), lalu **AAN** ({format_rp(AL_aan_x_now)})."
+
+        # Interpretasi Iuran Normal Saat Ini
+        if NC_ilp_now <= NC_aan_x_now and NC_ilp_now <= NC_puc_now:
+            interpretation_nc = f"Iuran normal saat ini paling rendah: **EAN** ({format_rp(NC_ilp_now)}), lalu **PUC** ({format_rp(NC_puc_now)}), lalu **AAN** ({format_rp(NC_aan_x_now)})."
+        elif NC_puc_now <= NC_ilp_now and NC_puc_now <= NC_aan_x_now:
+            interpretation_nc = f"Iuran normal saat ini paling rendah: **PUC** ({format_rp(NC_puc_now)}), lalu **EAN** ({format_rp(NC_ilp_now)}), lalu **AAN** ({format_rp(NC_aan_x_now)})."
+        else:
+            interpretation_nc = f"Iuran normal saat ini paling rendah: **AAN** ({format_rp(NC_aan_x_now)}), lalu **PUC** ({format_rp(NC_puc_now)}), lalu **EAN** ({format_rp(NC_ilp_now)})."
+
+        st.markdown("Berikut adalah kesimpulan utama dari perbandingan ketiga metode:")
+        st.markdown(f"* **Pola Iuran:** {interpretation_graph}")
+        st.markdown(f"* **Total Biaya (Nilai Akhir):** {interpretation_na}")
+        st.markdown(f"* **Kewajiban Saat Ini (Usia {x_now_state}):** {interpretation_al}")
+        st.markdown(f"* **Iuran Saat Ini (Usia {x_now_state}):** {interpretation_nc}")
         
-        # --- 1. Manfaat Pensiun ---
-        st.subheader("1. Manfaat Pensiun Tahunan ($B_r$)")
-        st.metric("Hasil Perhitungan", format_rp(B_r), help="Manfaat tahunan yang akan diterima saat pensiun.")
-        with st.expander("Lihat Detail Formula"):
-            
-            st.markdown(f"**Perhitungan $S_{{{r_state-1}}}$ (Gaji Proyeksi):**")
-            st.latex(r"S_{r-1} = (1+s)^{r-e-1} \times s_e")
-            latex_s_e = rf"S_{{{r_state-1}}} = (1 + {format_latex_num(s_state)})^{{{r_state}-{x_entry_state}-1}} \times {gaji_masuk_state:,.0f}"
-            st.latex(latex_s_e)
-            st.latex(rf"S_{{{r_state-1}}} = {format_calc(Sr_minus_1)}")
-
-            st.markdown(f"**Perhitungan $B_{{{r_state}}}$ (Manfaat Pensiun):**")
-            st.latex(r"B_r = k \times (r - e) \times S_{r-1}")
-            latex_b_r_vars = rf"B_{{{r_state}}} = {format_latex_num(k_state)} \times ({r_state} - {x_entry_state}) \times S_{{{r_state-1}}}"
-            st.latex(latex_b_r_vars)
-            latex_b_r_nums = rf"B_{{{r_state}}} = {format_latex_num(k_state)} \times ({r_state-x_entry_state}) \times {format_calc(Sr_minus_1)}"
-            st.latex(latex_b_r_nums)
-            st.latex(rf"B_{{{r_state}}} = {format_calc(B_r)}")
-
-        st.divider()
-
-        # --- 2. PVFB ---
-        st.subheader("2. Nilai Sekarang Manfaat Pensiun (${}^{r}(PVFB)_{x}$)")
-        st.metric(f"Hasil di Usia {x_now_state}", format_rp(PVFB_x_now), help="Nilai kini dari seluruh manfaat pensiun yang diharapkan.")
-        with st.expander("Lihat Detail Formula"):
-            st.latex(r"^{r}(PVFB)_{x} = B_r \times \frac{D_r}{D_x}")
-            st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-            latex_pvfb_vars = rf"^{{{r_state}}}(PVFB)_{{{x_now_state}}} = B_{{{r_state}}} \times \frac{{D_{{{r_state}}}}}{{D_{{{x_now_state}}}}}"
-            st.latex(latex_pvfb_vars)
-            latex_pvfb_nums = rf"^{{{r_state}}}(PVFB)_{{{x_now_state}}} = {format_calc(B_r)} \times \frac{{{format_calc(Dx_r)}}}{{{format_calc(Dx_now)}}}"
-            st.latex(latex_pvfb_nums)
-            st.latex(rf"^{{{r_state}}}(PVFB)_{{{x_now_state}}} = {format_calc(PVFB_x_now)}")
-
-        st.divider()
-
-        # --- 3. IURAN NORMAL ---
-        st.subheader(f"3. Iuran Normal (NC) di Usia {x_now_state}")
-        col1_f, col2_f, col3_f = st.columns(3)
-        with col1_f:
-            st.markdown("**Metode EAN**")
-            st.metric(f"Iuran Normal (NC)", format_rp(NC_ilp_now), help="Iuran tahunan EAN.")
-            with st.expander("Lihat Detail Formula NC EAN"):
-                 st.latex(r"^{EAN~r}(NC)_{x} = \frac{D_x}{N_x - N_r} \times {}^{r}(PVFB)_{x}")
-                 st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-                 latex_nc_ean_vars = rf"^{{EAN~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{D_{{{x_now_state}}}}}{{N_{{{x_now_state}}} - N_{{{r_state}}}}} \times {{}}^{{{r_state}}}(PVFB)_{{{x_now_state}}}"
-                 st.latex(latex_nc_ean_vars)
-                 latex_nc_ean_nums = rf"^{{EAN~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{{format_calc(Dx_now)}}}{{{format_calc(Nx_now)} - {format_calc(Nx_r)}}} \times {format_calc(PVFB_x_now)}"
-                 st.latex(latex_nc_ean_nums)
-                 latex_nc_ean_mid = rf"^{{EAN~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{{format_calc(Dx_now)}}}{{{format_calc(Nx_now - Nx_r)}}} \times {format_calc(PVFB_x_now)}"
-                 st.latex(latex_nc_ean_mid)
-                 st.latex(rf"^{{EAN~{r_state}}}(NC)_{{{x_now_state}}} = {format_calc(NC_ilp_now)}")
-        with col2_f:
-            st.markdown("**Metode AAN**")
-            st.metric(f"Iuran Normal (NC)", format_rp(NC_aan_x_now), help="Iuran tahunan AAN.")
-            with st.expander("Lihat Detail Formula NC AAN"):
-                 st.latex(r"^{AAN~r}(NC)_{x} = \frac{{}^{r}(PVFB)_{e}}{\frac{N_x - N_r}{D_x}}")
-                 st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-                 latex_nc_aan_vars = rf"^{{AAN~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{{{}}^{{{r_state}}}(PVFB)_{{{x_entry_state}}}}}{{ \frac{{N_{{{x_now_state}}} - N_{{{r_state}}}}}{{D_{{{x_now_state}}}}} }}"
-                 st.latex(latex_nc_aan_vars)
-                 st.latex(rf"\text{{Nilai pembilang: }} ^{{{r_state}}}(PVFB)_{{{x_entry_state}}} = {format_calc(PVFB_entry_AAN)}")
-                 st.latex(rf"\text{{Nilai penyebut: }} \frac{{{format_calc(Nx_now)} - {format_calc(Nx_r)}}}{{{format_calc(Dx_now)}}} = {format_calc(anuitas_now_formula)}")
-                 latex_nc_aan_mid = rf"^{{AAN~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{{format_calc(PVFB_entry_AAN)}}}{{{format_calc(anuitas_now_formula)}}}"
-                 st.latex(latex_nc_aan_mid)
-                 st.latex(rf"^{{AAN~{r_state}}}(NC)_{{{x_now_state}}} = {format_calc(NC_aan_x_now)}")
-        with col3_f:
-            st.markdown("**Metode PUC**")
-            st.metric(f"Iuran Normal (NC)", format_rp(NC_puc_now), help="Iuran normal tahun berjalan metode PUC.")
-            with st.expander("Lihat Detail Formula NC PUC"):
-                st.latex(r"^{PUC~r}(NC)_x = \frac{{}^{r}(PVFB)_x}{r-e}")
-                st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-                st.latex(rf"^{{PUC~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{{{}}^{{{r_state}}}(PVFB)_{{{x_now_state}}}}}{{{r_state}-{x_entry_state}}}")
-                st.latex(rf"^{{PUC~{r_state}}}(NC)_{{{x_now_state}}} = \frac{{{format_calc(PVFB_x_now)}}}{{{r_state-x_entry_state}}}")
-                st.latex(rf"^{{PUC~{r_state}}}(NC)_{{{x_now_state}}} = {format_calc(NC_puc_now)}")
-
-        st.divider()
-
-        # --- 4. KEWAJIBAN AKTUARIA ---
-        st.subheader(f"4. Kewajiban Aktuaria (AL) di Usia {x_now_state}")
-        col3_f, col4_f, col5_f = st.columns(3)
-        with col3_f:
-            st.markdown("**Metode EAN**")
-            st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_ilp_x_now), help="Target dana EAN.")
-            with st.expander("Lihat Detail Formula AL EAN"):
-                 st.latex(r"^{EAN~r}(AL)_{x} = \frac{\frac{N_e - N_x}{D_e}}{\frac{N_e - N_r}{D_e}} \times {}^{r}(PVFB)_{x}") 
-                 st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-                 latex_al_ean_vars = rf"^{{EAN~{r_state}}}(AL)_{{{x_now_state}}} = \frac{{\frac{{N_{{{x_entry_state}}} - N_{{{x_now_state}}}}}{{D_{{{x_entry_state}}}}}}}{{\frac{{N_{{{x_entry_state}}} - N_{{{r_state}}}}}{{D_{{{x_entry_state}}}}}}} \times {{}}^{{{r_state}}}(PVFB)_{{{x_now_state}}}"
-                 st.latex(latex_al_ean_vars)
-                 st.latex(rf"\text{{Nilai pembilang: }} \frac{{{format_calc(Nx_entry)} - {format_calc(Nx_now)}}}{{{format_calc(Dx_entry)}}} = {format_calc(anuitas_entry_to_now_formula)}")
-                 st.latex(rf"\text{{Nilai penyebut: }} \frac{{{format_calc(Nx_entry)} - {format_calc(Nx_r)}}}{{{format_calc(Dx_entry)}}} = {format_calc(anuitas_entry_formula)}")
-                 latex_al_ean_mid = rf"^{{EAN~{r_state}}}(AL)_{{{x_now_state}}} = \frac{{{format_calc(anuitas_entry_to_now_formula)}}}{{{format_calc(anuitas_entry_formula)}}} \times {format_calc(PVFB_x_now)}"
-                 st.latex(latex_al_ean_mid)
-                 st.latex(rf"^{{EAN~{r_state}}}(AL)_{{{x_now_state}}} = {format_calc(AL_ilp_x_now)}")
-        with col4_f:
-            st.markdown("**Metode AAN**")
-            st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_aan_x_now), help="Target dana AAN.")
-            with st.expander("Lihat Detail Formula AL AAN"):
-                 st.latex(r"^{AAN~r}(AL)_{x} = {}^{r}(PVFB)_{x} - {}^{AAN~r}(NC)_{x} \times \frac{N_x - N_r}{D_x}")
-                 st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-                 latex_al_aan_vars = rf"^{{AAN~{r_state}}}(AL)_{{{x_now_state}}} = {{}}^{{{r_state}}}(PVFB)_{{{x_now_state}}} - ({{}}^{{AAN~{r_state}}}(NC)_{{{x_now_state}}} \times \frac{{N_{{{x_now_state}}} - N_{{{r_state}}}}}{{D_{{{x_now_state}}}}})"
-                 st.latex(latex_al_aan_vars)
-                 latex_al_aan_mid = rf"^{{AAN~{r_state}}}(AL)_{{{x_now_state}}} = {format_calc(PVFB_x_now)} - ({format_calc(NC_aan_x_now)} \times {format_calc(anuitas_now_formula)})"
-                 st.latex(latex_al_aan_mid)
-                 st.latex(rf"^{{AAN~{r_state}}}(AL)_{{{x_now_state}}} = {format_calc(AL_aan_x_now)}")
-        with col5_f:
-            st.markdown("**Metode PUC**")
-            st.metric(f"Kewajiban Aktuaria (AL)", format_rp(AL_puc_now), help="Kewajiban aktuaria metode PUC.")
-            with st.expander("Lihat Detail Formula AL PUC"):
-                st.latex(r"^{PUC~r}(AL)_x = \frac{x-e}{r-e} \times {}^{r}(PVFB)_x")
-                st.markdown(f"**Perhitungan di Usia {x_now_state}:**")
-                st.latex(rf"^{{PUC~{r_state}}}(AL)_{{{x_now_state}}} = \frac{{{x_now_state}-{x_entry_state}}}{{{r_state}-{x_entry_state}}} \times {{}}^{{{r_state}}}(PVFB)_{{{x_now_state}}}")
-                st.latex(rf"^{{PUC~{r_state}}}(AL)_{{{x_now_state}}} = \frac{{{x_now_state-x_entry_state}}}{{{r_state-x_entry_state}}} \times {format_calc(PVFB_x_now)}")
-                st.latex(rf"^{{PUC~{r_state}}}(AL)_{{{x_now_state}}} = {format_calc(AL_puc_now)}")
-
-        st.divider()
+        st.divider() # Pemisah sebelum tabel rinci
+
+        st.markdown("##### Tabel Rinci Perhitungan per Usia")
+        cols_to_show = [
+            'PVFB',
+            'Iuran Normal (EAN)',
+            'Iuran Normal (AAN)',
+            'Iuran Normal (PUC)',
+            'Kewajiban Aktuaria (EAN)',
+            'Kewajiban Aktuaria (AAN)',
+            'Kewajiban Aktuaria (PUC)'
+        ]
         
+        df_display = df_actuarial_full.set_index('Usia')[cols_to_show]
+
+        with stage('tabel_rinci'):
+            row_styles = tables.highlight_styles(df_display, df_display.index == x_now_state, 'background-color: #2b6aca; color: white;')
+            data_grid(df_display, tables.CURRENCY_FORMAT, styles=row_styles, height=600)
+        st.caption(f"Tabel ini menunjukkan nilai aktuaria per tahun dari usia masuk ({x_entry_state}) hingga pensiun ({r_state-1}). Baris usia valuasi ({x_now_state}) ditandai.")
+
+# --- ISI TAB FORMULA ---
+def formula_expander(label, key, build):
+    """
+    Expander formula yang isinya baru dibangun saat dibuka. build() mengembalikan baris
+    (jenis, teks) dari modul formulas, yang di-cache per parameter.
+    """
+    expander = st.expander(label, key=key, on_change="rerun")
+    if expander.open:
+        with expander:
+            for kind, text in build():
+                getattr(st, kind)(text)
+
+@profiled_fragment
+def render_formula():
+    v = graph.get('member_values')
+    # Nilai komutasi hanya dibutuhkan oleh expander yang dibuka
+    c = lambda name: graph.get('comm_values')[name]
+    e, x, r = x_entry_state, x_now_state, r_state
+
+    st.header("🔬 Detail Formula Perhitungan")
+    st.info(f"Asumsi: Suku Bunga (i) = **{i_percent_state:.1f}%**, Kenaikan Gaji (s) = **{s_percent_state:.1f}%**, {table_label_state} **{jenis_kelamin_state}**.")
+    
+    # --- 1. Manfaat Pensiun ---
+    st.subheader("1. Manfaat Pensiun Tahunan ($B_r$)")
+    st.metric("Hasil Perhitungan", format_rp(v['B_r']), help="Manfaat tahunan yang akan diterima saat pensiun.")
+    formula_expander("Lihat Detail Formula", "widget_formula_benefit", lambda: formulas.benefit_lines(
+        e, r, k_state, gaji_masuk_state, s_state, v['Sr_minus_1'], v['B_r']))
+
+    st.divider()
+
+    # --- 2. PVFB ---
+    st.subheader("2. Nilai Sekarang Manfaat Pensiun (${}^{r}(PVFB)_{x}$)")
+    st.metric(f"Hasil di Usia {x}", format_rp(v['PVFB_x_now']), help="Nilai kini dari seluruh manfaat pensiun yang diharapkan.")
+    formula_expander("Lihat Detail Formula", "widget_formula_pvfb", lambda: formulas.pvfb_lines(
+        x, r, v['B_r'], c('Dx_r'), c('Dx_now'), v['PVFB_x_now']))
+
+    st.divider()
+
+    # --- 3. IURAN NORMAL ---
+    st.subheader(f"3. Iuran Normal (NC) di Usia {x}")
+    col1_f, col2_f, col3_f = st.columns(3)
+    with col1_f:
+        st.markdown("**Metode EAN**")
+        st.metric(f"Iuran Normal (NC)", format_rp(v['NC_ean_now']), help="Iuran tahunan EAN.")
+        formula_expander("Lihat Detail Formula NC EAN", "widget_formula_nc_ean", lambda: formulas.nc_ean_lines(
+            x, r, c('Dx_now'), c('Nx_now'), c('Nx_r'), v['PVFB_x_now'], v['NC_ean_now']))
+    with col2_f:
+        st.markdown("**Metode AAN**")
+        st.metric(f"Iuran Normal (NC)", format_rp(v['NC_aan_x_now']), help="Iuran tahunan AAN.")
+        formula_expander("Lihat Detail Formula NC AAN", "widget_formula_nc_aan", lambda: formulas.nc_aan_lines(
+            e, x, r, c('Dx_now'), c('Nx_now'), c('Nx_r'), v['PVFB_entry_AAN'], c('anuitas_now'), v['NC_aan_x_now']))
+    with col3_f:
+        st.markdown("**Metode PUC**")
+        st.metric(f"Iuran Normal (NC)", format_rp(v['NC_puc_now']), help="Iuran normal tahun berjalan metode PUC.")
+        formula_expander("Lihat Detail Formula NC PUC", "widget_formula_nc_puc", lambda: formulas.nc_puc_lines(
+            e, x, r, v['PVFB_x_now'], v['NC_puc_now']))
+
+    st.divider()
+
+    # --- 4. KEWAJIBAN AKTUARIA ---
+    st.subheader(f"4. Kewajiban Aktuaria (AL) di Usia {x}")
+    col3_f, col4_f, col5_f = st.columns(3)
+    with col3_f:
+        st.markdown("**Metode EAN**")
+        st.metric(f"Kewajiban Aktuaria (AL)", format_rp(v['AL_ean_now']), help="Target dana EAN.")
+        formula_expander("Lihat Detail Formula AL EAN", "widget_formula_al_ean", lambda: formulas.al_ean_lines(
+            e, x, r, c('Dx_entry'), c('Nx_entry'), c('Nx_now'), c('Nx_r'), c('anuitas_entry_to_now'), c('anuitas_entry'),
+            v['PVFB_x_now'], v['AL_ean_now']))
+    with col4_f:
+        st.markdown("**Metode AAN**")
+        st.metric(f"Kewajiban Aktuaria (AL)", format_rp(v['AL_aan_now']), help="Target dana AAN.")
+        formula_expander("Lihat Detail Formula AL AAN", "widget_formula_al_aan", lambda: formulas.al_aan_lines(
+            x, r, v['PVFB_x_now'], v['NC_aan_x_now'], c('anuitas_now'), v['AL_aan_now']))
+    with col5_f:
+        st.markdown("**Metode PUC**")
+        st.metric(f"Kewajiban Aktuaria (AL)", format_rp(v['AL_puc_now']), help="Kewajiban aktuaria metode PUC.")
+        formula_expander("Lihat Detail Formula AL PUC", "widget_formula_al_puc", lambda: formulas.al_puc_lines(
+            e, x, r, v['PVFB_x_now'], v['AL_puc_now']))
+
+    st.divider()
+    
 # --- 5. NILAI AKHIR ---
-        st.subheader("5. Nilai Akhir Total Iuran (NA) di Usia Pensiun")
-        col1_na, col2_na, col3_na = st.columns(3)
-        with col1_na:
-            st.metric("Hasil NA EAN", format_rp(NA_ean_total), help="Akumulasi iuran EAN.")
-            with st.expander("Lihat Detail Formula NA EAN"):
-                st.markdown("**Metode Entry Age Normal**")
-                st.latex(r"{}^{EAN}NA = \sum_{x=e}^{r-1} \, {}^{EAN}(NC)_x (1+i)^{r-x}")
-                st.latex(rf"{{}}^{{EAN}}NA = \sum_{{x={x_entry_state}}}^{{{r_state-1}}} \, {{}}^{{EAN}}(NC)_x (1 + {format_latex_num(i_state)})^{{{r_state}-x}}")
-                term1_power = r_state - x_entry_state
-                term2_power = r_state - (x_entry_state + 1)
-                x_last = r_state - 1 # Usia terakhir sebelum pensiun
-                st.latex(rf"{{}}^{{EAN}}NA = {{}}^{{EAN}}(NC)_{{{x_entry_state}}} (1+{format_latex_num(i_state)})^{{{term1_power}}} + {{}}^{{EAN}}(NC)_{{{x_entry_state+1}}} (1+{format_latex_num(i_state)})^{{{term2_power}}} + \dots + {{}}^{{EAN}}(NC)_{{{x_last}}} (1+{format_latex_num(i_state)})^{{1}}")
-                st.latex(rf"{{}}^{{EAN}}NA = {format_calc(NA_ean_term_first)} + {format_calc(NA_ean_term_second)} + \dots + {format_calc(NA_ean_term_last)}")
-                st.latex(rf"{{}}^{{EAN}}NA = {format_calc(NA_ean_total)}")
-        with col2_na:
-            st.metric("Hasil NA AAN", format_rp(NA_aan_total), help="Akumulasi iuran AAN.")
-            with st.expander("Lihat Detail Formula NA AAN"):
-                st.markdown("**Metode Attained Age Normal**")
-                st.latex(r"{}^{AAN}NA = \sum_{x=e}^{r-1} \, {}^{AAN}(NC)_x (1+i)^{r-x}")
-                st.latex(rf"{{}}^{{AAN}}NA = \sum_{{x={x_entry_state}}}^{{{r_state-1}}} \, {{}}^{{AAN}}(NC)_x (1 + {format_latex_num(i_state)})^{{{r_state}-x}}")
-                term1_power = r_state - x_entry_state
-                term2_power = r_state - (x_entry_state + 1)
-                x_last = r_state - 1
-                st.latex(rf"{{}}^{{AAN}}NA = {{}}^{{AAN}}(NC)_{{{x_entry_state}}} (1+{format_latex_num(i_state)})^{{{term1_power}}} + {{}}^{{AAN}}(NC)_{{{x_entry_state+1}}} (1+{format_latex_num(i_state)})^{{{term2_power}}} + \dots + {{}}^{{AAN}}(NC)_{{{x_last}}} (1+{format_latex_num(i_state)})^{{1}}")
-                st.latex(rf"{{}}^{{AAN}}NA = {format_calc(NA_aan_term_first)} + {format_calc(NA_aan_term_second)} + \dots + {format_calc(NA_aan_term_last)}")
-                st.latex(rf"{{}}^{{AAN}}NA = {format_calc(NA_aan_total)}")
-        with col3_na:
-            # Hitung NA PUC
-            NA_puc_total = Decimal(0)
-            NA_puc_term_first = Decimal(0)
-            NA_puc_term_second = Decimal(0)
-            NA_puc_term_last = Decimal(0)
-            if not df_actuarial_full.empty:
-                for idx, row in df_actuarial_full.iterrows():
-                    umur_iuran = row['Usia']
-                    if umur_iuran < r_state:
-                        interest_factor = (Decimal(1) + i_state)**(r_state - umur_iuran)
-                        NA_puc_total += row['Iuran Normal (PUC)'] * interest_factor
-                        if idx == 0:
-                            NA_puc_term_first = row['Iuran Normal (PUC)'] * ((Decimal(1) + i_state)**(r_state - umur_iuran))
-                        elif idx == 1:
-                            NA_puc_term_second = row['Iuran Normal (PUC)'] * ((Decimal(1) + i_state)**(r_state - umur_iuran))
-                        elif umur_iuran == r_state - 1:
-                            NA_puc_term_last = row['Iuran Normal (PUC)'] * ((Decimal(1) + i_state)**1)
-            st.metric("Hasil NA PUC", format_rp(NA_puc_total), help="Akumulasi iuran PUC.")
-            with st.expander("Lihat Detail Formula NA PUC"):
-                st.markdown("**Metode Projected Unit Credit**")
-                st.latex(r"{}^{PUC}NA = \sum_{x=e}^{r-1} \, {}^{PUC}(NC)_x (1+i)^{r-x}")
-                st.latex(rf"{{}}^{{PUC}}NA = \sum_{{x={x_entry_state}}}^{{{r_state-1}}} \, {{}}^{{PUC}}(NC)_x (1 + {format_latex_num(i_state)})^{{{r_state}-x}}")
-                st.latex(rf"{{}}^{{PUC}}NA = {{}}^{{PUC}}(NC)_{{{x_entry_state}}} (1+{format_latex_num(i_state)})^{{{r_state-x_entry_state}}} + {{}}^{{PUC}}(NC)_{{{x_entry_state+1}}} (1+{format_latex_num(i_state)})^{{{r_state-(x_entry_state+1)}}} + \dots + {{}}^{{PUC}}(NC)_{{{r_state-1}}} (1+{format_latex_num(i_state)})^1")
-                st.latex(rf"{{}}^{{PUC}}NA = {format_calc(NA_puc_term_first)} + {format_calc(NA_puc_term_second)} + \dots + {format_calc(NA_puc_term_last)}")
-                st.latex(rf"{{}}^{{PUC}}NA = {format_calc(NA_puc_total)}")
-
-    # --- ISI TAB TABEL KOMUTASI ---
-    with tab_commutation:
-        with st.expander("ℹ️ Penjelasan Dataset"):
-            st.markdown("""
-            Dataset yang disajikan dalam tabel ini dibangun berdasarkan **Tabel Mortalita Indonesia (TMI) 2023** yang berfungsi sebagai standar acuan probabilitas kematian ($q_x$). Data $q_x$ bersifat statis dan spesifik untuk setiap jenis kelamin yang dipilih.
-            
-            Berbeda dengan data mentah tersebut, kolom-kolom fungsi komutasi ($l_x, D_x, N_x$) merupakan hasil perhitungan algoritma sistem yang bersifat dinamis. Nilai-nilai ini dihitung secara *real-time* dengan menggabungkan probabilitas mortalita dari TMI dan asumsi **Suku Bunga ($i$)** yang diinput pada parameter simulasi. Oleh karena itu, setiap perubahan pada tingkat suku bunga akan secara otomatis memperbarui faktor diskonto, yang kemudian mengubah nilai $D_x$ dan $N_x$ di seluruh tabel.
-            """)
-
-        with st.expander("📝 Keterangan"):
-            st.markdown(r"""
-            Berikut adalah penjelasan dari setiap kolom yang terdapat dalam tabel komutasi:
-            * **$x$ (Usia):** Usia peserta dalam tahun berjalan.
-            * **$q_x$ (Peluang Meninggal):** Probabilitas seseorang berusia $x$ akan meninggal dalam 1 tahun ke depan (Data TMI).
-            * **$p_x$ (Peluang Hidup):** Probabilitas seseorang berusia $x$ akan tetap hidup hingga usia $x+1$.
-                $$p_x = 1 - q_x$$
-            * **$l_x$ (Jumlah Orang Hidup):** Simulasi jumlah orang yang hidup pada usia $x$ dari kohort awal ($l_0=100.000$). Nilai ini dihitung berantai dari populasi tahun sebelumnya dikali peluang hidupnya.
-                $$l_x = l_{x-1} \times p_{x-1}$$
-            * **$D_x$ (Fungsi Komutasi Diskonto):** Nilai sekarang dari $l_x$ yang telah didiskon dengan suku bunga ($v$).
-                $$D_x = v^x \cdot l_x$$
-            * **$N_x$ (Akumulasi Komutasi):** Penjumlahan nilai $D_x$ dari usia $x$ hingga usia akhir tabel ($\omega$). Digunakan untuk menghitung anuitas.
-                $$N_x = D_x + D_{x+1} + \dots + D_{\omega}$$
-            """)
-
-
-        st.header("🧮 Tabel Komutasi")
-        st.caption(f"Tabel ini menunjukkan fungsi komutasi dasar (lx, Dx, Nx) yang dihitung berdasarkan TMI 2023 untuk **{jenis_kelamin_state}** dan suku bunga **{i_percent_state:.1f}%**.")
-        if comm_table is not None and not comm_table.empty:
-            cols_commutation = ['x', 'qx', 'px', 'lx', 'Dx', 'Nx']
-            df_comm_display = comm_table[cols_commutation].set_index('x')
-            
-            st.dataframe(df_comm_display.style.format({
-                'qx': '{:,.6f}',
-                'px': '{:,.6f}',
-                'lx': '{:,.2f}',
-                'Dx': '{:,.2f}',
-                'Nx': '{:,.2f}'
-            }), use_container_width=True, height=600)
-                        
+    # Suku NA berasal dari akumulasi yang sama dengan tab ringkasan (member_values), tanpa hitung ulang
+    st.subheader("5. Nilai Akhir Total Iuran (NA) di Usia Pensiun")
+    for kolom, metode in zip(st.columns(3), ('EAN', 'AAN', 'PUC')):
+        prefix = f"NA_{metode.lower()}"
+        with kolom:
+            st.metric(f"Hasil NA {metode}", format_rp(v[f'{prefix}_total']), help=f"Akumulasi iuran {metode}.")
+            formula_expander(f"Lihat Detail Formula NA {metode}", f"widget_formula_na_{metode.lower()}", lambda metode=metode, prefix=prefix: formulas.final_value_lines(
+                metode, e, r, i_state, v[f'{prefix}_term_first'], v[f'{prefix}_term_second'], v[f'{prefix}_term_last'], v[f'{prefix}_total']))
+
+# --- ISI TAB TABEL KOMUTASI ---
+@profiled_fragment
+def render_commutation():
+    comm_table = graph.get('comm_table')
+    with st.expander("ℹ️ Penjelasan Dataset"):
+        st.markdown(f"""
+        Dataset yang disajikan dalam tabel ini dibangun berdasarkan tabel mortalita **{table_label_state}** yang dipilih di sidebar (default: Tabel Mortalita Indonesia (TMI) 2023), yang berfungsi sebagai standar acuan probabilitas kematian ($q_x$). Data $q_x$ bersifat statis dan spesifik untuk setiap jenis kelamin yang dipilih.
+        
+        Berbeda dengan data mentah tersebut, kolom-kolom fungsi komutasi ($l_x, D_x, N_x$) merupakan hasil perhitungan algoritma sistem yang bersifat dinamis. Nilai-nilai ini dihitung secara *real-time* dengan menggabungkan probabilitas mortalita tersebut dan asumsi **Suku Bunga ($i$)** yang diinput pada parameter simulasi. Oleh karena itu, setiap perubahan pada tingkat suku bunga akan secara otomatis memperbarui faktor diskonto, yang kemudian mengubah nilai $D_x$ dan $N_x$ di seluruh tabel.
+        """)
+
+    with st.expander("📝 Keterangan"):
+        st.markdown(r"""
+        Berikut adalah penjelasan dari setiap kolom yang terdapat dalam tabel komutasi:
+        * **$x$ (Usia):** Usia peserta dalam tahun berjalan.
+        * **$q_x$ (Peluang Meninggal):** Probabilitas seseorang berusia $x$ akan meninggal dalam 1 tahun ke depan (data tabel mortalita).
+        * **$p_x$ (Peluang Hidup):** Probabilitas seseorang berusia $x$ akan tetap hidup hingga usia $x+1$.
+            $$p_x = 1 - q_x$$
+        * **$l_x$ (Jumlah Orang Hidup):** Simulasi jumlah orang yang hidup pada usia $x$ dari kohort awal ($l_0=100.000$). Nilai ini dihitung berantai dari populasi tahun sebelumnya dikali peluang hidupnya.
+            $$l_x = l_{x-1} \times p_{x-1}$$
+        * **$D_x$ (Fungsi Komutasi Diskonto):** Nilai sekarang dari $l_x$ yang telah didiskon dengan suku bunga ($v$).
+            $$D_x = v^x \cdot l_x$$
+        * **$N_x$ (Akumulasi Komutasi):** Penjumlahan nilai $D_x$ dari usia $x$ hingga usia akhir tabel ($\omega$). Digunakan untuk menghitung anuitas.
+            $$N_x = D_x + D_{x+1} + \dots + D_{\omega}$$
+        """)
+
+
+    st.header("🧮 Tabel Komutasi")
+    st.caption(f"Tabel ini menunjukkan fungsi komutasi dasar (lx, Dx, Nx) yang dihitung berdasarkan {table_label_state} untuk **{jenis_kelamin_state}** dan suku bunga **{i_percent_state:.1f}%**.")
+    if comm_table is not None and not comm_table.empty:
+        cols_commutation = ['x', 'qx', 'px', 'lx', 'Dx', 'Nx']
+        df_comm_display = comm_table[cols_commutation].set_index('x')
+        
+        with stage('tabel_komutasi'):
+            data_grid(df_comm_display, {
+                'qx': '%,.6f',
+                'px': '%,.6f',
+                'lx': '%,.2f',
+                'Dx': '%,.2f',
+                'Nx': '%,.2f'
+            }, height=600)
+                    
+    else:
+        st.warning("Tabel komutasi belum tersedia.")
+
+# --- ISI TAB SENSITIVITAS ---
+@profiled_fragment
+def render_sensitivity():
+    st.header("🌡️ Sensitivitas Suku Bunga (i) & Kenaikan Gaji (s)")
+    st.caption(f"Seluruh grid (i, s) dihitung sekaligus untuk peserta di sidebar (usia valuasi {x_now_state}), tanpa perlu menggeser slider berulang kali.")
+
+    col_sens1, col_sens2 = st.columns(2)
+    with col_sens1:
+        sens_metric = st.selectbox("Metrik", options=list(sensitivity.SENSITIVITY_METRICS), index=4, key="widget_sensitivity_metric")
+        sens_step = st.select_slider("Langkah Grid (%)", options=[0.1, 0.2, 0.5, 1.0], value=0.1, key="widget_sensitivity_step")
+    with col_sens2:
+        sens_i_range = st.slider("Rentang Suku Bunga (i) %", min_value=0.0, max_value=15.0, value=(0.0, 15.0), step=0.1, key="widget_sensitivity_i_range")
+        sens_s_range = st.slider("Rentang Kenaikan Gaji (s) %", min_value=0.0, max_value=15.0, value=(0.0, 15.0), step=0.1, key="widget_sensitivity_s_range")
+
+    # Grid dalam persen dengan langkah tetap, lalu diubah ke desimal (dibulatkan agar cocok dengan grid kubus)
+    sens_rates = tuple(np.round(np.arange(sens_i_range[0], sens_i_range[1] + 1e-9, sens_step) / 100, 4).tolist())
+    sens_increases = tuple(np.round(np.arange(sens_s_range[0], sens_s_range[1] + 1e-9, sens_step) / 100, 4).tolist())
+    sens_target = target_benefit_active_state
+
+    with stage('sensitivitas', caches=[sensitivity.sensitivity_grid]):
+        sens_grid = sensitivity.sensitivity_grid(
+            jenis_kelamin_state, x_entry_state, x_now_state, r_state, k_state, gaji_masuk_state,
+            sens_rates, sens_increases, target_benefit=sens_target, table_id=table_id_state)
+    df_sens = sensitivity.grid_to_frame(sens_grid, sens_rates, sens_increases)[['Suku Bunga (i) %', 'Kenaikan Gaji (s) %', sens_metric]]
+    st.caption(f"Grid {len(sens_rates)} x {len(sens_increases)} = {len(df_sens):,} titik.")
+
+    # Label sumbu hanya pada bilangan bulat persen agar tidak padat
+    sens_i_labels = [v for v in df_sens['Suku Bunga (i) %'].unique() if float(v).is_integer()]
+    sens_s_labels = [v for v in df_sens['Kenaikan Gaji (s) %'].unique() if float(v).is_integer()]
+    sens_x = alt.X('Suku Bunga (i) %:O', axis=alt.Axis(values=sens_i_labels, labelAngle=0))
+    sens_y = alt.Y('Kenaikan Gaji (s) %:O', sort='descending', axis=alt.Axis(values=sens_s_labels))
+    sens_tooltip = [
+        alt.Tooltip('Suku Bunga (i) %'),
+        alt.Tooltip('Kenaikan Gaji (s) %'),
+        alt.Tooltip(sens_metric, format=',.2f', title=f"{sens_metric} (Rp)"),
+    ]
+    df_sens_now = pd.DataFrame({
+        'Suku Bunga (i) %': [round(float(i_percent_state), 4)],
+        'Kenaikan Gaji (s) %': [round(float(s_percent_state), 4)],
+    })
+    sens_marker = alt.Chart(df_sens_now).mark_point(shape='cross', size=200, color='white', filled=True).encode(x=sens_x, y=sens_y)
+
+    st.markdown("##### Heatmap")
+    chart_heatmap = alt.Chart(df_sens).mark_rect().encode(
+        x=sens_x, y=sens_y,
+        color=alt.Color(sens_metric, type='quantitative', scale=alt.Scale(scheme='viridis'), title='Rp'),
+        tooltip=sens_tooltip,
+    ).properties(title=f"{sens_metric} terhadap i dan s", height=500)
+    st.altair_chart(chart_heatmap + sens_marker, use_container_width=True)
+
+    st.markdown("##### Kontur")
+    chart_contour = alt.Chart(df_sens).mark_rect().encode(
+        x=sens_x, y=sens_y,
+        color=alt.Color(sens_metric, type='quantitative', scale=alt.Scale(type='quantize', nice=True, scheme='viridis'), title='Rp'),
+        tooltip=sens_tooltip,
+    ).properties(title=f"Pita nilai {sens_metric} (kontur terisi)", height=500)
+    st.altair_chart(chart_contour + sens_marker, use_container_width=True)
+    st.caption("Tanda silang menunjukkan asumsi i dan s yang sedang dipilih di sidebar.")
+
+    st.markdown("##### Durasi, Konveksitas & PV01")
+    df_rate_sens = graph.get('rate_sens')
+    data_grid(df_rate_sens, RATE_SENSITIVITY_FORMAT)
+    st.caption(f"Dihitung analitis dari turunan Dx dan Nx terhadap i (bukan dengan menggeser suku bunga) pada i = {i_percent_state:.1f}%. Durasi Modifikasi = -V'/V, Konveksitas = V''/V, PV01 = penurunan nilai jika i naik 1 basis poin. Iuran normal ikut dihitung ulang pada suku bunga baru, sama seperti menggeser slider.")
+
+# --- ISI TAB VALUASI PORTOFOLIO ---
+@profiled_fragment
+def render_portfolio():
+    st.header("👥 Valuasi Portofolio Peserta")
+    st.caption(f"Menilai seluruh peserta dana pensiun sekaligus dengan asumsi sidebar: Suku Bunga (i) = **{i_percent_state:.1f}%**, Kenaikan Gaji (s) = **{s_percent_state:.1f}%**, Proporsi Gaji (k) = **{k_percent_state:.1f}%**.")
+
+    with st.expander("📝 Format File Peserta"):
+        st.markdown(f"""
+        Unggah file **CSV** atau **XLSX** dengan satu baris per peserta dan kolom berikut:
+        * **jenis_kelamin**: `Laki-Laki` / `Perempuan` (atau `L` / `P`)
+        * **usia_masuk**: Usia Masuk (e), 18-60
+        * **usia_valuasi**: Usia Valuasi (x), tidak lebih kecil dari usia masuk
+        * **gaji**: Gaji Pokok Awal (Se) tahunan, minimal Rp 1.000.000
+        * **usia_pensiun** *(opsional)*: Usia Pensiun (r), 55-65. Jika kosong dipakai nilai sidebar ({r_state}).
+
+        Semua kolom usia berupa bilangan bulat (tahun).
+        """)
+
+    uploaded_members = st.file_uploader("File Peserta", type=["csv", "xlsx"], key="widget_member_file",
+                                        on_change=store_upload, args=("widget_member_file", "portfolio_upload"))
+    st.number_input("Jumlah Proses", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1, key="widget_portfolio_workers",
+                    help="Peserta dibagi rata ke beberapa proses (minimal 25.000 peserta per proses); hanya mempercepat portofolio besar. Hasil identik.")
+    if uploaded_members is None and "portfolio_upload" in st.session_state:
+        st.caption(f"File aktif: **{st.session_state.portfolio_upload[0]}** (tersimpan di sesi; unggah file lain untuk mengganti).")
+        st.button("Hapus File Peserta", key="clear_portfolio_btn", on_click=forget_upload, args=("portfolio_upload",))
+
+    portfolio_result = active_portfolio(show_errors=True)
+    if portfolio_result is not None:
+        df_portfolio, portfolio_totals, df_ditolak, df_portfolio_rate_sens, _ = portfolio_result
+        if not df_ditolak.empty:
+            st.warning(f"{len(df_ditolak):,} peserta tidak valid dan tidak diikutkan dalam valuasi.")
+            with st.expander("Lihat Peserta Tidak Valid"):
+                data_grid(df_ditolak)
+
+        if not df_portfolio.empty:
+            st.subheader(f"Total Dana ({portfolio_totals['Jumlah Peserta']:,} Peserta)")
+            col_p1, col_p2, col_p3 = st.columns(3)
+            with col_p1:
+                st.metric("Total PVFB", format_rp(portfolio_totals['PVFB']))
+            with col_p2:
+                st.metric("Total Manfaat Pensiun Tahunan (Br)", format_rp(portfolio_totals['Manfaat Pensiun (Br)']))
+
+            col_p4, col_p5, col_p6 = st.columns(3)
+            with col_p4:
+                st.markdown("##### Entry Age Normal (EAN)")
+                st.metric("Total Iuran Normal (NC)", format_rp(portfolio_totals['Iuran Normal (EAN)']))
+                st.metric("Total Kewajiban Aktuaria (AL)", format_rp(portfolio_totals['Kewajiban Aktuaria (EAN)']))
+            with col_p5:
+                st.markdown("##### Attained Age Normal (AAN)")
+                st.metric("Total Iuran Normal (NC)", format_rp(portfolio_totals['Iuran Normal (AAN)']))
+                st.metric("Total Kewajiban Aktuaria (AL)", format_rp(portfolio_totals['Kewajiban Aktuaria (AAN)']))
+            with col_p6:
+                st.markdown("##### Projected Unit Credit (PUC)")
+                st.metric("Total Iuran Normal (NC)", format_rp(portfolio_totals['Iuran Normal (PUC)']))
+                st.metric("Total Kewajiban Aktuaria (AL)", format_rp(portfolio_totals['Kewajiban Aktuaria (PUC)']))
+
+            st.markdown("##### Sensitivitas Suku Bunga Total")
+            data_grid(df_portfolio_rate_sens, RATE_SENSITIVITY_FORMAT)
+
+            st.divider()
+            st.markdown("##### Hasil per Peserta")
+            data_grid(df_portfolio, dict.fromkeys(['gaji', 'Manfaat Pensiun (Br)', *portfolio.MEMBER_VALUE_COLUMNS], tables.CURRENCY_FORMAT), height=600)
+            # CSV baru dibentuk saat tombol diklik, bukan di setiap rerun
+            st.download_button(
+                "Unduh Hasil (CSV)", data=lambda: df_portfolio.to_csv(index=False).encode("utf-8"),
+                file_name="valuasi_portofolio.csv", mime="text/csv", key="download_portfolio_btn")
         else:
-            st.warning("Tabel komutasi belum tersedia.")
-
-else:
-    st.error("❌ Gagal memuat data mortalitas internal. Perhitungan tidak dapat dilanjutkan.")
+            st.warning("Tidak ada peserta valid untuk divaluasi.")
+
+# --- ISI TAB SIMULASI STOKASTIK ---
+@profiled_fragment
+def render_stochastic():
+    st.header("🎲 Simulasi Suku Bunga Stokastik")
+    st.caption(f"Distribusi PVFB dan Kewajiban Aktuaria jika suku bunga tahunan mengikuti lintasan acak. Iuran normal tetap memakai basis deterministik (suku bunga sidebar); mortalita mengikuti {table_label_state}.")
+
+    stoch_object = st.radio("Objek Valuasi", options=["Peserta (sidebar)", "Portofolio (tab Valuasi Portofolio)"], horizontal=True, key="widget_stochastic_object")
+    stoch_model_label = st.selectbox("Model Suku Bunga", options=["Vasicek", "CIR", "Bootstrap Riwayat Imbal Hasil"], key="widget_stochastic_model")
+    stoch_model = {"Vasicek": "vasicek", "CIR": "cir", "Bootstrap Riwayat Imbal Hasil": "bootstrap"}[stoch_model_label]
+
+    stoch_params = {}
+    if stoch_model == "bootstrap":
+        stoch_history_text = st.text_area("Riwayat Imbal Hasil Tahunan (%)", value="", key="widget_stochastic_history",
+            help="Daftar imbal hasil tahunan dalam persen, dipisahkan koma. Setiap tahun lintasan diambil acak (dengan pengembalian) dari daftar ini.")
+        try:
+            stoch_params['history'] = [float(v) / 100 for v in stoch_history_text.replace(';', ',').split(',') if v.strip()]
+        except ValueError:
+            st.error("Riwayat imbal hasil harus berupa angka yang dipisahkan koma.")
+            stoch_params['history'] = []
+    else:
+        col_st1, col_st2, col_st3, col_st4 = st.columns(4)
+        with col_st1:
+            stoch_params['r0'] = st.number_input("Suku Bunga Awal r0 (%)", value=float(i_percent_state), step=0.1, key="widget_stochastic_r0") / 100
+        with col_st2:
+            stoch_params['b'] = st.number_input("Rata-rata Jangka Panjang b (%)", value=float(i_percent_state), step=0.1, key="widget_stochastic_b") / 100
+        with col_st3:
+            stoch_params['a'] = st.number_input("Kecepatan Kembali a", value=0.1, min_value=0.0, max_value=1.0, step=0.01, key="widget_stochastic_a")
+        with col_st4:
+            stoch_params['sigma'] = st.number_input("Volatilitas σ (%)" if stoch_model == "vasicek" else "Volatilitas σ", value=1.0 if stoch_model == "vasicek" else 0.05,
+                min_value=0.0, step=0.01, key=f"widget_stochastic_sigma_{stoch_model}") / (100 if stoch_model == "vasicek" else 1)
+
+    col_st5, col_st6, col_st7 = st.columns(3)
+    with col_st5:
+        stoch_n_paths = st.select_slider("Jumlah Lintasan", options=[10_000, 50_000, 100_000, 500_000, 1_000_000], value=10_000, key="widget_stochastic_paths")
+    with col_st6:
+        stoch_workers = st.number_input("Jumlah Proses", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1, step=1, key="widget_stochastic_workers")
+    with col_st7:
+        stoch_seed = st.number_input("Seed", min_value=0, value=2023, step=1, key="widget_stochastic_seed")
+
+    # Peserta yang dinilai: satu baris dari sidebar, atau seluruh hasil tab portofolio
+    if stoch_object.startswith("Peserta"):
+        v = graph.get('member_values')
+        B_r, NC_ilp_now, NC_aan_x_now = v['B_r'], v['NC_ean_now'], v['NC_aan_x_now']
+        stoch_valued_key = (jenis_kelamin_state, x_entry_state, x_now_state, r_state, float(B_r), float(NC_ilp_now), float(NC_aan_x_now))
+        df_stoch_valued = pd.DataFrame({
+            'jenis_kelamin': [jenis_kelamin_state], 'usia_masuk': [x_entry_state], 'usia_valuasi': [x_now_state],
+            'usia_pensiun': [r_state], 'Manfaat Pensiun (Br)': [float(B_r)],
+            'Iuran Normal (EAN)': [float(NC_ilp_now)], 'Iuran Normal (AAN)': [float(NC_aan_x_now)],
+        })
+    else:
+        df_stoch_valued, stoch_valued_key = portfolio_members()
+
+    stoch_signature = (stoch_object, stoch_model, tuple(sorted((k_, tuple(v_) if isinstance(v_, list) else v_) for k_, v_ in stoch_params.items())),
+                       stoch_n_paths, stoch_seed, str(i_state), table_id_state, stoch_valued_key)
+
+    if df_stoch_valued is None or df_stoch_valued.empty:
+        st.info("Unggah file peserta di tab **Valuasi Portofolio** untuk mensimulasikan portofolio.")
+    elif stoch_model == "bootstrap" and not stoch_params['history']:
+        st.info("Isi riwayat imbal hasil tahunan untuk model bootstrap.")
+    elif st.button("Jalankan Simulasi", type="primary", key="run_stochastic_btn"):
+        with st.spinner(f"Mensimulasikan {stoch_n_paths:,} lintasan..."):
+            stoch_W = stochastic.liability_weights(df_stoch_valued, i_state, table_id_state)
+            stoch_values = stochastic.simulate(stoch_W, stoch_model, stoch_params, n_paths=stoch_n_paths, workers=int(stoch_workers), seed=int(stoch_seed))
+            # Session hanya menyimpan ringkasan dan sampel histogram; matriks lintasan penuh (hingga ~32 MB) tidak ditahan
+            st.session_state['stochastic_result'] = (
+                stoch_signature,
+                stochastic.summarize(stoch_values, stochastic.deterministic_values(stoch_W, i_state)),
+                stoch_values[:STOCHASTIC_SAMPLE_SIZE].copy(),
+            )
+            del stoch_values
+
+    stoch_result = st.session_state.get('stochastic_result')
+    if stoch_result is not None and stoch_result[0] == stoch_signature:
+        _, stoch_summary, stoch_sample_values = stoch_result
+        st.subheader("Ringkasan Distribusi")
+        data_grid(stoch_summary.T, tables.CURRENCY_FORMAT)
+        st.caption("Kolom **Deterministik** memakai suku bunga datar sidebar (volatilitas nol). VaR = persentil 99,5% dikurangi rata-rata; CTE = rata-rata lintasan di atas persentil 99,5%.")
+
+        stoch_metric = st.selectbox("Distribusi Metrik", options=list(stochastic.STOCHASTIC_METRICS), key="widget_stochastic_metric")
+        # Grafik cukup memakai sampel agar tetap ringan
+        stoch_sample = stoch_sample_values[:, stochastic.STOCHASTIC_METRICS.index(stoch_metric)]
+        chart_stoch = alt.Chart(pd.DataFrame({stoch_metric: stoch_sample})).mark_bar().encode(
+            x=alt.X(stoch_metric, bin=alt.Bin(maxbins=60), title=f"{stoch_metric} (Rp)"),
+            y=alt.Y('count()', title='Jumlah Lintasan'),
+        ).properties(title=f"Histogram {stoch_metric} ({len(stoch_sample):,} lintasan pertama)")
+        st.altair_chart(chart_stoch, use_container_width=True)
+
+# --- ISI TAB PROYEKSI DANA ---
+@profiled_fragment
+def render_projection():
+    st.header("📆 Proyeksi Dana Kelompok Terbuka")
+    st.caption(f"Proyeksi tahunan iuran normal, manfaat dibayar, Kewajiban Aktuaria dan aset per metode. Peserta dimajukan setiap tahun: pensiun pada usia r (manfaat sekaligus), meninggal sesuai {table_label_state}, gaji naik s per tahun, dan peserta baru mengikuti profil (gender, usia masuk, usia pensiun, gaji) peserta awal.")
+
+    proj_object = st.radio("Peserta Awal", options=["Peserta (sidebar)", "Portofolio (tab Valuasi Portofolio)"], horizontal=True, key="widget_projection_object")
+    col_pr1, col_pr2, col_pr3 = st.columns(3)
+    with col_pr1:
+        proj_years = st.slider("Lama Proyeksi (tahun)", min_value=10, max_value=100, value=projection.DEFAULT_PROJECTION_YEARS, step=5, key="widget_projection_years")
+    with col_pr2:
+        proj_policy_label = st.selectbox("Peserta Baru", options=["Ganti peserta yang keluar", "Jumlah tetap per tahun", "Tanpa peserta baru (kelompok tertutup)"], key="widget_projection_policy")
+        proj_policy = {"Ganti peserta yang keluar": "ganti", "Jumlah tetap per tahun": "tetap", "Tanpa peserta baru (kelompok tertutup)": "tertutup"}[proj_policy_label]
+    with col_pr3:
+        proj_new_entrants = st.number_input("Peserta Baru per Tahun", min_value=0, value=100, step=10, key="widget_projection_new_entrants", disabled=proj_policy != "tetap")
+    col_pr4, col_pr5, col_pr6 = st.columns(3)
+    with col_pr4:
+        proj_entrant_growth = st.number_input("Kenaikan Gaji Awal Peserta Baru (%/tahun)", value=float(s_percent_state), step=0.1, key="widget_projection_entrant_growth")
+    with col_pr5:
+        proj_asset_return = st.number_input("Imbal Hasil Aset (%/tahun)", value=float(i_percent_state), step=0.1, key="widget_projection_asset_return")
+    with col_pr6:
+        proj_funded = st.toggle("Aset Awal = AL (pendanaan penuh)", value=True, key="widget_projection_funded")
+        proj_initial_assets = None if proj_funded else st.number_input("Aset Awal (Rp)", min_value=0, value=0, step=1_000_000, key="widget_projection_initial_assets")
+
+    if proj_object.startswith("Peserta"):
+        proj_members_key = (jenis_kelamin_state, x_entry_state, x_now_state, r_state, int(gaji_masuk_state))
+        df_proj_members = pd.DataFrame({
+            'jenis_kelamin': [jenis_kelamin_state], 'usia_masuk': [x_entry_state], 'usia_valuasi': [x_now_state],
+            'usia_pensiun': [r_state], 'gaji': [float(gaji_masuk_state)],
+        })
+        if use_target_benefit_state:
+            st.caption("Proyeksi memakai manfaat dari formula gaji (k, s, Se), bukan target total manfaat.")
+    else:
+        df_proj_members, proj_members_key = portfolio_members()
+
+    proj_signature = (proj_object, proj_members_key, str(i_state), str(k_state), str(s_state), proj_years, proj_policy,
+                      proj_new_entrants, proj_entrant_growth, proj_asset_return, proj_initial_assets, table_id_state)
+
+    if df_proj_members is None or df_proj_members.empty:
+        st.info("Unggah file peserta di tab **Valuasi Portofolio** untuk memproyeksikan portofolio.")
+    elif st.button("Jalankan Proyeksi", type="primary", key="run_projection_btn"):
+        with st.spinner(f"Memproyeksikan {len(df_proj_members):,} peserta selama {proj_years} tahun..."), stage('proyeksi'):
+            df_projection = projection.project_fund(
+                df_proj_members, i_state, k_state, s_state, years=proj_years, entrant_policy=proj_policy,
+                new_entrants=proj_new_entrants, entrant_salary_growth=proj_entrant_growth / 100,
+                asset_return=proj_asset_return / 100, initial_assets=proj_initial_assets, table_id=table_id_state)
+            st.session_state['projection_result'] = (proj_signature, df_projection)
+
+    proj_result = st.session_state.get('projection_result')
+    if proj_result is not None and proj_result[0] == proj_signature:
+        df_projection = proj_result[1]
+        proj_method = st.radio("Metode", options=list(projection.PROJECTION_METHODS), horizontal=True, key="widget_projection_method")
+
+        df_proj_flow = df_projection.melt(id_vars='Tahun', value_vars=[f'Iuran Normal ({proj_method})', 'Manfaat Dibayar'], var_name='Arus Kas', value_name='Nilai')
+        chart_proj_flow = alt.Chart(df_proj_flow).mark_line().encode(
+            x=alt.X('Tahun:Q', title='Tahun Proyeksi'),
+            y=alt.Y('Nilai:Q', title='Nilai (Rp)'),
+            color=alt.Color('Arus Kas:N', title='Arus Kas'),
+            tooltip=['Tahun', 'Arus Kas', alt.Tooltip('Nilai', format=',.0f')],
+        ).properties(title=f"Iuran Normal ({proj_method}) dan Manfaat Dibayar per Tahun")
+        df_proj_fund = df_projection.melt(id_vars='Tahun', value_vars=[f'Kewajiban Aktuaria ({proj_method})', f'Aset ({proj_method})'], var_name='Posisi', value_name='Nilai')
+        chart_proj_fund = alt.Chart(df_proj_fund).mark_line().encode(
+            x=alt.X('Tahun:Q', title='Tahun Proyeksi'),
+            y=alt.Y('Nilai:Q', title='Nilai (Rp)'),
+            color=alt.Color('Posisi:N', title='Posisi'),
+            tooltip=['Tahun', 'Posisi', alt.Tooltip('Nilai', format=',.0f')],
+        ).properties(title=f"Kewajiban Aktuaria dan Aset ({proj_method}) di Awal Tahun")
+        col_pr7, col_pr8 = st.columns(2)
+        with col_pr7:
+            st.altair_chart(chart_proj_flow, use_container_width=True)
+        with col_pr8:
+            st.altair_chart(chart_proj_fund, use_container_width=True)
+
+        st.markdown("##### Proyeksi per Tahun")
+        st.dataframe(df_projection, use_container_width=True, hide_index=True)
+        st.caption("Jumlah peserta adalah nilai harapan (kematian diperhitungkan sebagai peluang), sehingga dapat berupa pecahan. Aset dan AL diukur di awal tahun setelah pembayaran manfaat dan masuknya peserta baru; iuran hanya iuran normal (tanpa amortisasi defisit).")
+        st.download_button(
+            "Unduh Proyeksi (CSV)", data=lambda: df_projection.to_csv(index=False).encode("utf-8"),
+            file_name="proyeksi_dana.csv", mime="text/csv", key="download_projection_btn")
+
+# --- ISI TAB SOLVER ---
+@profiled_fragment
+def render_solver():
+    if st.session_state.pop('rerun_app', False):
+        st.rerun()
+    st.header("🎯 Solver Invers")
+    st.caption("Mencari Proporsi Gaji (k), Gaji Pokok Awal (Se), Target Manfaat (Br) atau Suku Bunga (i) yang memenuhi sasaran, tanpa menggeser slider berulang kali. NC dan AL linear terhadap Br sehingga k, Se dan Br diperoleh langsung; suku bunga dicari dengan root finding pada rentang slider 0-15%.")
+
+    solver_object = st.radio("Objek", options=["Peserta (sidebar)", "Portofolio (tab Valuasi Portofolio)"], horizontal=True, key="widget_solver_object")
+    solver_single = solver_object.startswith("Peserta")
+    solver_unknown_labels = {
+        'k': "Proporsi Gaji (k)",
+        'gaji': "Gaji Pokok Awal (Se)" if solver_single else "Faktor Pengali Gaji",
+        'manfaat': "Target Manfaat Pensiun (Br)" if solver_single else "Target Manfaat Pensiun (Br) Seragam",
+        'i': "Suku Bunga (i)",
+    }
+    solver_goal_labels = {'nc': "Anggaran Iuran Normal (NC)", 'al': "Batas Kewajiban Aktuaria (AL)", 'rasio': "Rasio Penggantian (Br / S_{r-1})"}
+    col_sv1, col_sv2, col_sv3 = st.columns(3)
+    with col_sv1:
+        solver_unknown = st.selectbox("Cari", options=list(solver.SOLVER_UNKNOWNS), format_func=solver_unknown_labels.get, key="widget_solver_unknown")
+    with col_sv2:
+        solver_goal = st.selectbox("Sasaran", options=list(solver.SOLVER_GOALS), format_func=solver_goal_labels.get, key="widget_solver_goal")
+    with col_sv3:
+        solver_method = st.selectbox("Metode", options=list(solver.SOLVER_METHODS), key="widget_solver_method", disabled=solver_goal == 'rasio')
+    if solver_goal == 'rasio':
+        solver_target = st.number_input("Target Rasio Penggantian (%)", min_value=0.0, value=80.0, step=1.0, key="widget_solver_target_ratio") / 100
+    else:
+        solver_target = st.number_input(f"Target {solver_goal_labels[solver_goal]} (Rp)", min_value=0, value=10_000_000, step=1_000_000, format="%d", key="widget_solver_target")
 
-    st.warning("Pastikan data TMI sudah dimuat dengan benar di dalam skrip Python.")
\ No newline at end of file
+    if solver_single:
+        df_solver_members = pd.DataFrame({
+            'jenis_kelamin': [jenis_kelamin_state], 'usia_masuk': [x_entry_state], 'usia_valuasi': [x_now_state],
+            'usia_pensiun': [r_state], 'gaji': [float(gaji_masuk_state)],
+        })
+        solver_target_benefit = target_benefit_active_state
+    else:
+        df_solver_members, _ = portfolio_members()
+        solver_target_benefit = None
+
+    if df_solver_members is None or df_solver_members.empty:
+        st.info("Unggah file peserta di tab **Valuasi Portofolio** untuk mencari solusi portofolio.")
+    elif st.button("Cari Solusi", type="primary", key="run_solver_btn"):
+        try:
+            with stage('solver'):
+                solver_result = solver.solve(
+                    df_solver_members, i_state, k_state, s_state, solver_unknown, solver_goal, solver_target,
+                    solver_method, solver_target_benefit, table_id_state)
+        except ValueError as e:
+            st.error(f"Solusi tidak ditemukan: {e}")
+        else:
+            def format_solver_value(variabel, nilai):
+                if variabel in ('k', 'i'):
+                    return f"{nilai * 100:,.4f}%"
+                if variabel == 'gaji' and not solver_single:
+                    return f"{nilai:,.6f} x"
+                return format_rp(nilai)
+
+            col_sv4, col_sv5, col_sv6 = st.columns(3)
+            with col_sv4:
+                st.metric(solver_unknown_labels[solver_unknown], format_solver_value(solver_unknown, solver_result['nilai']),
+                          delta=format_solver_value(solver_unknown, solver_result['nilai'] - solver_result['nilai_awal']), delta_color="off")
+            with col_sv5:
+                st.metric("Nilai Saat Ini", format_solver_value(solver_unknown, solver_result['nilai_awal']))
+            with col_sv6:
+                st.metric("Sasaran pada Solusi", f"{solver_result['hasil'] * 100:,.4f}%" if solver_goal == 'rasio' else format_rp(solver_result['hasil']))
+            st.caption(f"{solver_result['evaluasi']:,} evaluasi valuasi untuk {len(df_solver_members):,} peserta.")
+            if solver_unknown == 'k' and solver_result['nilai'] > 0.10:
+                st.warning("Solusi k melebihi batas slider (10%); saat diterapkan ke sidebar nilainya dipotong menjadi 10%.")
+            if solver_single:
+                st.button("Terapkan ke Sidebar", key="apply_solver_btn", on_click=apply_solver_result, args=(solver_unknown, solver_result['nilai']),
+                          help="Nilai dibulatkan ke langkah input sidebar (0,1% untuk k dan i, Rp 1 untuk gaji dan target manfaat).")
+
+# --- ISI TAB ROLL-FORWARD ---
+@profiled_fragment
+def render_rollforward():
+    st.header("🔁 Roll-Forward & Analisis Keuntungan/Kerugian")
+    st.caption("Membandingkan dua snapshot peserta berjarak satu tahun: AL yang diharapkan dari snapshot awal dibandingkan dengan AL aktual snapshot akhir, lalu selisihnya diuraikan per sumber (mortalitas, gaji, data, peserta baru, perubahan suku bunga).")
+    with st.expander("📝 Format File Snapshot"):
+        st.markdown(f"""
+        Format sama dengan file di tab **Valuasi Portofolio**, ditambah kolom **{rollforward.ROLLFORWARD_ID_COLUMN}** untuk mencocokkan peserta antar snapshot.
+        * Peserta awal yang tidak ada di snapshot akhir dianggap **pensiun** jika usia valuasi + 1 mencapai usia pensiun, selain itu **meninggal**.
+        * Peserta akhir yang tidak ada di snapshot awal dianggap **peserta baru**.
+        """)
+
+    col_rf1, col_rf2, col_rf3 = st.columns(3)
+    with col_rf1:
+        st.file_uploader("Snapshot Awal", type=["csv", "xlsx"], key="widget_rollforward_start",
+                         on_change=store_upload, args=("widget_rollforward_start", "rollforward_upload_start"))
+    with col_rf2:
+        st.file_uploader("Snapshot Akhir", type=["csv", "xlsx"], key="widget_rollforward_end",
+                         on_change=store_upload, args=("widget_rollforward_end", "rollforward_upload_end"))
+    with col_rf3:
+        rf_i_akhir_percent = st.number_input("Suku Bunga Valuasi Akhir (%)", min_value=0.0, max_value=15.0, value=float(i_percent_state), step=0.1, key="widget_rollforward_rate")
+
+    rf_upload_awal = st.session_state.get("rollforward_upload_start")
+    rf_upload_akhir = st.session_state.get("rollforward_upload_end")
+    if rf_upload_awal is None or rf_upload_akhir is None:
+        st.info("Unggah snapshot awal dan akhir untuk menghitung roll-forward.")
+    else:
+        if st.session_state.get("widget_rollforward_start") is None or st.session_state.get("widget_rollforward_end") is None:
+            st.caption(f"Snapshot aktif: **{rf_upload_awal[0]}** dan **{rf_upload_akhir[0]}** (tersimpan di sesi; unggah file lain untuk mengganti).")
+        (rf_name_awal, rf_bytes_awal, rf_digest_awal), (rf_name_akhir, rf_bytes_akhir, rf_digest_akhir) = rf_upload_awal, rf_upload_akhir
+        rf_result = None
+        try:
+            with stage('roll_forward'):
+                rf_result = roll_forward_files(
+                    rf_digest_awal, rf_name_awal, rf_bytes_awal, rf_digest_akhir, rf_name_akhir, rf_bytes_akhir,
+                    r_state, i_state, k_state, s_state, Decimal(str(rf_i_akhir_percent)) / Decimal(100), table_id_state)
+        except ValueError as e:
+            st.error(f"Roll-forward gagal: {e}")
+
+        if rf_result is not None:
+            df_rf, df_rf_members, rf_ditolak_awal, rf_ditolak_akhir = rf_result
+            if rf_ditolak_awal or rf_ditolak_akhir:
+                st.warning(f"Peserta tidak valid diabaikan: {rf_ditolak_awal:,} di snapshot awal, {rf_ditolak_akhir:,} di snapshot akhir.")
+            rf_status = df_rf_members['status'].value_counts()
+            col_rf4, col_rf5, col_rf6, col_rf7 = st.columns(4)
+            for col_rf, rf_label in zip((col_rf4, col_rf5, col_rf6, col_rf7), ('aktif', 'pensiun', 'meninggal', 'baru')):
+                with col_rf:
+                    st.metric(f"Peserta {rf_label.capitalize()}", f"{int(rf_status.get(rf_label, 0)):,}")
+
+            st.markdown("##### Uraian Perubahan Kewajiban Aktuaria")
+            data_grid(df_rf, tables.CURRENCY_FORMAT)
+
+            rf_method = st.radio("Metode", options=list(rollforward.ROLLFORWARD_METHODS), horizontal=True, key="widget_rollforward_method")
+            # Grafik air terjun: batang total untuk AL awal, diharapkan dan akhir; sisanya perubahan
+            rf_totals = ('AL Awal', 'AL Diharapkan', 'AL Akhir')
+            rf_rows, rf_level = [], 0.0
+            for rf_step, rf_value in df_rf[rf_method].items():
+                if rf_step in rf_totals:
+                    rf_rows.append({'Sumber': rf_step, 'Awal': 0.0, 'Akhir': rf_value, 'Nilai': rf_value, 'Jenis': 'Total'})
+                    rf_level = rf_value
+                else:
+                    rf_rows.append({'Sumber': rf_step, 'Awal': rf_level, 'Akhir': rf_level + rf_value, 'Nilai': rf_value, 'Jenis': 'Naik' if rf_value >= 0 else 'Turun'})
+                    rf_level += rf_value
+            chart_rf = alt.Chart(pd.DataFrame(rf_rows)).mark_bar().encode(
+                x=alt.X('Sumber:N', sort=list(rollforward.ROLLFORWARD_ROWS), title=None, axis=alt.Axis(labelAngle=-30)),
+                y=alt.Y('Awal:Q', title='Kewajiban Aktuaria (Rp)'),
+                y2='Akhir:Q',
+                color=alt.Color('Jenis:N', scale=alt.Scale(domain=['Total', 'Naik', 'Turun'], range=['#4c78a8', '#e45756', '#54a24b']), title=None),
+                tooltip=['Sumber', alt.Tooltip('Nilai:Q', format=',.0f')],
+            ).properties(title=f"Roll-Forward AL ({rf_method})", height=450)
+            st.altair_chart(chart_rf, use_container_width=True)
+            st.caption("Batang merah menaikkan AL (kerugian bila berasal dari pengalaman), batang hijau menurunkan AL (keuntungan). Penyesuaian Metode hanya muncul pada AAN karena iuran normalnya berubah menurut usia.")
+
+            with st.expander("Lihat per Peserta"):
+                data_grid(df_rf_members, hide_index=True)
+            st.download_button(
+                "Unduh Roll-Forward per Peserta (CSV)", data=lambda: df_rf_members.to_csv(index=False).encode("utf-8"),
+                file_name="roll_forward.csv", mime="text/csv", key="download_rollforward_btn")
+
+TAB_RENDERERS = {
+    "📊 Ringkasan & Detail": render_summary,
+    "🔬 Formula Perhitungan": render_formula,
+    "🧮 Tabel Komutasi": render_commutation,
+    "🌡️ Sensitivitas": render_sensitivity,
+    "👥 Valuasi Portofolio": render_portfolio,
+    "🎲 Simulasi Stokastik": render_stochastic,
+    "📆 Proyeksi Dana": render_projection,
+    "🎯 Solver": render_solver,
+    "🔁 Roll-Forward": render_rollforward,
+}
+tabs = st.tabs(list(TAB_RENDERERS), key="widget_tab", on_change="rerun")
+for tab, render in zip(tabs, TAB_RENDERERS.values()):
+    if tab.open:
+        with tab:
+            render()
+
+# --- DEBUG: PROFIL PER TAHAP ---
+# Catatan beberapa rerun terakhir disimpan agar bisa diekspor sebagai log terstruktur (JSON Lines)
+record_profile(profiler.close())
+profile_log = st.session_state['profile_log']
+if st.session_state.get('widget_debug_profile', False):
+    with st.expander("🐞 Debug: Profil Waktu per Tahap", expanded=True):
+        df_profile = profiler.to_frame()
+        df_profile['stage'] = ['\u00a0\u00a0\u00a0\u00a0' * depth + name.rsplit('/', 1)[-1] for depth, name in zip(df_profile['depth'], df_profile['stage'])]
+        st.dataframe(
+            df_profile[['stage', 'wall_ms', 'cache_hits', 'cache_misses', 'alloc_blocks']].rename(columns={
+                'stage': 'Tahap', 'wall_ms': 'Waktu (ms)', 'cache_hits': 'Cache Hit', 'cache_misses': 'Cache Miss', 'alloc_blocks': 'Blok Alokasi (bersih)'}),
+            use_container_width=True, hide_index=True)
+        st.caption(f"Rerun {profiler.run_id}. Hanya tab yang sedang dibuka yang dirender; rerun fragmen (widget di dalam tab) tidak tampil di sini tetapi ikut tercatat di log profil yang diunduh. Tahap bersarang (loop, nilai_akhir) hanya muncul saat cache valuasi miss.")
+
+        st.markdown("**Graf Dependensi**")
+        st.dataframe(
+            pd.DataFrame(graph.describe()).rename(columns={
+                'simpul': 'Simpul', 'dependensi': 'Dependensi', 'input': 'Input', 'dihitung_ulang': 'Dihitung Ulang'}),
+            use_container_width=True, hide_index=True)
+        st.caption("Simpul dihitung ulang hanya jika dibutuhkan tab yang dibuka dan hasil untuk kombinasi inputnya tidak ada di cache perhitungan (mis. salah satu input berubah).")
+
+        st.markdown("**Cache Perhitungan (per proses)**")
+        cache_rows, cache_total = cache.cache_stats()
+        df_cache = pd.DataFrame(cache_rows)
+        df_cache['cache'] = df_cache['cache'].str.replace('danapensiun.', '', regex=False)
+        df_cache['hit_rate'] = df_cache['hit_rate'] * 100
+        df_cache['bytes'] = df_cache['bytes'] / 2**20
+        st.dataframe(
+            df_cache[['cache', 'hit_rate', 'hits', 'misses', 'entries', 'bytes', 'evictions', 'expired']].rename(columns={
+                'cache': 'Cache', 'hit_rate': 'Hit Rate (%)', 'hits': 'Hit', 'misses': 'Miss', 'entries': 'Entri',
+                'bytes': 'Memori (MiB)', 'evictions': 'Eviksi', 'expired': 'Kedaluwarsa'}),
+            use_container_width=True, hide_index=True)
+        st.caption(f"Total {cache_total['entries']:,} entri, {cache_total['bytes'] / 2**20:,.1f} MiB dari batas {cache_total['max_bytes'] / 2**20:,.0f} MiB (DANAPENSIUN_CACHE_MAX_MB). Entri yang paling lama tidak dipakai dibuang lebih dulu.")
+        st.download_button(
+            f"Unduh Log Profil ({len(profile_log):,} catatan, JSON Lines)",
+            data=profiling.to_jsonl(profile_log),
+            file_name="profil_tahap.jsonl", mime="application/x-ndjson", key="download_profile_btn")
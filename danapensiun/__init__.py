@@ -0,0 +1,12 @@
+'''
+Inti perhitungan aktuaria dana pensiun (tanpa ketergantungan pada Streamlit).
+
+Dapat diimpor dari job batch atau worker, misalnya:
+
+    from danapensiun import value_member
+    metrics, df = value_member("Laki-Laki", 30, 40, 65, Decimal("0.04"), Decimal("0.025"), Decimal(36_000_000), Decimal("0.04"))
+'''
+from danapensiun.commutation import build_commutation_table, commutation_table
+from danapensiun.mortality import available_tables, load_mortality_data
+from danapensiun.portfolio import value_portfolio
+from danapensiun.valuation import calculate_actuarial_values_excel_logic, value_member
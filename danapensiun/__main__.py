@@ -0,0 +1,3 @@
+from danapensiun.cli import main
+
+main()
@@ -0,0 +1,138 @@
+'''
+Lapisan cache sederhana untuk inti perhitungan, tidak bergantung pada Streamlit.
+
+Hasil disimpan per proses berdasarkan argumen fungsi, sehingga argumen harus hashable
+(angka, string, Decimal, tuple). Dipakai oleh API tingkat tinggi seperti
+`commutation.commutation_table` dan `valuation.value_member`.
+
+Kunci dapat dibentuk dengan fungsi `key` agar tetap kecil dan kanonik, mis. (id tabel, gender,
+suku bunga dalam basis poin): pencarian cache cukup meng-hash beberapa bilangan, dan 0.04,
+Decimal('0.04') maupun Decimal('0.040') jatuh ke entri yang sama.
+
+Semua fungsi ber-memoize berbagi satu penyimpanan LRU per proses dengan batas memori
+(default 256 MiB, dapat diubah lewat variabel lingkungan DANAPENSIUN_CACHE_MAX_MB atau
+`set_max_bytes`). Ukuran tiap entri diperkirakan saat disimpan; jika total melewati batas,
+entri yang paling lama tidak dipakai dibuang lebih dulu. Entri juga dapat diberi umur (ttl).
+'''
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get('DANAPENSIUN_CACHE_MAX_MB', 256)) * 2**20)
+
+_lock = threading.RLock()
+_entries = collections.OrderedDict()  # (nama fungsi, kunci) -> (nilai, ukuran byte, kedaluwarsa)
+_stats = {}  # nama fungsi -> penghitung
+_limits = {'max_bytes': DEFAULT_MAX_BYTES, 'bytes': 0}
+
+
+def estimate_nbytes(obj):
+    '''Perkiraan memori sebuah hasil: DataFrame (termasuk objek Decimal), array, kontainer, atau atribut nbytes.'''
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in obj.items())
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(v) for v in obj)
+    # Objek hasil lain (mis. valuation.ActuarialSchedule) dapat melaporkan ukurannya sendiri
+    return int(getattr(obj, 'nbytes', sys.getsizeof(obj)))
+
+
+def _evict(entry_key):
+    _, nbytes, _ = _entries.pop(entry_key)
+    stats = _stats[entry_key[0]]
+    stats['entries'] -= 1
+    stats['bytes'] -= nbytes
+    _limits['bytes'] -= nbytes
+    return stats
+
+
+def _enforce_limit():
+    while _entries and _limits['bytes'] > _limits['max_bytes']:
+        _evict(next(iter(_entries)))['evictions'] += 1
+
+
+def set_max_bytes(max_bytes):
+    '''Mengubah batas memori seluruh cache (byte) dan langsung membuang entri berlebih.'''
+    with _lock:
+        _limits['max_bytes'] = int(max_bytes)
+        _enforce_limit()
+
+
+def cache_stats():
+    '''Ringkasan per fungsi: hit, miss, hit rate, jumlah entri, byte dan eviksi, plus total.'''
+    with _lock:
+        rows = [{'cache': name, **_info(name)} for name in sorted(_stats)]
+        total = {'bytes': _limits['bytes'], 'max_bytes': _limits['max_bytes'], 'entries': len(_entries)}
+    return rows, total
+
+
+def _info(name):
+    stats = _stats[name]
+    lookups = stats['hits'] + stats['misses']
+    return {**stats, 'hit_rate': stats['hits'] / lookups if lookups else 0.0}
+
+
+def memoize(func=None, *, key=None, ttl=None):
+    '''
+    Dekorator cache berbasis argumen. Menyediakan `cache_clear()` dan `cache_info()`.
+    Dengan `@memoize(key=fungsi)`, kunci cache adalah fungsi(*args, **kwargs).
+    Dengan ttl (detik), entri yang lebih tua dihitung ulang.
+    '''
+    if func is None:
+        return functools.partial(memoize, key=key, ttl=ttl)
+
+    name = f'{func.__module__}.{func.__qualname__}'
+    _stats[name] = {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0, 'evictions': 0, 'expired': 0}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        entry_key = (name, key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items()))))
+        with _lock:
+            entry = _entries.get(entry_key)
+            if entry is not None:
+                if entry[2] is None or entry[2] > time.monotonic():
+                    _entries.move_to_end(entry_key)
+                    _stats[name]['hits'] += 1
+                    return entry[0]
+                _evict(entry_key)['expired'] += 1
+        value = func(*args, **kwargs)
+        nbytes = estimate_nbytes(value)
+        expires = time.monotonic() + ttl if ttl else None
+        with _lock:
+            stats = _stats[name]
+            stats['misses'] += 1
+            if entry_key in _entries:
+                _evict(entry_key)
+            # Hasil yang lebih besar dari seluruh batas tidak disimpan
+            if nbytes <= _limits['max_bytes']:
+                _entries[entry_key] = (value, nbytes, expires)
+                stats['entries'] += 1
+                stats['bytes'] += nbytes
+                _limits['bytes'] += nbytes
+                _enforce_limit()
+        return value
+
+    def cache_clear():
+        with _lock:
+            for entry_key in [k for k in _entries if k[0] == name]:
+                _evict(entry_key)
+            _stats[name].update(hits=0, misses=0, evictions=0, expired=0)
+
+    def cache_info():
+        with _lock:
+            return _info(name)
+
+    wrapper.cache_clear = cache_clear
+    wrapper.cache_info = cache_info
+    return wrapper
@@ -0,0 +1,30 @@
+'''Penyiapan data grafik (format panjang dan domain sumbu) dari hasil valuasi per usia.'''
+NC_CHART_COLUMNS = ['Iuran Normal (AAN)', 'Iuran Normal (EAN)', 'Iuran Normal (PUC)']
+AL_CHART_COLUMNS = ['Kewajiban Aktuaria (AAN)', 'Kewajiban Aktuaria (EAN)', 'Kewajiban Aktuaria (PUC)']
+
+
+def chart_frame(df_actuarial_full, columns, value_name):
+    '''Data grafik format panjang (Usia, Metode, nilai) untuk kolom-kolom yang dipilih.'''
+    df_chart_data = df_actuarial_full[['Usia'] + list(columns)].astype(float)
+    return df_chart_data.melt('Usia', var_name='Metode', value_name=value_name)
+
+
+def padded_domain(values, padding=0.1, fallback=(0, 1000000)):
+    '''Domain sumbu y dengan ruang 10% di atas dan bawah, tidak kurang dari nol.'''
+    try:
+        y_max = float(values.max())
+        y_min = float(values.min())
+        y_padding = (y_max - y_min) * padding
+        return [max(0, y_min - y_padding), y_max + y_padding]
+    except Exception:
+        return list(fallback)
+
+
+def chart_data(df_actuarial_full):
+    '''Menyiapkan data dan domain kedua grafik dashboard (iuran normal dan kewajiban aktuaria).'''
+    df_chart_nc = chart_frame(df_actuarial_full, NC_CHART_COLUMNS, 'Iuran Tahunan')
+    df_chart_al = chart_frame(df_actuarial_full, AL_CHART_COLUMNS, 'Kewajiban Aktuaria')
+    return (
+        df_chart_nc, padded_domain(df_chart_nc['Iuran Tahunan']),
+        df_chart_al, padded_domain(df_chart_al['Kewajiban Aktuaria']),
+    )
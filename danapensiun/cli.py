@@ -0,0 +1,285 @@
+'''
+Antarmuka baris perintah untuk valuasi tanpa Streamlit.
+
+Contoh:
+    python -m danapensiun value --gender Laki-Laki --entry-age 30 --valuation-age 40 --output hasil.json
+    python -m danapensiun portfolio --members peserta.csv --output hasil.csv
+    python -m danapensiun project --members peserta.csv --years 60 --output proyeksi.csv
+    python -m danapensiun solve --unknown k --goal nc --target 5000000
+    python -m danapensiun rollforward --start peserta_2024.csv --end peserta_2025.csv --output rollforward.json
+    python -m danapensiun precompute --table TMI2023
+    python -m danapensiun tables --compile
+'''
+import argparse
+import json
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+from danapensiun import commutation, mortality, portfolio, projection, rollforward, sensitivity, solver, streaming, valuation
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+
+
+def _percent(value):
+    '''Mengubah input persen (mis. "4.0") menjadi Decimal desimal (0.04), sama seperti sidebar.'''
+    return Decimal(str(value)) / Decimal(100)
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Tipe {type(obj).__name__} tidak dapat diubah ke JSON")
+
+
+def _output_format(args):
+    if args.format:
+        return args.format
+    if args.output and Path(args.output).suffix.lower() == '.csv':
+        return 'csv'
+    return 'json'
+
+
+def _write(text, output):
+    if output:
+        Path(output).write_text(text, encoding='utf-8')
+    else:
+        sys.stdout.write(text)
+
+
+def _add_assumption_args(parser):
+    parser.add_argument('--retirement-age', type=int, default=65, help="Usia Pensiun (r). Default 65.")
+    parser.add_argument('--interest', type=float, default=4.0, help="Suku Bunga (i) dalam persen. Default 4.0.")
+    parser.add_argument('--salary-increase', type=float, default=4.0, help="Kenaikan Gaji (s) dalam persen. Default 4.0.")
+    parser.add_argument('--benefit-prop', type=float, default=2.5, help="Proporsi Gaji (k) dalam persen. Default 2.5.")
+    parser.add_argument('--table', choices=mortality.table_ids(), default=DEFAULT_TABLE_ID,
+                        help="Id tabel mortalita di registri (lihat perintah tables). Default TMI2023.")
+    parser.add_argument('--format', choices=['json', 'csv'], help="Format keluaran; default mengikuti ekstensi --output, atau json.")
+    parser.add_argument('--output', help="File keluaran; default stdout.")
+
+
+def run_value(args):
+    if args.valuation_age < args.entry_age or args.valuation_age >= args.retirement_age or args.retirement_age <= args.entry_age:
+        raise SystemExit("Usia tidak valid: harus e <= x < r.")
+    metrics, df_actuarial_full = valuation.value_member(
+        args.gender, args.entry_age, args.valuation_age, args.retirement_age,
+        _percent(args.interest), _percent(args.benefit_prop), Decimal(args.salary), _percent(args.salary_increase),
+        target_benefit=args.target_benefit, backend=args.backend, table_id=args.table,
+    )
+    if _output_format(args) == 'csv':
+        _write(df_actuarial_full.to_csv(index=False), args.output)
+    else:
+        rate_sens = sensitivity.member_rate_sensitivities(
+            args.gender, args.entry_age, args.valuation_age, args.retirement_age, _percent(args.interest), metrics['B_r'], args.table)
+        payload = {
+            'metrics': metrics,
+            'sensitivitas_suku_bunga': rate_sens.to_dict(orient='index'),
+            'per_usia': df_actuarial_full.to_dict(orient='records'),
+        }
+        _write(json.dumps(payload, default=_json_default, indent=2) + '\n', args.output)
+
+
+def run_portfolio(args):
+    if args.stream:
+        return _run_portfolio_stream(args)
+    df_members = portfolio.read_member_file(args.members)
+    hasil, totals, ditolak = portfolio.value_portfolio(
+        df_members, args.retirement_age,
+        _percent(args.interest), _percent(args.benefit_prop), _percent(args.salary_increase), args.table, args.workers,
+    )
+    if len(ditolak):
+        print(f"{len(ditolak):,} peserta tidak valid dan tidak diikutkan dalam valuasi.", file=sys.stderr)
+    if _output_format(args) == 'csv':
+        _write(hasil.to_csv(index=False), args.output)
+    else:
+        payload = {
+            'total': totals,
+            'sensitivitas_suku_bunga': sensitivity.rate_sensitivities(
+                hasil, hasil['Manfaat Pensiun (Br)'], _percent(args.interest), args.table).to_dict(orient='index') if not hasil.empty else {},
+            'peserta': hasil.to_dict(orient='records'),
+            'ditolak': ditolak.to_dict(orient='records'),
+        }
+        _write(json.dumps(payload, default=_json_default, indent=2) + '\n', args.output)
+
+
+def _run_portfolio_stream(args):
+    # CSV: hasil per peserta ditulis per potongan; JSON: hanya total dan ringkasan penolakan
+    as_csv = _output_format(args) == 'csv'
+    output = open(args.output, 'w', encoding='utf-8', newline='') if as_csv and args.output else (sys.stdout if as_csv else None)
+    try:
+        totals, rate_sens, ditolak, per_alasan = streaming.stream_portfolio(
+            args.members, args.retirement_age,
+            _percent(args.interest), _percent(args.benefit_prop), _percent(args.salary_increase), args.table,
+            chunk_size=args.chunk_size, output=output,
+        )
+    finally:
+        if output is not None and output is not sys.stdout:
+            output.close()
+    if per_alasan:
+        print(f"{sum(per_alasan.values()):,} peserta tidak valid dan tidak diikutkan dalam valuasi.", file=sys.stderr)
+    if not as_csv:
+        payload = {
+            'total': totals,
+            'sensitivitas_suku_bunga': rate_sens.to_dict(orient='index') if rate_sens is not None else {},
+            'ditolak_per_alasan': per_alasan,
+            'ditolak': ditolak.to_dict(orient='records'),
+        }
+        _write(json.dumps(payload, default=_json_default, indent=2) + '\n', args.output)
+
+
+def run_project(args):
+    df_members = portfolio.read_member_file(args.members)
+    df_valid, alasan = portfolio.validate_members(df_members, args.retirement_age)
+    if (alasan != '').any():
+        print(f"{(alasan != '').sum():,} peserta tidak valid dan tidak diikutkan dalam proyeksi.", file=sys.stderr)
+    hasil = projection.project_fund(
+        df_valid[alasan == ''].reset_index(drop=True),
+        _percent(args.interest), _percent(args.benefit_prop), _percent(args.salary_increase),
+        years=args.years, entrant_policy=args.entrants, new_entrants=args.new_entrants,
+        entrant_salary_growth=None if args.entrant_salary_growth is None else float(_percent(args.entrant_salary_growth)),
+        asset_return=None if args.asset_return is None else float(_percent(args.asset_return)),
+        initial_assets=args.initial_assets, table_id=args.table,
+    )
+    if _output_format(args) == 'csv':
+        _write(hasil.to_csv(index=False), args.output)
+    else:
+        _write(json.dumps(hasil.to_dict(orient='records'), default=_json_default, indent=2) + '\n', args.output)
+
+
+def run_solve(args):
+    if args.members:
+        df_members = portfolio.read_member_file(args.members)
+        df_valid, alasan = portfolio.validate_members(df_members, args.retirement_age)
+        df_members = df_valid[alasan == ''].reset_index(drop=True)
+    else:
+        if args.valuation_age < args.entry_age or args.valuation_age >= args.retirement_age or args.retirement_age <= args.entry_age:
+            raise SystemExit("Usia tidak valid: harus e <= x < r.")
+        df_members = None
+    target = args.target / 100 if args.goal == 'rasio' else args.target
+    try:
+        if df_members is None:
+            hasil = solver.solve_member(
+                args.gender, args.entry_age, args.valuation_age, args.retirement_age,
+                _percent(args.interest), _percent(args.benefit_prop), args.salary, _percent(args.salary_increase),
+                args.unknown, args.goal, target, args.method, args.target_benefit, args.table,
+            )
+        else:
+            hasil = solver.solve(
+                df_members, _percent(args.interest), _percent(args.benefit_prop), _percent(args.salary_increase),
+                args.unknown, args.goal, target, args.method, target_benefit=args.target_benefit, table_id=args.table,
+            )
+    except ValueError as e:
+        raise SystemExit(f"Solusi tidak ditemukan: {e}")
+    _write(json.dumps(hasil, default=_json_default, indent=2) + '\n', args.output)
+
+
+def run_rollforward(args):
+    snapshots = []
+    for label, path in (('awal', args.start), ('akhir', args.end)):
+        df_valid, alasan = portfolio.validate_members(portfolio.read_member_file(path), args.retirement_age)
+        if (alasan != '').any():
+            print(f"{(alasan != '').sum():,} peserta tidak valid di snapshot {label} dan tidak diikutkan.", file=sys.stderr)
+        snapshots.append(df_valid[alasan == ''].reset_index(drop=True))
+    try:
+        ringkasan, per_peserta = rollforward.roll_forward(
+            *snapshots, _percent(args.interest), _percent(args.benefit_prop), _percent(args.salary_increase),
+            i_akhir=None if args.end_interest is None else _percent(args.end_interest), table_id=args.table,
+        )
+    except ValueError as e:
+        raise SystemExit(f"Roll-forward gagal: {e}")
+    if _output_format(args) == 'csv':
+        _write(per_peserta.to_csv(index=False), args.output)
+    else:
+        payload = {'ringkasan': ringkasan.to_dict(orient='dict'), 'per_peserta': per_peserta.to_dict(orient='records')}
+        _write(json.dumps(payload, default=_json_default, indent=2) + '\n', args.output)
+
+
+def run_tables(args):
+    '''Daftar tabel mortalita di registri; dengan --compile, semua tabel dikompilasi ke .npy.'''
+    rows = []
+    for table_id in mortality.table_ids():
+        info = mortality.table_info(table_id)
+        if args.compile:
+            mortality.compile_table(table_id)
+        qx = mortality.qx_matrix(table_id)
+        rows.append({
+            'id': table_id, 'nama': info['name'], 'versi': info['version'], 'keterangan': info['description'],
+            'usia_maks': qx.shape[1] - 1, 'manifest': str(info['manifest']),
+        })
+    _write(json.dumps(rows, indent=2) + '\n', args.output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m danapensiun', description="Kalkulator dana pensiun aktuaria (EAN, AAN, PUC).")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_value = sub.add_parser('value', help="Valuasi satu peserta.")
+    p_value.add_argument('--gender', choices=GENDERS, default='Laki-Laki', help="Jenis kelamin pada tabel mortalita.")
+    p_value.add_argument('--entry-age', type=int, default=30, help="Usia Masuk (e). Default 30.")
+    p_value.add_argument('--valuation-age', type=int, default=40, help="Usia Valuasi (x). Default 40.")
+    p_value.add_argument('--salary', type=int, default=36_000_000, help="Gaji Pokok Awal (Se) tahunan. Default 36.000.000.")
+    p_value.add_argument('--target-benefit', type=int, help="Target total manfaat pensiun (bypass gaji).")
+    p_value.add_argument('--backend', choices=valuation.BACKENDS, default='decimal', help="Backend numerik: decimal (eksak, default) atau float (float64).")
+    _add_assumption_args(p_value)
+    p_value.set_defaults(func=run_value)
+
+    p_portfolio = sub.add_parser('portfolio', help="Valuasi seluruh peserta dari file CSV/XLSX.")
+    p_portfolio.add_argument('--members', required=True, help="File peserta (kolom: jenis_kelamin, usia_masuk, usia_valuasi, gaji, [usia_pensiun]).")
+    p_portfolio.add_argument('--stream', action='store_true',
+                             help="Baca file CSV per potongan dengan memori tetap; JSON hanya berisi total dan contoh peserta ditolak.")
+    p_portfolio.add_argument('--chunk-size', type=int, default=streaming.STREAM_CHUNK_SIZE,
+                             help="Jumlah baris per potongan untuk --stream. Default 100.000.")
+    p_portfolio.add_argument('--workers', type=int, default=1,
+                             help="Jumlah proses valuasi; 0 = jumlah CPU. Default 1. Peserta dibagi rata, minimal 25.000 per proses.")
+    _add_assumption_args(p_portfolio)
+    p_portfolio.set_defaults(func=run_portfolio)
+
+    p_project = sub.add_parser('project', help="Proyeksi dana kelompok terbuka per tahun dari file peserta.")
+    p_project.add_argument('--members', required=True, help="File peserta, format sama dengan perintah portfolio.")
+    p_project.add_argument('--years', type=int, default=projection.DEFAULT_PROJECTION_YEARS, help="Lama proyeksi dalam tahun. Default 60.")
+    p_project.add_argument('--entrants', choices=projection.ENTRANT_POLICIES, default='ganti',
+                           help="Peserta baru: ganti (jumlah aktif tetap, default), tetap (--new-entrants per tahun), tertutup (tanpa peserta baru).")
+    p_project.add_argument('--new-entrants', type=float, default=0, help="Jumlah peserta baru per tahun untuk --entrants tetap.")
+    p_project.add_argument('--entrant-salary-growth', type=float, help="Kenaikan gaji awal peserta baru dalam persen per tahun. Default sama dengan --salary-increase.")
+    p_project.add_argument('--asset-return', type=float, help="Imbal hasil aset dalam persen per tahun. Default sama dengan --interest.")
+    p_project.add_argument('--initial-assets', type=float, help="Aset awal; default AL awal tiap metode (pendanaan penuh).")
+    _add_assumption_args(p_project)
+    p_project.set_defaults(func=run_project)
+
+    p_solve = sub.add_parser('solve', help="Mencari k, gaji, target manfaat atau suku bunga yang memenuhi sasaran NC, AL atau rasio penggantian.")
+    p_solve.add_argument('--unknown', choices=solver.SOLVER_UNKNOWNS, required=True, help="Variabel yang dicari: k, gaji, manfaat atau i.")
+    p_solve.add_argument('--goal', choices=solver.SOLVER_GOALS, required=True, help="Sasaran: nc (anggaran iuran normal), al (batas kewajiban aktuaria) atau rasio (rasio penggantian).")
+    p_solve.add_argument('--target', type=float, required=True, help="Nilai sasaran dalam Rupiah, atau persen untuk --goal rasio.")
+    p_solve.add_argument('--method', choices=solver.SOLVER_METHODS, default='EAN', help="Metode untuk sasaran nc/al. Default EAN.")
+    p_solve.add_argument('--members', help="File peserta; jika diisi, sasaran berlaku untuk total portofolio.")
+    p_solve.add_argument('--gender', choices=GENDERS, default='Laki-Laki', help="Jenis kelamin pada tabel mortalita.")
+    p_solve.add_argument('--entry-age', type=int, default=30, help="Usia Masuk (e). Default 30.")
+    p_solve.add_argument('--valuation-age', type=int, default=40, help="Usia Valuasi (x). Default 40.")
+    p_solve.add_argument('--salary', type=int, default=36_000_000, help="Gaji Pokok Awal (Se) tahunan. Default 36.000.000.")
+    p_solve.add_argument('--target-benefit', type=int, help="Target total manfaat pensiun (bypass gaji).")
+    _add_assumption_args(p_solve)
+    p_solve.set_defaults(func=run_solve)
+
+    p_rollforward = sub.add_parser('rollforward', help="Roll-forward dan analisis keuntungan/kerugian antara dua snapshot peserta.")
+    p_rollforward.add_argument('--start', required=True, help="Snapshot peserta awal (format portfolio ditambah kolom id_peserta).")
+    p_rollforward.add_argument('--end', required=True, help="Snapshot peserta akhir, satu tahun setelah snapshot awal.")
+    p_rollforward.add_argument('--end-interest', type=float, help="Suku bunga valuasi akhir dalam persen. Default sama dengan --interest.")
+    _add_assumption_args(p_rollforward)
+    p_rollforward.set_defaults(func=run_rollforward)
+
+    p_precompute = sub.add_parser('precompute', help="Membangun kubus komutasi untuk seluruh grid suku bunga.")
+    p_precompute.add_argument('--table', choices=mortality.table_ids(), default=DEFAULT_TABLE_ID, help="Id tabel mortalita di registri. Default TMI2023.")
+    p_precompute.set_defaults(func=lambda args: commutation.main(['--table', args.table]))
+
+    p_tables = sub.add_parser('tables', help="Daftar tabel mortalita di registri (data/mortality dan DANAPENSIUN_MORTALITY_PATH).")
+    p_tables.add_argument('--compile', action='store_true', help="Kompilasi ulang semua tabel ke file .npy yang di-memory-map.")
+    p_tables.add_argument('--output', help="File keluaran JSON; default stdout.")
+    p_tables.set_defaults(func=run_tables)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+'''
+Fungsi komutasi (lx, Dx, Nx) berbasis NumPy dan kubus komutasi yang disimpan di disk.
+
+Slider suku bunga hanya mengenal 0,0% - 15,0% dengan langkah 0,1%, sehingga untuk kedua gender
+satu tabel mortalita hanya ada 302 kombinasi. Kubus per tabel (gender x suku bunga x kolom x usia)
+dibangun sekali dengan `python -m danapensiun precompute --table <id>` lalu di-memory-map saat
+aplikasi dimulai. commutation_matrix (backend float, grid sensitivitas, pencarian suku bunga
+solver) menjawab banyak suku bunga sekaligus dengan potongan kubus. Tabel komutasi satu suku
+bunga tidak memakai kubus: commutation_arrays hanya butuh belasan mikrodetik, jauh di bawah
+biaya menyusun DataFrame-nya.
+'''
+import argparse
+import hashlib
+import itertools
+import json
+import operator
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from danapensiun.cache import memoize
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS, load_mortality_data, mortality_table, table_ids
+
+# Grid suku bunga slider: 0,0% - 15,0% per 0,1% (indeks = suku bunga dalam permil)
+CUBE_RATE_STEPS = 151
+CUBE_COLUMNS = ('lx', 'Dx', 'Nx')
+DEFAULT_L0 = 100000
+DEFAULT_CUBE_PATH = Path(__file__).resolve().parent.parent / 'data' / 'commutation_cube.npy'
+
+
+def commutation_arrays(qx, i, l0=DEFAULT_L0):
+    '''
+    Menghitung px, lx, v^x, Dx dan Nx sekaligus untuk vektor qx yang dimulai dari usia 0.
+    lx adalah perkalian kumulatif px, Nx adalah jumlah kumulatif terbalik Dx.
+    '''
+    qx = np.asarray(qx, dtype=np.float64)
+    px = 1.0 - qx
+
+    # lx = l0 * p0 * p1 * ... * p(x-1)
+    lx = np.empty(len(px), dtype=np.float64)
+    if len(px) > 0:
+        lx[0] = float(l0)
+        lx[1:] = float(l0) * np.cumprod(px[:-1])
+
+    # Vektor diskonto v^x dihitung sekali untuk semua usia
+    v = 1.0 / (1.0 + float(i))
+    v_pow = np.power(v, np.arange(len(px), dtype=np.float64))
+    Dx = lx * v_pow
+
+    # Nx = Dx + D(x+1) + ... + D(omega)
+    Nx = np.cumsum(Dx[::-1])[::-1]
+    return px, lx, v_pow, Dx, Nx
+
+
+def decimal_commutation_columns(qx, i, l0=DEFAULT_L0):
+    '''
+    lx, v^x, Dx dan Nx eksak dalam Decimal untuk vektor qx yang dimulai dari usia 0. Hanya untuk
+    referensi backend decimal (decimal_commutation_table); jalur tabel dan grafik memakai
+    commutation_arrays. qx dibaca dari representasi desimalnya (0.00979 tetap 0.00979), lx adalah
+    perkalian berantai l0 * p0 * ... * p(x-1), v^x dipangkatkan dari v = 1/(1+i) dan Nx jumlah
+    kumulatif terbalik Dx. Mengembalikan empat list Decimal.
+    '''
+    v = Decimal(1) / (Decimal(1) + Decimal(str(i)))
+    lx = []
+    l_x = Decimal(str(l0))
+    for q in qx:
+        lx.append(l_x)
+        l_x *= Decimal(1) - Decimal(str(float(q)))
+    v_pow = [v ** x for x in range(len(lx))]
+    Dx = [l * vp for l, vp in zip(lx, v_pow)]
+    Nx = list(itertools.accumulate(reversed(Dx), operator.add))[::-1]
+    return lx, v_pow, Dx, Nx
+
+
+def rate_derivatives(x, Dx, i):
+    '''
+    Turunan pertama dan kedua Dx dan Nx terhadap suku bunga i, dihitung analitis dari Dx:
+    D_x = l_x v^x sehingga dD_x/di = -x D_x / (1+i) dan d2D_x/di2 = x(x+1) D_x / (1+i)^2;
+    turunan Nx adalah jumlah kumulatif terbalik dari turunan Dx (jumlah berbobot t v^t).
+    Dx boleh berbentuk (suku bunga, usia) dengan i berupa deret suku bunga per baris.
+    Mengembalikan (dDx, dNx, d2Dx, d2Nx).
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    Dx = np.asarray(Dx, dtype=np.float64)
+    u = 1.0 / (1.0 + np.array(i, dtype=np.float64))[..., np.newaxis]
+    dDx = -x * Dx * u
+    d2Dx = x * (x + 1.0) * Dx * u * u
+    dNx = np.flip(np.cumsum(np.flip(dDx, -1), axis=-1), -1)
+    d2Nx = np.flip(np.cumsum(np.flip(d2Dx, -1), axis=-1), -1)
+    return dDx, dNx, d2Dx, d2Nx
+
+
+def rate_index(i):
+    '''Posisi suku bunga i (desimal, mis. 0.045) pada grid kubus, atau None jika di luar grid.'''
+    permil = float(i) * 1000
+    idx = int(round(permil))
+    if abs(permil - idx) > 1e-6 or not 0 <= idx < CUBE_RATE_STEPS:
+        return None
+    return idx
+
+
+def rate_bp(i):
+    '''
+    Suku bunga desimal i dalam basis poin (0.04 -> 400) sebagai kunci cache yang kecil dan sama
+    untuk float maupun Decimal. Suku bunga yang lebih halus dari 1 bp tetap dikembalikan eksak.
+    '''
+    bp = Decimal(str(i)) * 10000
+    return int(bp) if bp == bp.to_integral_value() else bp.normalize()
+
+
+def build_commutation_cube(qx_by_gender, l0=DEFAULT_L0):
+    '''
+    Membangun kubus komutasi berbentuk (gender, suku bunga, kolom, usia) untuk seluruh grid slider.
+    Semua suku bunga dihitung sekaligus lewat broadcasting, tanpa loop per suku bunga.
+    '''
+    rates = np.arange(CUBE_RATE_STEPS, dtype=np.float64) / 1000
+    n_ages = len(qx_by_gender[0])
+
+    cube = np.empty((len(qx_by_gender), CUBE_RATE_STEPS, len(CUBE_COLUMNS), n_ages), dtype=np.float64)
+    for g, qx in enumerate(qx_by_gender):
+        _, lx, _, _, _ = commutation_arrays(qx, 0, l0)
+        Dx, Nx = _discounted_over_rates(lx, rates)
+        cube[g, :, 0, :] = lx
+        cube[g, :, 1, :] = Dx
+        cube[g, :, 2, :] = Nx
+    return cube
+
+
+def _discounted_over_rates(lx, rates):
+    '''Dx dan Nx untuk banyak suku bunga sekaligus lewat broadcasting: array (suku bunga, usia).'''
+    ages = np.arange(len(lx), dtype=np.float64)
+    v_pow = np.power(1.0 / (1.0 + np.asarray(rates, dtype=np.float64))[:, None], ages[None, :])
+    Dx = lx[None, :] * v_pow
+    Nx = np.cumsum(Dx[:, ::-1], axis=1)[:, ::-1]
+    return Dx, Nx
+
+
+def _cube_fingerprint(qx_by_gender, l0):
+    '''Sidik jari data qx dan l0, dipakai untuk mendeteksi kubus yang sudah usang.'''
+    h = hashlib.sha256()
+    for qx in qx_by_gender:
+        h.update(np.ascontiguousarray(qx, dtype=np.float64).tobytes())
+    h.update(str(float(l0)).encode())
+    return h.hexdigest()
+
+
+def save_commutation_cube(path, cube, qx_by_gender, l0=DEFAULT_L0):
+    '''Menyimpan kubus sebagai file .npy (bisa di-memory-map) beserta metadata JSON.'''
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, cube)
+    meta = {
+        'genders': list(GENDERS),
+        'columns': list(CUBE_COLUMNS),
+        'rate_steps': CUBE_RATE_STEPS,
+        'l0': float(l0),
+        'fingerprint': _cube_fingerprint(qx_by_gender, l0),
+    }
+    path.with_suffix('.json').write_text(json.dumps(meta, indent=2))
+
+
+def load_commutation_cube(path, qx_by_gender, l0=DEFAULT_L0):
+    '''
+    Memory-map kubus dari disk. Mengembalikan None jika file belum ada atau tidak cocok
+    dengan data mortalita saat ini.
+    '''
+    path = Path(path)
+    meta_path = path.with_suffix('.json')
+    if not path.exists() or not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+        cube = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    expected_shape = (len(qx_by_gender), CUBE_RATE_STEPS, len(CUBE_COLUMNS), len(qx_by_gender[0]))
+    if meta.get('fingerprint') != _cube_fingerprint(qx_by_gender, l0) or cube.shape != expected_shape:
+        return None
+    return cube
+
+
+def load_or_build_commutation_cube(path, qx_by_gender, l0=DEFAULT_L0):
+    '''
+    Memory-map kubus komutasi dari disk. Jika file belum ada atau usang, kubus dibangun sekali
+    lalu disimpan (bila lokasi dapat ditulisi) untuk proses berikutnya.
+    '''
+    cube = load_commutation_cube(path, qx_by_gender, l0)
+    if cube is None:
+        cube = build_commutation_cube(qx_by_gender, l0)
+        try:
+            save_commutation_cube(path, cube, qx_by_gender, l0)
+        except OSError:
+            pass
+    return cube
+
+
+def build_commutation_table(df_raw_mortality, i, l0=DEFAULT_L0):
+    '''
+    Membangun tabel komutasi (lx, Dx, Nx) dari data qx tabel mortalita.
+    Dihitung sekaligus dengan NumPy (float64); kolom v^x, Dx dan Nx dikembalikan sebagai Decimal
+    agar perhitungan aktuaria selanjutnya tetap memakai aritmetika Decimal.
+    '''
+    if df_raw_mortality is None or 'qx' not in df_raw_mortality.columns:
+        return pd.DataFrame()
+
+    df = df_raw_mortality.sort_values('x')
+    px, lx, v_pow, Dx, Nx = commutation_arrays(df['qx'].to_numpy(), i, l0)
+    return _commutation_frame(df['x'].to_numpy(), df['qx'].to_numpy(), px, lx, v_pow, Dx, Nx, i)
+
+
+def _commutation_frame(x, qx, px, lx, v_pow, Dx, Nx, i):
+    '''
+    Menyusun DataFrame tabel komutasi dari array NumPy (v^x, Dx, Nx sebagai Decimal) dalam satu
+    konstruksi, tanpa menyisipkan kolom satu per satu. Turunan terhadap i (dDx, dNx, d2Dx, d2Nx)
+    disertakan sebagai float64.
+    '''
+    dDx, dNx, d2Dx, d2Nx = rate_derivatives(x, Dx, i)
+    return pd.DataFrame({
+        'x': x, 'qx': qx, 'px': px, 'lx': lx,
+        'v^x': np.array([Decimal(val) for val in v_pow.tolist()], dtype=object),
+        'Dx': np.array([Decimal(val) for val in Dx.tolist()], dtype=object),
+        'Nx': np.array([Decimal(val) for val in Nx.tolist()], dtype=object),
+        'dDx': dDx, 'dNx': dNx, 'd2Dx': d2Dx, 'd2Nx': d2Nx,
+    })
+
+
+def build_decimal_commutation_table(df_raw_mortality, i, l0=DEFAULT_L0):
+    '''
+    Tabel komutasi referensi (x, qx, lx, v^x, Dx, Nx) yang seluruhnya Decimal eksak, seperti
+    perhitungan Decimal semula. Lebih lambat dari build_commutation_table; hanya untuk backend decimal.
+    '''
+    if df_raw_mortality is None or 'qx' not in df_raw_mortality.columns:
+        return pd.DataFrame()
+
+    df = df_raw_mortality.sort_values('x').reset_index(drop=True)
+    df['lx'], df['v^x'], df['Dx'], df['Nx'] = decimal_commutation_columns(df['qx'].to_numpy(), i, l0)
+    return df
+
+
+def cube_path(table_id=DEFAULT_TABLE_ID):
+    '''Lokasi file kubus komutasi untuk satu tabel mortalita di registri.'''
+    if table_id == DEFAULT_TABLE_ID:
+        return DEFAULT_CUBE_PATH
+    return DEFAULT_CUBE_PATH.with_name(f'commutation_cube_{table_id}.npy')
+
+
+@memoize(key=lambda table_id=DEFAULT_TABLE_ID: table_id)
+def default_commutation_cube(table_id=DEFAULT_TABLE_ID):
+    '''Kubus komutasi satu tabel mortalita di lokasi default, dimuat sekali per proses.'''
+    qx_by_gender = [mortality_table(gender, table_id)['qx'].to_numpy() for gender in GENDERS]
+    return load_or_build_commutation_cube(cube_path(table_id), qx_by_gender)
+
+
+@memoize(key=lambda jenis_kelamin, i, table_id=DEFAULT_TABLE_ID: (table_id, jenis_kelamin, rate_bp(i)))
+def commutation_table(jenis_kelamin, i, table_id=DEFAULT_TABLE_ID):
+    '''
+    Tabel komutasi untuk gender dan suku bunga i (desimal), di-cache per proses dengan kunci
+    (id tabel, gender, suku bunga dalam bp); tabel mortalita diambil dari registri.
+    '''
+    return build_commutation_table(mortality_table(jenis_kelamin, table_id), i)
+
+
+@memoize(key=lambda jenis_kelamin, i, table_id=DEFAULT_TABLE_ID: (table_id, jenis_kelamin, rate_bp(i)))
+def decimal_commutation_table(jenis_kelamin, i, table_id=DEFAULT_TABLE_ID):
+    '''Tabel komutasi Decimal eksak (build_decimal_commutation_table), di-cache seperti commutation_table.'''
+    return build_decimal_commutation_table(mortality_table(jenis_kelamin, table_id), i)
+
+
+def commutation_matrix(jenis_kelamin, rates, table_id=DEFAULT_TABLE_ID):
+    '''
+    Dx dan Nx untuk banyak suku bunga (desimal) sekaligus: dua array (suku bunga, usia).
+    Jika semua suku bunga ada di grid slider, hasilnya diambil langsung dari kubus.
+    '''
+    idx = [rate_index(i) for i in rates]
+    cube = default_commutation_cube(table_id)
+    if cube is not None and all(j is not None for j in idx):
+        sub = cube[GENDERS.index(jenis_kelamin)][idx]
+        return sub[:, 1, :], sub[:, 2, :]
+    _, lx, _, _, _ = commutation_arrays(mortality_table(jenis_kelamin, table_id)['qx'].to_numpy(), 0)
+    return _discounted_over_rates(lx, [float(i) for i in rates])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Membangun kubus komutasi satu tabel mortalita untuk seluruh grid suku bunga.")
+    parser.add_argument('--table', choices=table_ids(), default=DEFAULT_TABLE_ID, help="Id tabel mortalita di registri. Default TMI2023.")
+    parser.add_argument('--output', help="Lokasi file .npy kubus komutasi; default data/commutation_cube*.npy sesuai tabel.")
+    parser.add_argument('--l0', type=float, default=DEFAULT_L0, help="Radix tabel mortalita (l0).")
+    args = parser.parse_args(argv)
+
+    output = args.output or str(cube_path(args.table))
+    df_laki, df_perempuan = load_mortality_data(args.table)
+    qx_by_gender = [df_laki['qx'].to_numpy(), df_perempuan['qx'].to_numpy()]
+    cube = build_commutation_cube(qx_by_gender, args.l0)
+    save_commutation_cube(output, cube, qx_by_gender, args.l0)
+    print(f"Kubus komutasi {args.table} {cube.shape} disimpan di {output} ({cube.nbytes / 1024:,.0f} KiB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+'''
+Graf dependensi kecil untuk menghitung ulang hanya bagian yang terpengaruh perubahan input.
+
+Simpul didaftarkan dengan dependensinya (nama input atau simpul lain) dan dihitung malas saat
+diminta. Setiap hasil disimpan di cache bersama (danapensiun.cache, berbatas memori) dengan kunci
+tanda tangan input yang memengaruhinya secara transitif, sehingga pada evaluasi berikutnya simpul
+hanya dihitung ulang jika salah satu input tersebut berubah (atau hasilnya sudah dibuang dari
+cache):
+
+    graph = DependencyGraph()
+    graph.set_inputs(gender='Laki-Laki', i=Decimal('0.04'), x=40)
+
+    @graph.node('gender', 'i')
+    def comm_table(gender, i):
+        return commutation.commutation_table(gender, i)
+
+    graph.get('comm_table')                # mengubah x tidak menghitung ulang comm_table
+
+Nilai input harus hashable dan dapat dibandingkan (angka, string, Decimal, tuple).
+'''
+from danapensiun.cache import memoize
+
+
+@memoize(key=lambda node_id, signature, compute: (node_id, signature))
+def _node_value(node_id, signature, compute):
+    '''Hasil satu simpul untuk satu tanda tangan input; dihitung dengan compute() jika belum ada.'''
+    return compute()
+
+
+class DependencyGraph:
+    '''Simpul malas yang hasilnya di-cache berdasarkan input transitifnya.'''
+
+    def __init__(self):
+        self._nodes = {}  # nama -> (fungsi, dependensi)
+        self.inputs = {}
+        self.computed = []  # simpul yang dihitung ulang sejak set_inputs terakhir
+
+    def set_inputs(self, **values):
+        '''Menetapkan nilai input untuk evaluasi ini.'''
+        self.inputs.update(values)
+        self.computed = []
+
+    def node(self, *deps, name=None):
+        '''Dekorator untuk mendaftarkan simpul; argumen fungsi adalah nilai dependensi sesuai urutan.'''
+        def register(func):
+            self._nodes[name or func.__name__] = (func, deps)
+            return func
+        return register
+
+    def input_names(self, name):
+        '''Nama input yang memengaruhi simpul secara transitif, terurut.'''
+        if name not in self._nodes:
+            return (name,)
+        return tuple(sorted({inp for dep in self._nodes[name][1] for inp in self.input_names(dep)}))
+
+    def signature(self, name):
+        '''Tanda tangan (input, nilai) yang menentukan hasil simpul.'''
+        return tuple((inp, self.inputs[inp]) for inp in self.input_names(name))
+
+    def dependents(self, input_name):
+        '''Simpul yang harus dihitung ulang jika input berubah.'''
+        return [name for name in self._nodes if input_name in self.input_names(name)]
+
+    def get(self, name):
+        '''Nilai input atau simpul; simpul dihitung ulang hanya jika tanda tangannya belum ada di cache.'''
+        if name not in self._nodes:
+            return self.inputs[name]
+        func, deps = self._nodes[name]
+
+        def compute():
+            self.computed.append(name)
+            return func(*(self.get(dep) for dep in deps))
+
+        # Fungsi simpul ikut menjadi kunci agar graf lain dengan nama simpul yang sama tidak bertabrakan
+        return _node_value((func.__module__, func.__qualname__, name), self.signature(name), compute)
+
+    def describe(self):
+        '''Baris (simpul, dependensi langsung, input transitif, dihitung ulang) untuk tampilan debug.'''
+        return [
+            {'simpul': name, 'dependensi': ', '.join(deps), 'input': ', '.join(self.input_names(name)),
+             'dihitung_ulang': name in self.computed}
+            for name, (_, deps) in self._nodes.items()
+        ]
@@ -0,0 +1,158 @@
+'''
+Baris formula (LaTeX dan markdown) untuk tab "Formula Perhitungan".
+
+Setiap bagian dibangun oleh satu fungsi yang mengembalikan tuple (jenis, teks) dengan jenis
+'latex' atau 'markdown', sehingga dashboard cukup memanggil st.latex / st.markdown per baris.
+Fungsi-fungsi ini di-memoize per nilai argumennya: konversi Decimal ke string (format_calc,
+format_latex_num) hanya dilakukan saat expander bagian itu dibuka pertama kali untuk
+parameter tersebut. Semua nilai diambil dari hasil valuasi yang sudah ada (termasuk suku NA),
+tidak ada perhitungan ulang di sini.
+'''
+from decimal import Decimal
+
+from danapensiun.cache import memoize
+
+NA_METHOD_NAMES = {
+    'EAN': 'Entry Age Normal',
+    'AAN': 'Attained Age Normal',
+    'PUC': 'Projected Unit Credit',
+}
+
+
+# Helper function untuk format angka (presisi 7) - UNTUK TAB FORMULA
+def format_calc(val):
+    if not isinstance(val, Decimal):
+        val = Decimal(str(val))
+    s = f"{val:,.7f}"
+    s = s.replace(",", "_").replace(".", ",").replace("_", ".")
+    return s
+
+
+# Helper function untuk format angka tanpa koma (untuk LaTeX)
+def format_latex_num(val):
+    if not isinstance(val, Decimal):
+        val = Decimal(str(val))
+    # Hasilkan string angka dengan 7 desimal, gunakan titik untuk LaTeX
+    return f"{val:.7f}"
+
+
+@memoize
+def benefit_lines(e, r, k, gaji_masuk, s, Sr_minus_1, B_r):
+    '''Perhitungan S_{r-1} (gaji proyeksi) dan B_r (manfaat pensiun).'''
+    return (
+        ('markdown', f"**Perhitungan $S_{{{r-1}}}$ (Gaji Proyeksi):**"),
+        ('latex', r"S_{r-1} = (1+s)^{r-e-1} \times s_e"),
+        ('latex', rf"S_{{{r-1}}} = (1 + {format_latex_num(s)})^{{{r}-{e}-1}} \times {gaji_masuk:,.0f}"),
+        ('latex', rf"S_{{{r-1}}} = {format_calc(Sr_minus_1)}"),
+        ('markdown', f"**Perhitungan $B_{{{r}}}$ (Manfaat Pensiun):**"),
+        ('latex', r"B_r = k \times (r - e) \times S_{r-1}"),
+        ('latex', rf"B_{{{r}}} = {format_latex_num(k)} \times ({r} - {e}) \times S_{{{r-1}}}"),
+        ('latex', rf"B_{{{r}}} = {format_latex_num(k)} \times ({r-e}) \times {format_calc(Sr_minus_1)}"),
+        ('latex', rf"B_{{{r}}} = {format_calc(B_r)}"),
+    )
+
+
+@memoize
+def pvfb_lines(x, r, B_r, Dx_r, Dx_now, PVFB_x_now):
+    '''Nilai sekarang manfaat pensiun di usia valuasi.'''
+    return (
+        ('latex', r"^{r}(PVFB)_{x} = B_r \times \frac{D_r}{D_x}"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{{r}}}(PVFB)_{{{x}}} = B_{{{r}}} \times \frac{{D_{{{r}}}}}{{D_{{{x}}}}}"),
+        ('latex', rf"^{{{r}}}(PVFB)_{{{x}}} = {format_calc(B_r)} \times \frac{{{format_calc(Dx_r)}}}{{{format_calc(Dx_now)}}}"),
+        ('latex', rf"^{{{r}}}(PVFB)_{{{x}}} = {format_calc(PVFB_x_now)}"),
+    )
+
+
+@memoize
+def nc_ean_lines(x, r, Dx_now, Nx_now, Nx_r, PVFB_x_now, NC_ean_now):
+    '''Iuran normal EAN di usia valuasi.'''
+    return (
+        ('latex', r"^{EAN~r}(NC)_{x} = \frac{D_x}{N_x - N_r} \times {}^{r}(PVFB)_{x}"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{EAN~{r}}}(NC)_{{{x}}} = \frac{{D_{{{x}}}}}{{N_{{{x}}} - N_{{{r}}}}} \times {{}}^{{{r}}}(PVFB)_{{{x}}}"),
+        ('latex', rf"^{{EAN~{r}}}(NC)_{{{x}}} = \frac{{{format_calc(Dx_now)}}}{{{format_calc(Nx_now)} - {format_calc(Nx_r)}}} \times {format_calc(PVFB_x_now)}"),
+        ('latex', rf"^{{EAN~{r}}}(NC)_{{{x}}} = \frac{{{format_calc(Dx_now)}}}{{{format_calc(Nx_now - Nx_r)}}} \times {format_calc(PVFB_x_now)}"),
+        ('latex', rf"^{{EAN~{r}}}(NC)_{{{x}}} = {format_calc(NC_ean_now)}"),
+    )
+
+
+@memoize
+def nc_aan_lines(e, x, r, Dx_now, Nx_now, Nx_r, PVFB_entry_AAN, anuitas_now, NC_aan_x_now):
+    '''Iuran normal AAN di usia valuasi.'''
+    return (
+        ('latex', r"^{AAN~r}(NC)_{x} = \frac{{}^{r}(PVFB)_{e}}{\frac{N_x - N_r}{D_x}}"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{AAN~{r}}}(NC)_{{{x}}} = \frac{{{{}}^{{{r}}}(PVFB)_{{{e}}}}}{{ \frac{{N_{{{x}}} - N_{{{r}}}}}{{D_{{{x}}}}} }}"),
+        ('latex', rf"\text{{Nilai pembilang: }} ^{{{r}}}(PVFB)_{{{e}}} = {format_calc(PVFB_entry_AAN)}"),
+        ('latex', rf"\text{{Nilai penyebut: }} \frac{{{format_calc(Nx_now)} - {format_calc(Nx_r)}}}{{{format_calc(Dx_now)}}} = {format_calc(anuitas_now)}"),
+        ('latex', rf"^{{AAN~{r}}}(NC)_{{{x}}} = \frac{{{format_calc(PVFB_entry_AAN)}}}{{{format_calc(anuitas_now)}}}"),
+        ('latex', rf"^{{AAN~{r}}}(NC)_{{{x}}} = {format_calc(NC_aan_x_now)}"),
+    )
+
+
+@memoize
+def nc_puc_lines(e, x, r, PVFB_x_now, NC_puc_now):
+    '''Iuran normal PUC di usia valuasi.'''
+    return (
+        ('latex', r"^{PUC~r}(NC)_x = \frac{{}^{r}(PVFB)_x}{r-e}"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{PUC~{r}}}(NC)_{{{x}}} = \frac{{{{}}^{{{r}}}(PVFB)_{{{x}}}}}{{{r}-{e}}}"),
+        ('latex', rf"^{{PUC~{r}}}(NC)_{{{x}}} = \frac{{{format_calc(PVFB_x_now)}}}{{{r-e}}}"),
+        ('latex', rf"^{{PUC~{r}}}(NC)_{{{x}}} = {format_calc(NC_puc_now)}"),
+    )
+
+
+@memoize
+def al_ean_lines(e, x, r, Dx_entry, Nx_entry, Nx_now, Nx_r, anuitas_entry_to_now, anuitas_entry, PVFB_x_now, AL_ean_now):
+    '''Kewajiban aktuaria EAN di usia valuasi.'''
+    return (
+        ('latex', r"^{EAN~r}(AL)_{x} = \frac{\frac{N_e - N_x}{D_e}}{\frac{N_e - N_r}{D_e}} \times {}^{r}(PVFB)_{x}"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{EAN~{r}}}(AL)_{{{x}}} = \frac{{\frac{{N_{{{e}}} - N_{{{x}}}}}{{D_{{{e}}}}}}}{{\frac{{N_{{{e}}} - N_{{{r}}}}}{{D_{{{e}}}}}}} \times {{}}^{{{r}}}(PVFB)_{{{x}}}"),
+        ('latex', rf"\text{{Nilai pembilang: }} \frac{{{format_calc(Nx_entry)} - {format_calc(Nx_now)}}}{{{format_calc(Dx_entry)}}} = {format_calc(anuitas_entry_to_now)}"),
+        ('latex', rf"\text{{Nilai penyebut: }} \frac{{{format_calc(Nx_entry)} - {format_calc(Nx_r)}}}{{{format_calc(Dx_entry)}}} = {format_calc(anuitas_entry)}"),
+        ('latex', rf"^{{EAN~{r}}}(AL)_{{{x}}} = \frac{{{format_calc(anuitas_entry_to_now)}}}{{{format_calc(anuitas_entry)}}} \times {format_calc(PVFB_x_now)}"),
+        ('latex', rf"^{{EAN~{r}}}(AL)_{{{x}}} = {format_calc(AL_ean_now)}"),
+    )
+
+
+@memoize
+def al_aan_lines(x, r, PVFB_x_now, NC_aan_x_now, anuitas_now, AL_aan_now):
+    '''Kewajiban aktuaria AAN di usia valuasi.'''
+    return (
+        ('latex', r"^{AAN~r}(AL)_{x} = {}^{r}(PVFB)_{x} - {}^{AAN~r}(NC)_{x} \times \frac{N_x - N_r}{D_x}"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{AAN~{r}}}(AL)_{{{x}}} = {{}}^{{{r}}}(PVFB)_{{{x}}} - ({{}}^{{AAN~{r}}}(NC)_{{{x}}} \times \frac{{N_{{{x}}} - N_{{{r}}}}}{{D_{{{x}}}}})"),
+        ('latex', rf"^{{AAN~{r}}}(AL)_{{{x}}} = {format_calc(PVFB_x_now)} - ({format_calc(NC_aan_x_now)} \times {format_calc(anuitas_now)})"),
+        ('latex', rf"^{{AAN~{r}}}(AL)_{{{x}}} = {format_calc(AL_aan_now)}"),
+    )
+
+
+@memoize
+def al_puc_lines(e, x, r, PVFB_x_now, AL_puc_now):
+    '''Kewajiban aktuaria PUC di usia valuasi.'''
+    return (
+        ('latex', r"^{PUC~r}(AL)_x = \frac{x-e}{r-e} \times {}^{r}(PVFB)_x"),
+        ('markdown', f"**Perhitungan di Usia {x}:**"),
+        ('latex', rf"^{{PUC~{r}}}(AL)_{{{x}}} = \frac{{{x}-{e}}}{{{r}-{e}}} \times {{}}^{{{r}}}(PVFB)_{{{x}}}"),
+        ('latex', rf"^{{PUC~{r}}}(AL)_{{{x}}} = \frac{{{x-e}}}{{{r-e}}} \times {format_calc(PVFB_x_now)}"),
+        ('latex', rf"^{{PUC~{r}}}(AL)_{{{x}}} = {format_calc(AL_puc_now)}"),
+    )
+
+
+@memoize
+def final_value_lines(metode, e, r, i, term_first, term_second, term_last, total):
+    '''
+    Nilai akhir iuran (NA) metode EAN, AAN atau PUC. Suku pertama, kedua, terakhir dan total
+    berasal dari akumulasi di valuation (metrik NA_*), bukan dihitung ulang.
+    '''
+    i_latex = format_latex_num(i)
+    return (
+        ('markdown', f"**Metode {NA_METHOD_NAMES[metode]}**"),
+        ('latex', rf"{{}}^{{{metode}}}NA = \sum_{{x=e}}^{{r-1}} \, {{}}^{{{metode}}}(NC)_x (1+i)^{{r-x}}"),
+        ('latex', rf"{{}}^{{{metode}}}NA = \sum_{{x={e}}}^{{{r-1}}} \, {{}}^{{{metode}}}(NC)_x (1 + {i_latex})^{{{r}-x}}"),
+        ('latex', rf"{{}}^{{{metode}}}NA = {{}}^{{{metode}}}(NC)_{{{e}}} (1+{i_latex})^{{{r-e}}} + {{}}^{{{metode}}}(NC)_{{{e+1}}} (1+{i_latex})^{{{r-(e+1)}}} + \dots + {{}}^{{{metode}}}(NC)_{{{r-1}}} (1+{i_latex})^{{1}}"),
+        ('latex', rf"{{}}^{{{metode}}}NA = {format_calc(term_first)} + {format_calc(term_second)} + \dots + {format_calc(term_last)}"),
+        ('latex', rf"{{}}^{{{metode}}}NA = {format_calc(total)}"),
+    )
@@ -0,0 +1,183 @@
+'''
+Registri tabel mortalita (qx per usia dan gender) yang dimuat dari file, bukan dari kode.
+
+Setiap tabel didefinisikan oleh manifest JSON di direktori registri (data/mortality, ditambah
+direktori di variabel lingkungan DANAPENSIUN_MORTALITY_PATH yang dipisah os.pathsep dan
+diperiksa lebih dulu). Id tabel adalah nama file manifest tanpa .json:
+
+    TMI2023.json   {"name": "TMI 2023", "version": "2023", "description": "...", "data": "TMI2023.csv"}
+    TMI2023.csv    kolom x, Laki-Laki, Perempuan; usia 0 .. omega berurutan tanpa celah
+
+Tabel campuran (mis. unisex) cukup berupa manifest tanpa CSV:
+
+    {"name": "...", "version": "1", "blend": {"table": "TMI2023", "weights": {"Laki-Laki": 0.6, "Perempuan": 0.4}}}
+
+Saat pertama dipakai, tabel dikompilasi menjadi <id>.<sidik jari>.npy di samping manifest:
+array float64 (gender, usia) yang di-memory-map, sehingga qx usia x cukup dibaca sebagai
+qx[g, x] dan proses berikutnya tidak mem-parse CSV. Sidik jari dihitung dari isi manifest dan
+data, sehingga file kompilasi yang usang tidak terpakai setelah data diubah.
+'''
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from danapensiun.cache import memoize
+
+GENDERS = ("Laki-Laki", "Perempuan")
+
+MORTALITY_PATH_ENV = 'DANAPENSIUN_MORTALITY_PATH'
+DEFAULT_MORTALITY_DIR = Path(__file__).resolve().parent.parent / 'data' / 'mortality'
+DEFAULT_TABLE_ID = 'TMI2023'
+# Registri dibaca ulang dari disk paling lama setiap sekian detik, agar tabel baru ikut muncul
+REGISTRY_TTL = 60
+
+
+def registry_dirs():
+    '''Direktori registri sesuai urutan prioritas: DANAPENSIUN_MORTALITY_PATH lalu data/mortality.'''
+    extra = [Path(p) for p in os.environ.get(MORTALITY_PATH_ENV, '').split(os.pathsep) if p]
+    return [*extra, DEFAULT_MORTALITY_DIR]
+
+
+@memoize(ttl=REGISTRY_TTL)
+def available_tables():
+    '''
+    Metadata seluruh tabel di registri: id -> dict (name, version, description, manifest, dan
+    data atau blend). Jika id yang sama ada di beberapa direktori, direktori pertama dipakai.
+    File JSON yang bukan manifest tabel (tanpa data maupun blend) diabaikan.
+    '''
+    tables = {}
+    for directory in registry_dirs():
+        for manifest in sorted(directory.glob('*.json')):
+            if manifest.stem in tables:
+                continue
+            try:
+                meta = json.loads(manifest.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            if not isinstance(meta, dict) or ('data' not in meta and 'blend' not in meta):
+                continue
+            tables[manifest.stem] = {
+                'name': manifest.stem, 'description': '', **meta,
+                'id': manifest.stem, 'version': str(meta.get('version', '')), 'manifest': manifest,
+            }
+    return tables
+
+
+def table_ids():
+    '''Id tabel di registri, terurut.'''
+    return sorted(available_tables())
+
+
+def table_info(table_id=DEFAULT_TABLE_ID):
+    '''Metadata satu tabel di registri.'''
+    tables = available_tables()
+    if table_id not in tables:
+        raise ValueError(f"Tabel mortalita tidak dikenal: {table_id}")
+    return tables[table_id]
+
+
+def table_label(table_id=DEFAULT_TABLE_ID):
+    '''Nama tabel untuk tampilan, dengan versinya jika berbeda dari nama.'''
+    info = table_info(table_id)
+    if info['version'] and info['version'] not in info['name']:
+        return f"{info['name']} (versi {info['version']})"
+    return info['name']
+
+
+def _blend_base(info):
+    base = table_info(info['blend']['table'])
+    if 'data' not in base:
+        raise ValueError(f"Tabel campuran {info['id']} harus berbasis tabel dengan data CSV, bukan {base['id']}")
+    return base
+
+
+def _fingerprint(info):
+    '''Sidik jari isi manifest dan data (atau tabel dasar untuk tabel campuran).'''
+    h = hashlib.sha256(info['manifest'].read_bytes())
+    if 'blend' in info:
+        h.update(_fingerprint(_blend_base(info)).encode())
+    else:
+        h.update(info['manifest'].with_name(info['data']).read_bytes())
+    return h.hexdigest()
+
+
+def _compiled_path(info):
+    return info['manifest'].with_name(f"{info['id']}.{_fingerprint(info)[:16]}.npy")
+
+
+def _source_qx(info):
+    '''Membaca data sumber tabel menjadi array qx (gender, usia); hanya saat kompilasi.'''
+    if 'blend' in info:
+        weights = info['blend'].get('weights', {})
+        bobot = np.array([float(weights.get(gender, 0)) for gender in GENDERS])
+        if not np.isclose(bobot.sum(), 1.0):
+            raise ValueError(f"Bobot tabel campuran {info['id']} harus berjumlah 1, bukan {bobot.sum():g}")
+        qx = bobot @ _source_qx(_blend_base(info))
+        return np.vstack([qx] * len(GENDERS))
+
+    df = pd.read_csv(info['manifest'].with_name(info['data']))
+    missing = [c for c in ('x', *GENDERS) if c not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom tabel mortalita {info['id']} tidak ditemukan: {', '.join(missing)}")
+    df = df.sort_values('x')
+    if not np.array_equal(df['x'].to_numpy(), np.arange(len(df))):
+        raise ValueError(f"Usia tabel mortalita {info['id']} harus berurutan mulai 0 tanpa celah")
+    return np.ascontiguousarray(df[list(GENDERS)].to_numpy(dtype=np.float64).T.clip(max=1.0))
+
+
+def compile_table(table_id=DEFAULT_TABLE_ID):
+    '''
+    Mengompilasi tabel menjadi file .npy (gender, usia) di samping manifest dan menghapus file
+    kompilasi lama tabel yang sama. Mengembalikan lokasi file.
+    '''
+    info = table_info(table_id)
+    path = _compiled_path(info)
+    qx = _source_qx(info)
+    # Ditulis ke file sementara lalu diganti, agar proses lain tidak membaca file setengah jadi
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as f:
+        np.save(f, qx)
+    os.replace(tmp, path)
+    # Hanya <id>.<16 heksadesimal>.npy: tabel lain yang id-nya diawali "<id>." tidak ikut terhapus
+    lama = re.compile(rf'{re.escape(table_id)}\.[0-9a-f]{{16}}')
+    for old in path.parent.glob('*.npy'):
+        if old != path and lama.fullmatch(old.stem):
+            old.unlink(missing_ok=True)
+    return path
+
+
+@memoize(key=lambda table_id=DEFAULT_TABLE_ID: table_id)
+def qx_matrix(table_id=DEFAULT_TABLE_ID):
+    '''
+    qx tabel sebagai array float64 (gender, usia) yang di-memory-map, diindeks langsung dengan
+    usia: qx_matrix(id)[GENDERS.index(gender), x]. Dikompilasi sekali jika belum ada atau usang;
+    jika direktori registri tidak dapat ditulisi, array dibangun di memori. Dimuat sekali per proses.
+    '''
+    info = table_info(table_id)
+    path = _compiled_path(info)
+    if not path.exists():
+        try:
+            path = compile_table(table_id)
+        except OSError:
+            return _source_qx(info)
+    return np.load(path, mmap_mode='r')
+
+
+def load_mortality_data(table_id=DEFAULT_TABLE_ID):
+    '''Data qx Laki-laki dan Perempuan (DataFrame x, qx) untuk tabel di registri (default TMI 2023).'''
+    qx = qx_matrix(table_id)
+    ages = np.arange(qx.shape[1])
+    return tuple(pd.DataFrame({'x': ages, 'qx': np.array(qx[g])}) for g in range(len(GENDERS)))
+
+
+@memoize(key=lambda jenis_kelamin, table_id=DEFAULT_TABLE_ID: (table_id, jenis_kelamin))
+def mortality_table(jenis_kelamin, table_id=DEFAULT_TABLE_ID):
+    '''Tabel qx untuk satu gender ("Laki-Laki" atau "Perempuan") dari registri, dimuat sekali per proses.'''
+    if jenis_kelamin not in GENDERS:
+        raise ValueError(f"Jenis kelamin tidak dikenali: {jenis_kelamin}")
+    return load_mortality_data(table_id)[GENDERS.index(jenis_kelamin)]
@@ -0,0 +1,258 @@
+'''
+Valuasi portofolio: EAN, AAN dan PUC untuk banyak peserta sekaligus dengan operasi array.
+
+Untuk portofolio sangat besar, perhitungan per peserta dapat dibagi ke beberapa proses
+(workers > 1). Vektor komutasi, data peserta dan blok hasil ditempatkan di shared memory;
+setiap proses mengisi potongan barisnya sendiri, lalu total dijumlahkan di proses utama dari
+blok hasil yang urutannya sama dengan input, sehingga hasilnya identik dengan satu proses.
+'''
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from danapensiun.commutation import commutation_table
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+
+# Potongan terkecil per proses: di bawah ini biaya menjalankan proses melebihi perhitungannya
+PARALLEL_MIN_CHUNK_SIZE = 25_000
+
+PORTFOLIO_REQUIRED_COLUMNS = ['jenis_kelamin', 'usia_masuk', 'usia_valuasi', 'gaji']
+# Urutan keluaran member_unit_values
+MEMBER_VALUE_COLUMNS = [
+    'PVFB',
+    'Iuran Normal (EAN)', 'Iuran Normal (AAN)', 'Iuran Normal (PUC)',
+    'Kewajiban Aktuaria (EAN)', 'Kewajiban Aktuaria (AAN)', 'Kewajiban Aktuaria (PUC)',
+]
+PORTFOLIO_GENDER_MAP = {
+    'laki-laki': 'Laki-Laki', 'laki laki': 'Laki-Laki', 'l': 'Laki-Laki', 'pria': 'Laki-Laki',
+    'perempuan': 'Perempuan', 'p': 'Perempuan', 'wanita': 'Perempuan',
+}
+
+
+def read_member_file(uploaded_file):
+    '''Membaca file peserta (CSV/XLSX) dan menyeragamkan nama kolom.'''
+    name = getattr(uploaded_file, 'name', str(uploaded_file)).lower()
+    if name.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(uploaded_file)
+    else:
+        df = pd.read_csv(uploaded_file)
+    return normalize_member_columns(df)
+
+
+def normalize_member_columns(df):
+    '''Menyeragamkan nama kolom file peserta (huruf kecil, spasi menjadi garis bawah).'''
+    df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
+    return df
+
+
+def validate_members(df_members, r_default):
+    '''
+    Memvalidasi data peserta dengan aturan yang sama seperti sidebar.
+    Mengembalikan DataFrame peserta yang sudah dinormalisasi dan Series alasan penolakan ('' = valid).
+    '''
+    missing = [c for c in PORTFOLIO_REQUIRED_COLUMNS if c not in df_members.columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+
+    df = df_members.copy()
+    df['jenis_kelamin'] = df['jenis_kelamin'].astype(str).str.strip().str.lower().map(PORTFOLIO_GENDER_MAP)
+    if 'usia_pensiun' not in df.columns:
+        df['usia_pensiun'] = r_default
+    for col in ['usia_masuk', 'usia_valuasi', 'usia_pensiun', 'gaji']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    e = df['usia_masuk']
+    x = df['usia_valuasi']
+    r = df['usia_pensiun']
+    alasan = pd.Series('', index=df.index)
+    alasan = alasan.mask(df['gaji'].isna() | (df['gaji'] < 1_000_000), 'Gaji minimal Rp 1.000.000')
+    alasan = alasan.mask(r.isna() | (r < 55) | (r > 65), 'Usia pensiun harus 55-65')
+    alasan = alasan.mask(r <= e, 'Usia pensiun harus lebih besar dari usia masuk')
+    alasan = alasan.mask(x >= r, 'Usia valuasi harus lebih kecil dari usia pensiun')
+    alasan = alasan.mask(x.isna() | (x < e), 'Usia valuasi tidak boleh lebih kecil dari usia masuk')
+    alasan = alasan.mask(e.isna() | (e < 18) | (e > 60), 'Usia masuk harus 18-60')
+    alasan = alasan.mask(df['jenis_kelamin'].isna(), 'Jenis kelamin tidak dikenali')
+    # Usia pecahan (mis. 40.7) akan terpotong saat diubah ke indeks usia; ditolak, bukan dibulatkan
+    pecahan = pd.concat([usia.notna() & (usia != usia.round()) for usia in (e, x, r)], axis=1).any(axis=1)
+    alasan = alasan.mask(pecahan, 'Usia masuk, usia valuasi dan usia pensiun harus bilangan bulat')
+    return df, alasan
+
+
+def _commutation_by_age(comm_table, column):
+    '''Mengubah kolom tabel komutasi menjadi array float64 yang diindeks langsung dengan usia.'''
+    ages = comm_table['x'].to_numpy(dtype=np.int64)
+    values = np.zeros(ages.max() + 1, dtype=np.float64)
+    values[ages] = comm_table[column].to_numpy(dtype=np.float64)
+    return values
+
+
+def member_unit_values(D, N, g, e, x, r):
+    '''
+    Nilai per unit manfaat (B_r = 1) untuk banyak peserta sekaligus. D dan N berbentuk
+    (gender, usia); g, e, x, r adalah array per peserta (g: 0 Laki-Laki, 1 Perempuan).
+    Mengembalikan (PVFB, NC EAN, NC AAN, NC PUC, AL EAN, AL AAN, AL PUC), masing-masing array.
+    '''
+    D_e, N_e = D[g, e], N[g, e]
+    D_x, N_x = D[g, x], N[g, x]
+    D_r, N_r = D[g, r], N[g, r]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        PVFB_e = np.where(D_e > 0, D_r / D_e, 0.0)
+        PVFB_x = np.where(D_x > 0, D_r / D_x, 0.0)
+        anuitas_x = np.where(D_x > 0, (N_x - N_r) / D_x, 0.0)
+        pembilang_annuitas = N_e - N_r
+        nc_ean = np.where((D_e > 0) & (pembilang_annuitas != 0), PVFB_e * D_e / pembilang_annuitas, 0.0)
+        nc_aan = np.where(anuitas_x > 0, PVFB_e / anuitas_x, 0.0)
+        nc_puc = PVFB_x / (r - e)
+
+    # Peserta di usia masuk (x = e) memiliki AL EAN dan AAN nol eksak, bukan sisa pembatalan float64
+    di_usia_masuk = x == e
+    al_ean = np.where(di_usia_masuk, 0.0, PVFB_x - nc_ean * anuitas_x)
+    al_aan = np.where(di_usia_masuk, 0.0, PVFB_x - nc_aan * anuitas_x)
+    al_puc = (x - e) / (r - e) * PVFB_x
+    return PVFB_x, nc_ean, nc_aan, nc_puc, al_ean, al_aan, al_puc
+
+
+def member_values(D, N, usia, gaji, k, s, out):
+    '''
+    Mengisi out (8, n) dengan B_r lalu MEMBER_VALUE_COLUMNS untuk n peserta. usia berbentuk
+    (4, n) berisi g, e, x, r; k dan s float.
+    '''
+    g, e, x, r = usia
+    # B_r = k * (r - e) * S_{r-1}
+    B_r = k * (r - e) * (gaji * (1.0 + s) ** (r - e - 1))
+    out[0] = B_r
+    # Semua nilai linear terhadap B_r: nilai per unit dikalikan B_r per peserta
+    for baris, nilai in enumerate(member_unit_values(D, N, g, e, x, r), start=1):
+        np.multiply(B_r, nilai, out=out[baris])
+
+
+def _attach(spec):
+    '''Membuka array shared memory dari (nama, bentuk, dtype).'''
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _value_chunk(task):
+    '''Dijalankan di proses pekerja: menilai baris [start, stop) dan menulis ke blok hasil bersama.'''
+    specs, start, stop, k, s = task
+    handles = [_attach(spec) for spec in specs]
+    try:
+        D, N, usia, gaji, out = [array for _, array in handles]
+        member_values(D, N, usia[:, start:stop], gaji[start:stop], k, s, out[:, start:stop])
+    finally:
+        for shm, _ in handles:
+            shm.close()
+
+
+def _parallel_member_values(D, N, usia, gaji, k, s, workers, chunk_size):
+    '''member_values dengan beberapa proses; input dan hasil lewat shared memory.'''
+    n = usia.shape[1]
+    arrays = {'D': D, 'N': N, 'usia': usia, 'gaji': gaji, 'out': np.empty((len(MEMBER_VALUE_COLUMNS) + 1, n))}
+    segments = []
+    try:
+        specs = []
+        for key, array in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            specs.append((shm.name, array.shape, array.dtype.str))
+        tasks = [(specs, start, min(start + chunk_size, n), k, s) for start in range(0, n, chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            list(pool.map(_value_chunk, tasks))
+        out_spec = specs[-1]
+        return np.ndarray(out_spec[1], dtype=out_spec[2], buffer=segments[-1].buf).copy()
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def calculate_portfolio_values(df_members, comm_table_laki, comm_table_perempuan, i, k, s, workers=1, min_chunk_size=PARALLEL_MIN_CHUNK_SIZE):
+    '''
+    Menghitung EAN, AAN dan PUC (NC, AL, PVFB) untuk seluruh peserta sekaligus.
+    Semua peserta memakai vektor komutasi yang sama; tidak ada loop per peserta.
+    df_members harus sudah lolos validate_members.
+
+    Dengan workers > 1 (None = jumlah CPU), peserta dibagi rata ke para proses, ceil(n / workers)
+    baris per potongan tetapi tidak kurang dari min_chunk_size; bila hanya satu potongan yang
+    terbentuk, perhitungan berjalan di proses ini. Hasil per peserta dan total identik dengan
+    workers=1.
+    '''
+    if df_members.empty:
+        return pd.DataFrame(), {}
+
+    # Matriks komutasi [gender, usia]: baris 0 Laki-Laki, baris 1 Perempuan
+    D = np.vstack([_commutation_by_age(comm_table_laki, 'Dx'), _commutation_by_age(comm_table_perempuan, 'Dx')])
+    N = np.vstack([_commutation_by_age(comm_table_laki, 'Nx'), _commutation_by_age(comm_table_perempuan, 'Nx')])
+
+    usia = np.vstack([
+        (df_members['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64),
+        df_members['usia_masuk'].to_numpy(dtype=np.int64),
+        df_members['usia_valuasi'].to_numpy(dtype=np.int64),
+        df_members['usia_pensiun'].to_numpy(dtype=np.int64),
+    ])
+    gaji = df_members['gaji'].to_numpy(dtype=np.float64)
+    k, s = float(k), float(s)
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(math.ceil(len(df_members) / workers), min_chunk_size)
+    if workers > 1 and len(df_members) > chunk_size:
+        nilai = _parallel_member_values(D, N, usia, gaji, k, s, workers, chunk_size)
+    else:
+        nilai = np.empty((len(MEMBER_VALUE_COLUMNS) + 1, len(df_members)))
+        member_values(D, N, usia, gaji, k, s, nilai)
+
+    hasil = df_members.copy()
+    for kolom, baris in zip(['Manfaat Pensiun (Br)', *MEMBER_VALUE_COLUMNS], nilai):
+        hasil[kolom] = baris
+
+    kolom_total = [
+        'Manfaat Pensiun (Br)', 'PVFB',
+        'Iuran Normal (EAN)', 'Iuran Normal (AAN)', 'Iuran Normal (PUC)',
+        'Kewajiban Aktuaria (EAN)', 'Kewajiban Aktuaria (AAN)', 'Kewajiban Aktuaria (PUC)',
+    ]
+    totals = hasil[kolom_total].sum().to_dict()
+    totals['Jumlah Peserta'] = len(hasil)
+    return hasil, totals
+
+
+def value_portfolio(df_members, r_default, i, k, s, table_id=DEFAULT_TABLE_ID, workers=1):
+    '''
+    Memvalidasi lalu menilai seluruh peserta (i, k, s dalam desimal); tabel komutasi diambil
+    dari registri berdasarkan (id tabel, gender, i). workers diteruskan ke
+    calculate_portfolio_values.
+    Mengembalikan (hasil per peserta, total dana, peserta yang ditolak beserta alasannya).
+    Peserta yang ditolak ditampilkan dengan nilai aslinya dari file.
+    '''
+    df_valid, alasan = validate_members(df_members, r_default)
+    valid_mask = alasan == ''
+    hasil, totals = calculate_portfolio_values(
+        df_valid[valid_mask].reset_index(drop=True),
+        commutation_table('Laki-Laki', i, table_id), commutation_table('Perempuan', i, table_id), i, k, s, workers,
+    )
+    ditolak = df_members[~valid_mask].assign(alasan=alasan[~valid_mask])
+    return hasil, totals, ditolak
+
+
+def synthetic_members(n, seed=0):
+    '''
+    Data peserta sintetis yang selalu lolos validate_members (e 18-60, e <= x < r, r 55-65),
+    deterministik untuk seed yang sama. Dipakai benchmark dan tes.
+    '''
+    rng = np.random.default_rng(seed)
+    r = rng.integers(55, 66, n)
+    e = rng.integers(18, 55, n)
+    x = e + (rng.random(n) * (r - e)).astype(np.int64)
+    return pd.DataFrame({
+        'jenis_kelamin': rng.choice(GENDERS, n),
+        'usia_masuk': e,
+        'usia_valuasi': x,
+        'usia_pensiun': r,
+        'gaji': rng.integers(1, 200, n) * 1_000_000,
+    })
@@ -0,0 +1,144 @@
+'''
+Instrumentasi per tahap perhitungan: waktu (wall time), cache hit/miss dan alokasi memori.
+
+Tahap dibuka dengan `stage(nama)`. Jika tidak ada profiler aktif, stage tidak mencatat apa pun
+(biayanya hanya satu pembacaan ContextVar), sehingga aman dipakai di dalam inti perhitungan:
+
+    profiler = StageProfiler()
+    with profiler.activate():
+        with stage('komutasi', caches=[commutation.commutation_table]):
+            ...
+    profiler.to_frame()
+
+Tahap bersarang dicatat dengan nama berjalur, mis. 'valuasi/nilai_akhir'. Setiap catatan juga
+dikirim ke logger 'danapensiun.profiling' (level DEBUG) sebagai satu baris JSON.
+
+Fragmen Streamlit yang dijalankan ulang sendiri (tanpa skrip penuh) membuka `fragment(sink)`:
+profiler rerun penuh sebelumnya sudah ditutup, sehingga fragmen mendapat profiler baru dan
+catatannya dikirim ke sink.
+'''
+import contextlib
+import contextvars
+import json
+import logging
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_active = contextvars.ContextVar('danapensiun_profiler', default=None)
+
+
+class StageProfiler:
+    '''
+    Mengumpulkan catatan per tahap untuk satu kali jalan (mis. satu rerun Streamlit).
+
+    Alokasi dicatat sebagai selisih bersih jumlah blok memori yang dialokasikan interpreter
+    (sys.getallocatedblocks), cukup murah untuk dijalankan di setiap rerun.
+    '''
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._path = []
+        self._seq = 0
+        self.closed = False
+
+    @contextlib.contextmanager
+    def activate(self):
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def install(self):
+        '''
+        Menjadikan profiler ini aktif tanpa blok `with`, untuk skrip seperti aplikasi Streamlit
+        yang dijalankan ulang dari atas: profiler rerun berikutnya menggantikan yang ini.
+        '''
+        _active.set(self)
+        return self
+
+    def close(self):
+        '''
+        Menandai profiler selesai (catatannya sudah diekspor) dan mengembalikan catatannya.
+        Tahap yang dibuka lewat `fragment` setelah ini masuk ke profiler baru.
+        '''
+        self.closed = True
+        return self.records
+
+    @contextlib.contextmanager
+    def stage(self, name, caches=()):
+        self._path.append(name)
+        path = '/'.join(self._path)
+        seq = self._seq
+        self._seq += 1
+        cache_before = [fn.cache_info() for fn in caches]
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            blocks = sys.getallocatedblocks() - blocks_before
+            record = {
+                'run_id': self.run_id,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'seq': seq,
+                'stage': path,
+                'depth': len(self._path) - 1,
+                'wall_ms': wall * 1000,
+                'cache_hits': None,
+                'cache_misses': None,
+                'alloc_blocks': blocks,
+            }
+            if caches:
+                after = [fn.cache_info() for fn in caches]
+                record['cache_hits'] = sum(a['hits'] - b['hits'] for a, b in zip(after, cache_before))
+                record['cache_misses'] = sum(a['misses'] - b['misses'] for a, b in zip(after, cache_before))
+            self._path.pop()
+            self.records.append(record)
+            logger.debug(json.dumps(record))
+
+    def to_frame(self):
+        '''Catatan sebagai DataFrame, urut sesuai mulainya tahap (tahap induk sebelum anaknya).'''
+        df = pd.DataFrame(self.records, columns=[
+            'run_id', 'timestamp', 'seq', 'stage', 'depth', 'wall_ms', 'cache_hits', 'cache_misses', 'alloc_blocks'])
+        return df.sort_values('seq').reset_index(drop=True)
+
+
+def stage(name, caches=()):
+    '''Membuka tahap pada profiler yang aktif; tanpa profiler aktif tidak melakukan apa-apa.'''
+    profiler = _active.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name, caches)
+
+
+@contextlib.contextmanager
+def fragment(sink):
+    '''
+    Membuka profil untuk satu fragmen. Selama rerun penuh (profiler aktif belum ditutup) tahap
+    fragmen masuk ke profiler rerun itu. Pada rerun fragmen saja, profiler rerun sebelumnya sudah
+    ditutup: fragmen dijalankan dengan profiler baru dan catatannya dikirim ke sink(records).
+    '''
+    current = _active.get()
+    if current is not None and not current.closed:
+        yield current
+        return
+    profiler = StageProfiler()
+    try:
+        with profiler.activate():
+            yield profiler
+    finally:
+        sink(profiler.close())
+
+
+def to_jsonl(records):
+    '''Catatan profil (dari satu atau beberapa profiler) sebagai JSON Lines.'''
+    return ''.join(json.dumps(record) + '\n' for record in records)
@@ -0,0 +1,159 @@
+'''
+Proyeksi arus kas dana pensiun kelompok terbuka (open group) untuk banyak tahun ke depan.
+
+Seluruh peserta aktif dimajukan bersama sebagai array, satu tahun per langkah:
+
+1. peserta yang mencapai usia pensiun r keluar dan menerima manfaat B_r (pembayaran sekaligus);
+2. peserta baru masuk pada usia masuk e dengan profil (gender, e, r) yang sama dengan peserta awal;
+3. iuran normal tiap metode dibayar di awal tahun, aset berkembang dengan imbal hasil aset;
+4. peserta menua satu tahun dan bobotnya dikalikan p_x (kematian sebagai nilai harapan).
+
+NC dan AL tiap tahun dihitung dengan rumus yang sama seperti valuasi portofolio
+(portfolio.member_unit_values). Jika aset awal sama dengan AL dan imbal hasil sama dengan i,
+aset EAN dan PUC tepat mengikuti AL-nya setiap tahun (tidak ada keuntungan/kerugian aktuaria);
+pada AAN selisih muncul karena iuran normalnya berubah menurut usia.
+'''
+import numpy as np
+import pandas as pd
+
+from danapensiun.commutation import commutation_table
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+from danapensiun.portfolio import member_unit_values
+
+PROJECTION_METHODS = ('EAN', 'AAN', 'PUC')
+DEFAULT_PROJECTION_YEARS = 60
+# Kebijakan peserta baru: 'ganti' menjaga jumlah peserta aktif tetap sama dengan awal proyeksi
+ENTRANT_POLICIES = ('ganti', 'tetap', 'tertutup')
+
+
+def _commutation_vectors(i, table_id):
+    '''lx, Dx dan Nx float64 berbentuk (gender, usia) dari tabel komutasi di registri.'''
+    tables = [commutation_table(gender, i, table_id) for gender in GENDERS]
+    return tuple(np.vstack([t[col].to_numpy(dtype=np.float64) for t in tables]) for col in ('lx', 'Dx', 'Nx'))
+
+
+def entrant_profile(df_members):
+    '''
+    Profil peserta baru dari peserta awal (keluaran validate_members yang valid): kombinasi unik
+    (gender, e, r) dengan proporsinya dan rata-rata gaji saat masuk.
+    Mengembalikan dict array g, e, r, gaji dan bobot (jumlah bobot = 1).
+    '''
+    g = (df_members['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64)
+    e = df_members['usia_masuk'].to_numpy(dtype=np.int64)
+    r = df_members['usia_pensiun'].to_numpy(dtype=np.int64)
+    gaji = df_members['gaji'].to_numpy(dtype=np.float64)
+    kombinasi, kelompok, jumlah = np.unique(np.column_stack([g, e, r]), axis=0, return_inverse=True, return_counts=True)
+    return {
+        'g': kombinasi[:, 0],
+        'e': kombinasi[:, 1],
+        'r': kombinasi[:, 2],
+        'gaji': np.bincount(kelompok.ravel(), weights=gaji) / jumlah,
+        'bobot': jumlah / jumlah.sum(),
+    }
+
+
+def project_fund(df_members, i, k, s, years=DEFAULT_PROJECTION_YEARS, entrant_policy='ganti', new_entrants=None,
+                 entrant_salary_growth=None, asset_return=None, initial_assets=None, table_id=DEFAULT_TABLE_ID):
+    '''
+    Memproyeksikan dana selama `years` tahun. df_members harus sudah lolos validate_members
+    (i, k, s dalam desimal).
+
+    entrant_policy: 'ganti' (peserta keluar diganti sehingga jumlah aktif tetap), 'tetap'
+    (new_entrants peserta per tahun) atau 'tertutup' (tanpa peserta baru).
+    entrant_salary_growth: kenaikan gaji awal peserta baru per tahun; default s.
+    asset_return: imbal hasil aset per tahun; default i.
+    initial_assets: aset awal (sama untuk semua metode); default AL awal tiap metode (pendanaan penuh).
+
+    Mengembalikan DataFrame per tahun: jumlah peserta, gaji, manfaat dibayar, serta iuran normal,
+    AL, aset dan rasio pendanaan per metode. Aset dan AL diukur di awal tahun setelah
+    pembayaran manfaat dan masuknya peserta baru.
+    '''
+    if entrant_policy not in ENTRANT_POLICIES:
+        raise ValueError(f"Kebijakan peserta baru tidak dikenal: {entrant_policy}")
+    if df_members.empty:
+        return pd.DataFrame()
+
+    lx, D, N = _commutation_vectors(i, table_id)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        px = np.where(lx[:, :-1] > 0, lx[:, 1:] / lx[:, :-1], 0.0)
+    k, s = float(k), float(s)
+    growth = s if entrant_salary_growth is None else float(entrant_salary_growth)
+    imbal = float(i if asset_return is None else asset_return)
+
+    profil = entrant_profile(df_members)
+    profil['B'] = k * (profil['r'] - profil['e']) * profil['gaji'] * (1.0 + s) ** (profil['r'] - profil['e'] - 1)
+
+    # Kohort aktif sebagai array sejajar; w = jumlah peserta (harapan) dalam kohort
+    g = (df_members['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64)
+    e = df_members['usia_masuk'].to_numpy(dtype=np.int64)
+    x = df_members['usia_valuasi'].to_numpy(dtype=np.int64)
+    r = df_members['usia_pensiun'].to_numpy(dtype=np.int64)
+    gaji = df_members['gaji'].to_numpy(dtype=np.float64)
+    B = k * (r - e) * gaji * (1.0 + s) ** (r - e - 1)
+    w = np.ones(len(df_members))
+    jumlah_awal = float(len(df_members))
+
+    aset = None
+    if initial_assets is not None:
+        aset = np.full(len(PROJECTION_METHODS), float(initial_assets))
+
+    rows = []
+    for tahun in range(years):
+        # 1. Pensiun: manfaat sekaligus bagi peserta yang mencapai usia r
+        pensiun = x >= r
+        jumlah_pensiun = w[pensiun].sum()
+        manfaat = (w[pensiun] * B[pensiun]).sum()
+        if pensiun.any():
+            aktif = ~pensiun
+            g, e, x, r, gaji, B, w = g[aktif], e[aktif], x[aktif], r[aktif], gaji[aktif], B[aktif], w[aktif]
+
+        # 2. Peserta baru mengikuti profil peserta awal
+        if tahun == 0 or entrant_policy == 'tertutup':
+            jumlah_baru = 0.0
+        elif entrant_policy == 'tetap':
+            jumlah_baru = float(new_entrants or 0)
+        else:
+            jumlah_baru = max(jumlah_awal - w.sum(), 0.0)
+        if jumlah_baru > 0:
+            indeks_gaji = (1.0 + growth) ** tahun
+            g = np.concatenate([g, profil['g']])
+            e = np.concatenate([e, profil['e']])
+            x = np.concatenate([x, profil['e']])
+            r = np.concatenate([r, profil['r']])
+            gaji = np.concatenate([gaji, profil['gaji'] * indeks_gaji])
+            B = np.concatenate([B, profil['B'] * indeks_gaji])
+            w = np.concatenate([w, profil['bobot'] * jumlah_baru])
+
+        # 3. Nilai per unit dikali B_r dan bobot kohort
+        _, nc_ean, nc_aan, nc_puc, al_ean, al_aan, al_puc = member_unit_values(D, N, g, e, x, r)
+        bobot_manfaat = w * B
+        iuran = np.array([bobot_manfaat @ nc_ean, bobot_manfaat @ nc_aan, bobot_manfaat @ nc_puc])
+        kewajiban = np.array([bobot_manfaat @ al_ean, bobot_manfaat @ al_aan, bobot_manfaat @ al_puc])
+        if aset is None:
+            aset = kewajiban.copy()
+        else:
+            aset = aset - manfaat
+
+        p = px[g, x]
+        row = {
+            'Tahun': tahun,
+            'Peserta Aktif': w.sum(),
+            'Peserta Baru': jumlah_baru,
+            'Pensiun': jumlah_pensiun,
+            'Meninggal': (w * (1.0 - p)).sum(),
+            'Total Gaji': w @ (gaji * (1.0 + s) ** (x - e)),
+            'Manfaat Dibayar': manfaat,
+        }
+        for j, metode in enumerate(PROJECTION_METHODS):
+            row[f'Iuran Normal ({metode})'] = iuran[j]
+            row[f'Kewajiban Aktuaria ({metode})'] = kewajiban[j]
+            row[f'Aset ({metode})'] = aset[j]
+            row[f'Rasio Pendanaan ({metode})'] = aset[j] / kewajiban[j] if kewajiban[j] else np.nan
+        rows.append(row)
+
+        # 4. Iuran masuk, aset berkembang, peserta menua dan bobot dikurangi kematian
+        aset = (aset + iuran) * (1.0 + imbal)
+        w = w * p
+        x = x + 1
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,143 @@
+'''
+Roll-forward dan analisis keuntungan/kerugian aktuaria antara dua tanggal valuasi.
+
+Dua snapshot peserta (berjarak satu tahun) dicocokkan lewat kolom `id_peserta`. Dari snapshot
+awal dihitung AL yang diharapkan setahun kemudian, lalu selisihnya terhadap AL aktual snapshot
+akhir diuraikan per sumber, untuk seluruh peserta sekaligus dengan operasi array.
+
+Nilai per usia (x dan x+1) diambil dari rumus per unit manfaat yang sama dengan tabel per usia
+valuasi (portfolio.member_unit_values) lalu dikalikan B_r, sehingga tidak ada valuasi ulang per
+peserta. Status peserta awal ditentukan dari snapshot akhir:
+
+* ada di snapshot akhir: tetap aktif;
+* tidak ada dan x+1 >= r: pensiun, manfaat B_r dibayar;
+* tidak ada dan x+1 < r: meninggal (model hanya memiliki dekremen kematian).
+
+Untuk setiap metode berlaku AL Akhir = AL Diharapkan + Mortalitas + Gaji + Data Lainnya
++ Peserta Baru + Perubahan Suku Bunga, dengan
+AL Diharapkan = AL Awal + Iuran Normal + Bunga - Manfaat Dibayar + Penyesuaian Metode.
+Penyesuaian Metode nol untuk EAN dan PUC; pada AAN muncul karena iuran normalnya berubah
+menurut usia.
+'''
+import numpy as np
+import pandas as pd
+
+from danapensiun.commutation import commutation_table
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+from danapensiun.portfolio import member_unit_values
+
+ROLLFORWARD_ID_COLUMN = 'id_peserta'
+ROLLFORWARD_METHODS = ('EAN', 'AAN', 'PUC')
+ROLLFORWARD_ROWS = (
+    'AL Awal', 'Iuran Normal', 'Bunga', 'Manfaat Dibayar', 'Penyesuaian Metode', 'AL Diharapkan',
+    'Mortalitas', 'Gaji', 'Data Lainnya', 'Peserta Baru', 'Perubahan Suku Bunga', 'AL Akhir',
+)
+# Indeks NC dan AL per metode pada keluaran member_unit_values
+_NC_INDEX = {'EAN': 1, 'AAN': 2, 'PUC': 3}
+_AL_INDEX = {'EAN': 4, 'AAN': 5, 'PUC': 6}
+
+
+def _commutation(i, table_id):
+    '''lx, Dx dan Nx float64 berbentuk (gender, usia).'''
+    tables = [commutation_table(gender, i, table_id) for gender in GENDERS]
+    return tuple(np.vstack([t[col].to_numpy(dtype=np.float64) for t in tables]) for col in ('lx', 'Dx', 'Nx'))
+
+
+def _member_arrays(df_members, k, s):
+    '''(g, e, x, r, B_r) per peserta; B_r = k * (r - e) * Se * (1+s)^(r-e-1).'''
+    g = (df_members['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64)
+    e = df_members['usia_masuk'].to_numpy(dtype=np.int64)
+    x = df_members['usia_valuasi'].to_numpy(dtype=np.int64)
+    r = df_members['usia_pensiun'].to_numpy(dtype=np.int64)
+    B_r = float(k) * (r - e) * df_members['gaji'].to_numpy(dtype=np.float64) * (1.0 + float(s)) ** (r - e - 1)
+    return g, e, x, r, B_r
+
+
+def _ids(df_members, label):
+    if ROLLFORWARD_ID_COLUMN not in df_members.columns:
+        raise ValueError(f"Kolom {ROLLFORWARD_ID_COLUMN} wajib ada di snapshot {label} untuk mencocokkan peserta.")
+    ids = df_members[ROLLFORWARD_ID_COLUMN].astype(str).str.strip()
+    if ids.duplicated().any():
+        raise ValueError(f"{ROLLFORWARD_ID_COLUMN} duplikat di snapshot {label}: {', '.join(ids[ids.duplicated()].unique()[:5])}")
+    return pd.Index(ids)
+
+
+def roll_forward(df_awal, df_akhir, i, k, s, i_akhir=None, table_id=DEFAULT_TABLE_ID):
+    '''
+    Roll-forward AL dari snapshot awal ke snapshot akhir (keduanya sudah lolos validate_members
+    dan memiliki kolom id_peserta). i, k, s dalam desimal; i_akhir adalah suku bunga valuasi
+    akhir jika berbeda (selisihnya masuk baris Perubahan Suku Bunga).
+
+    Mengembalikan (ringkasan, per_peserta): ringkasan berbaris ROLLFORWARD_ROWS dengan satu kolom
+    per metode; per_peserta berisi status tiap peserta awal dan baru beserta AL awal, AL lanjut
+    (usia x+1 dengan data awal, jika tetap hidup) dan AL akhir per metode.
+    '''
+    id_awal, id_akhir = _ids(df_awal, 'awal'), _ids(df_akhir, 'akhir')
+    i = float(i)
+    i_akhir = i if i_akhir is None else float(i_akhir)
+
+    lx, D, N = _commutation(i, table_id)
+    g0, e0, x0, r0, B0 = _member_arrays(df_awal, k, s)
+    g1, e1, x1, r1, B1 = _member_arrays(df_akhir, k, s)
+
+    # Pencocokan peserta: posisi di snapshot akhir, -1 jika keluar
+    posisi = id_akhir.get_indexer(id_awal)
+    aktif = posisi >= 0
+    pensiun = ~aktif & (x0 + 1 >= r0)
+    meninggal = ~aktif & ~pensiun
+    baru = np.ones(len(df_akhir), dtype=bool)
+    baru[posisi[aktif]] = False
+    q = 1.0 - lx[g0, x0 + 1] / lx[g0, x0]
+
+    unit_awal = member_unit_values(D, N, g0, e0, x0, r0)
+    unit_lanjut = member_unit_values(D, N, g0, e0, x0 + 1, r0)
+    unit_akhir = member_unit_values(D, N, g1, e1, x1, r1)
+    if i_akhir != i:
+        _, D_akhir, N_akhir = _commutation(i_akhir, table_id)
+        unit_akhir_baru = member_unit_values(D_akhir, N_akhir, g1, e1, x1, r1)
+    else:
+        unit_akhir_baru = unit_akhir
+
+    B1_cocok = B1[posisi[aktif]]
+    ringkasan = {}
+    per_peserta = {
+        ROLLFORWARD_ID_COLUMN: np.concatenate([id_awal.to_numpy(), id_akhir[baru].to_numpy()]),
+        'status': np.concatenate([
+            np.select([aktif, pensiun], ['aktif', 'pensiun'], 'meninggal'),
+            np.full(baru.sum(), 'baru'),
+        ]),
+    }
+    for metode in ROLLFORWARD_METHODS:
+        al_awal = B0 * unit_awal[_AL_INDEX[metode]]
+        nc_awal = B0 * unit_awal[_NC_INDEX[metode]]
+        al_lanjut = B0 * unit_lanjut[_AL_INDEX[metode]]
+        al_akhir = B1 * unit_akhir[_AL_INDEX[metode]]
+        al_akhir_baru = B1 * unit_akhir_baru[_AL_INDEX[metode]]
+
+        bunga = i * (al_awal.sum() + nc_awal.sum())
+        manfaat = B0[pensiun].sum()
+        penyesuaian = ((1.0 - q) * al_lanjut).sum() - (1.0 + i) * (al_awal.sum() + nc_awal.sum())
+        diharapkan = al_awal.sum() + nc_awal.sum() + bunga - manfaat + penyesuaian
+        unit_lanjut_aktif = unit_lanjut[_AL_INDEX[metode]][aktif]
+        ringkasan[metode] = [
+            al_awal.sum(),
+            nc_awal.sum(),
+            bunga,
+            -manfaat,
+            penyesuaian,
+            diharapkan,
+            (q * al_lanjut).sum() - al_lanjut[meninggal].sum(),
+            ((B1_cocok - B0[aktif]) * unit_lanjut_aktif).sum(),
+            (al_akhir[posisi[aktif]] - B1_cocok * unit_lanjut_aktif).sum(),
+            al_akhir[baru].sum(),
+            (al_akhir_baru - al_akhir).sum(),
+            al_akhir_baru.sum(),
+        ]
+
+        kolom_akhir = np.full(len(id_awal), np.nan)
+        kolom_akhir[aktif] = al_akhir_baru[posisi[aktif]]
+        per_peserta[f'AL Awal ({metode})'] = np.concatenate([al_awal, np.full(baru.sum(), np.nan)])
+        per_peserta[f'AL Lanjut ({metode})'] = np.concatenate([al_lanjut, np.full(baru.sum(), np.nan)])
+        per_peserta[f'AL Akhir ({metode})'] = np.concatenate([kolom_akhir, al_akhir_baru[baru]])
+
+    return pd.DataFrame(ringkasan, index=list(ROLLFORWARD_ROWS)), pd.DataFrame(per_peserta)
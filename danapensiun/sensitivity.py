@@ -0,0 +1,211 @@
+'''
+Analisis sensitivitas: NC, AL dan PVFB untuk seluruh grid Suku Bunga (i) x Kenaikan Gaji (s).
+
+Semua nilai linear terhadap B_r, sehingga grid dihitung sebagai perkalian luar antara nilai
+per unit manfaat untuk setiap i (dari vektor komutasi) dan B_r untuk setiap s.
+
+Sensitivitas suku bunga (durasi modifikasi, konveksitas, PV01) dihitung analitis: turunan
+Dx dan Nx terhadap i tersedia di tabel komutasi, lalu dibawa melalui rumus valuasi yang sama
+dengan aritmetika turunan (nilai, turunan pertama, turunan kedua) dalam satu kali evaluasi.
+'''
+import numpy as np
+import pandas as pd
+
+from danapensiun.cache import memoize
+from danapensiun.commutation import commutation_matrix, commutation_table, rate_bp
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+
+SENSITIVITY_METRICS = (
+    'PVFB',
+    'Iuran Normal (EAN)',
+    'Iuran Normal (AAN)',
+    'Iuran Normal (PUC)',
+    'Kewajiban Aktuaria (EAN)',
+    'Kewajiban Aktuaria (AAN)',
+    'Kewajiban Aktuaria (PUC)',
+)
+
+
+def unit_values_over_rates(Dx, Nx, x_entry, x_now, r):
+    '''
+    Nilai per unit manfaat (B_r = 1) di usia valuasi untuk setiap baris suku bunga.
+    Dx dan Nx berbentuk (suku bunga, usia); hasilnya dict metrik -> array (suku bunga,).
+    '''
+    D_e, N_e = Dx[:, x_entry], Nx[:, x_entry]
+    D_x, N_x = Dx[:, x_now], Nx[:, x_now]
+    D_r, N_r = Dx[:, r], Nx[:, r]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        PVFB_e = np.where(D_e > 0, D_r / D_e, 0.0)
+        PVFB_x = np.where(D_x > 0, D_r / D_x, 0.0)
+        anuitas_x = np.where(D_x > 0, (N_x - N_r) / D_x, 0.0)
+        pembilang_annuitas = N_e - N_r
+        nc_ean = np.where((D_e > 0) & (pembilang_annuitas != 0), PVFB_e * D_e / pembilang_annuitas, 0.0)
+        nc_aan = np.where(anuitas_x > 0, PVFB_e / anuitas_x, 0.0)
+
+    return {
+        'PVFB': PVFB_x,
+        'Iuran Normal (EAN)': nc_ean,
+        'Iuran Normal (AAN)': nc_aan,
+        'Iuran Normal (PUC)': PVFB_x / (r - x_entry),
+        'Kewajiban Aktuaria (EAN)': PVFB_x - nc_ean * anuitas_x,
+        'Kewajiban Aktuaria (AAN)': PVFB_x - nc_aan * anuitas_x,
+        'Kewajiban Aktuaria (PUC)': (x_now - x_entry) / (r - x_entry) * PVFB_x,
+    }
+
+
+def _sensitivity_key(jenis_kelamin, x_entry, x_now, r, k, gaji_masuk, rates, salary_increases, target_benefit=None, table_id=DEFAULT_TABLE_ID):
+    return (
+        table_id, jenis_kelamin, x_entry, x_now, r, rate_bp(k), gaji_masuk,
+        tuple(rate_bp(i) for i in rates), tuple(rate_bp(s) for s in salary_increases), target_benefit,
+    )
+
+
+@memoize(key=_sensitivity_key)
+def sensitivity_grid(jenis_kelamin, x_entry, x_now, r, k, gaji_masuk, rates, salary_increases, target_benefit=None, table_id=DEFAULT_TABLE_ID):
+    '''
+    Menghitung seluruh metrik untuk grid (rates x salary_increases) dalam satu batch.
+    rates dan salary_increases adalah tuple suku bunga desimal (mis. 0.04). Jika target_benefit
+    diisi, B_r tetap sehingga hasil tidak bergantung pada s.
+    Mengembalikan dict metrik -> array 2D (len(rates), len(salary_increases)).
+    '''
+    Dx, Nx = commutation_matrix(jenis_kelamin, rates, table_id)
+    unit = unit_values_over_rates(Dx, Nx, x_entry, x_now, r)
+
+    s = np.asarray(salary_increases, dtype=np.float64)
+    if target_benefit is not None:
+        B_r = np.full(len(s), float(target_benefit))
+    else:
+        # B_r = k * (r - e) * S_e * (1+s)^(r-e-1)
+        B_r = float(k) * (r - x_entry) * float(gaji_masuk) * (1.0 + s) ** (r - x_entry - 1)
+
+    return {metric: np.outer(values, B_r) for metric, values in unit.items()}
+
+
+def grid_to_frame(grid, rates, salary_increases):
+    '''Mengubah hasil sensitivity_grid menjadi DataFrame panjang (satu baris per titik i, s) untuk grafik.'''
+    i_mesh, s_mesh = np.meshgrid(np.asarray(rates, dtype=np.float64), np.asarray(salary_increases, dtype=np.float64), indexing='ij')
+    data = {
+        'Suku Bunga (i) %': np.round(i_mesh.ravel() * 100, 4),
+        'Kenaikan Gaji (s) %': np.round(s_mesh.ravel() * 100, 4),
+    }
+    data.update({metric: values.ravel() for metric, values in grid.items()})
+    return pd.DataFrame(data)
+
+
+RATE_SENSITIVITY_COLUMNS = ('Nilai', 'Durasi Modifikasi', 'Konveksitas', 'PV01')
+
+
+class _Jet:
+    '''Nilai beserta turunan pertama dan kedua terhadap i; mendukung +, -, * dan /.'''
+
+    __slots__ = ('f', 'd1', 'd2')
+
+    def __init__(self, f, d1=0.0, d2=0.0):
+        self.f, self.d1, self.d2 = f, d1, d2
+
+    def __add__(self, other):
+        if not isinstance(other, _Jet):
+            return _Jet(self.f + other, self.d1, self.d2)
+        return _Jet(self.f + other.f, self.d1 + other.d1, self.d2 + other.d2)
+
+    def __sub__(self, other):
+        if not isinstance(other, _Jet):
+            return _Jet(self.f - other, self.d1, self.d2)
+        return _Jet(self.f - other.f, self.d1 - other.d1, self.d2 - other.d2)
+
+    def __mul__(self, other):
+        if not isinstance(other, _Jet):
+            return _Jet(self.f * other, self.d1 * other, self.d2 * other)
+        return _Jet(
+            self.f * other.f,
+            self.d1 * other.f + self.f * other.d1,
+            self.d2 * other.f + 2 * self.d1 * other.d1 + self.f * other.d2,
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if not isinstance(other, _Jet):
+            return _Jet(self.f / other, self.d1 / other, self.d2 / other)
+        q = self.f / other.f
+        q1 = (self.d1 - q * other.d1) / other.f
+        q2 = (self.d2 - 2 * q1 * other.d1 - q * other.d2) / other.f
+        return _Jet(q, q1, q2)
+
+
+def unit_rate_jets(D, N, dD, dN, d2D, d2N, g, e, x, r):
+    '''
+    Nilai per unit manfaat beserta turunan pertama dan kedua terhadap i, untuk banyak peserta
+    sekaligus (rumus sama dengan portfolio.member_unit_values; berlaku untuk e <= x < r).
+    Semua array komutasi berbentuk (gender, usia). Mengembalikan dict metrik -> _Jet.
+    '''
+    def jet(age):
+        return _Jet(D[g, age], dD[g, age], d2D[g, age]), _Jet(N[g, age], dN[g, age], d2N[g, age])
+
+    (D_e, N_e), (D_x, N_x), (D_r, N_r) = jet(e), jet(x), jet(r)
+    PVFB_e = D_r / D_e
+    PVFB_x = D_r / D_x
+    anuitas_x = (N_x - N_r) / D_x
+    nc_ean = PVFB_e * D_e / (N_e - N_r)
+    nc_aan = PVFB_e / anuitas_x
+    return {
+        'PVFB': PVFB_x,
+        'Iuran Normal (EAN)': nc_ean,
+        'Iuran Normal (AAN)': nc_aan,
+        'Iuran Normal (PUC)': PVFB_x / (r - e),
+        'Kewajiban Aktuaria (EAN)': PVFB_x - nc_ean * anuitas_x,
+        'Kewajiban Aktuaria (AAN)': PVFB_x - nc_aan * anuitas_x,
+        'Kewajiban Aktuaria (PUC)': PVFB_x * ((x - e) / (r - e)),
+    }
+
+
+def _rate_commutation(i, table_id):
+    '''Dx, Nx dan turunannya terhadap i sebagai array float64 (gender, usia).'''
+    tables = [commutation_table(gender, i, table_id) for gender in GENDERS]
+    return [np.vstack([t[col].to_numpy(dtype=np.float64) for t in tables]) for col in ('Dx', 'Nx', 'dDx', 'dNx', 'd2Dx', 'd2Nx')]
+
+
+def rate_jet_totals(df_members, B_r, i, table_id=DEFAULT_TABLE_ID):
+    '''
+    Jumlah (V, V', V'') per metrik untuk seluruh peserta. Jumlah ini aditif antar kelompok
+    peserta, sehingga dapat diakumulasi per potongan data lalu diubah dengan rate_sensitivity_frame.
+    '''
+    g = (df_members['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64)
+    e = df_members['usia_masuk'].to_numpy(dtype=np.int64)
+    x = df_members['usia_valuasi'].to_numpy(dtype=np.int64)
+    r = df_members['usia_pensiun'].to_numpy(dtype=np.int64)
+    B_r = np.asarray(B_r, dtype=np.float64)
+    return {
+        metric: np.array([B_r @ jet.f, B_r @ jet.d1, B_r @ jet.d2])
+        for metric, jet in unit_rate_jets(*_rate_commutation(i, table_id), g, e, x, r).items()
+    }
+
+
+def rate_sensitivity_frame(jet_totals):
+    '''DataFrame RATE_SENSITIVITY_COLUMNS per metrik dari keluaran rate_jet_totals.'''
+    rows = {}
+    for metric, (nilai, d1, d2) in jet_totals.items():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rows[metric] = (nilai, -d1 / nilai, d2 / nilai, -d1 * 1e-4)
+    return pd.DataFrame.from_dict(rows, orient='index', columns=list(RATE_SENSITIVITY_COLUMNS))
+
+
+def rate_sensitivities(df_members, B_r, i, table_id=DEFAULT_TABLE_ID):
+    '''
+    Sensitivitas suku bunga total seluruh peserta (kolom jenis_kelamin, usia_masuk,
+    usia_valuasi, usia_pensiun) dengan manfaat B_r per peserta.
+
+    Mengembalikan DataFrame per metrik: Nilai, Durasi Modifikasi (-V'/V), Konveksitas (V''/V)
+    dan PV01 (penurunan nilai jika i naik 1 basis poin, -V' x 0,0001). Turunan terhadap i
+    efektif tahunan, sama seperti menggeser slider suku bunga (iuran normal ikut berubah).
+    '''
+    return rate_sensitivity_frame(rate_jet_totals(df_members, B_r, i, table_id))
+
+
+def member_rate_sensitivities(jenis_kelamin, x_entry, x_now, r, i, B_r, table_id=DEFAULT_TABLE_ID):
+    '''Sensitivitas suku bunga satu peserta; lihat rate_sensitivities.'''
+    df_member = pd.DataFrame({
+        'jenis_kelamin': [jenis_kelamin], 'usia_masuk': [x_entry], 'usia_valuasi': [x_now], 'usia_pensiun': [r],
+    })
+    return rate_sensitivities(df_member, [float(B_r)], i, table_id)
@@ -0,0 +1,174 @@
+'''
+Solver invers: mencari k, gaji awal (Se), target manfaat (B_r) atau suku bunga (i) yang
+memenuhi sasaran Iuran Normal, Kewajiban Aktuaria atau rasio penggantian.
+
+NC dan AL linear terhadap B_r, dan B_r = k * (r - e) * Se * (1+s)^(r-e-1) linear terhadap k
+maupun Se, sehingga untuk k, Se dan B_r solusinya tertutup: nilai sekarang diskalakan dengan
+target / nilai. Hanya suku bunga yang memerlukan pencarian akar: seluruh grid slider
+(0-15%) dievaluasi sekaligus dari kubus komutasi untuk mencari selang yang mengapit akar,
+lalu akar diperhalus dengan regula falsi (Illinois) di luar grid.
+
+Peserta dengan (gender, e, x, r) yang sama dikelompokkan lebih dulu, sehingga satu evaluasi
+portofolio hanya menghitung nilai per unit untuk kombinasi usia yang unik.
+'''
+import numpy as np
+import pandas as pd
+
+from danapensiun.commutation import CUBE_RATE_STEPS, commutation_matrix
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+from danapensiun.portfolio import MEMBER_VALUE_COLUMNS, member_unit_values
+
+SOLVER_UNKNOWNS = ('k', 'gaji', 'manfaat', 'i')
+SOLVER_GOALS = ('nc', 'al', 'rasio')
+SOLVER_METHODS = ('EAN', 'AAN', 'PUC')
+# Suku bunga yang dicari dibatasi pada rentang slider
+SOLVER_RATE_GRID = np.arange(CUBE_RATE_STEPS) / 1000
+
+
+def goal_column(goal, method):
+    '''Kolom MEMBER_VALUE_COLUMNS untuk sasaran 'nc' atau 'al' dan metode EAN/AAN/PUC.'''
+    return f"{'Iuran Normal' if goal == 'nc' else 'Kewajiban Aktuaria'} ({method})"
+
+
+def _member_groups(df_members, k, s, target_benefit):
+    '''
+    Mengelompokkan peserta per (g, e, x, r). Mengembalikan (g, e, x, r, jumlah peserta,
+    jumlah B_r, jumlah S_{r-1}) per kelompok.
+    '''
+    g = (df_members['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64)
+    e = df_members['usia_masuk'].to_numpy(dtype=np.int64)
+    x = df_members['usia_valuasi'].to_numpy(dtype=np.int64)
+    r = df_members['usia_pensiun'].to_numpy(dtype=np.int64)
+    Sr_minus_1 = df_members['gaji'].to_numpy(dtype=np.float64) * (1.0 + float(s)) ** (r - e - 1)
+    if target_benefit is not None:
+        B_r = np.full(len(df_members), float(target_benefit))
+    else:
+        B_r = float(k) * (r - e) * Sr_minus_1
+
+    # Usia < 1000, sehingga (g, e, x, r) dapat digabung menjadi satu kunci bilangan bulat
+    kunci, kelompok, jumlah = np.unique(((g * 1000 + e) * 1000 + x) * 1000 + r, return_inverse=True, return_counts=True)
+    kombinasi = [kunci // 10**9, kunci // 10**6 % 1000, kunci // 1000 % 1000, kunci % 1000]
+    return (*kombinasi, jumlah, np.bincount(kelompok, weights=B_r), np.bincount(kelompok, weights=Sr_minus_1))
+
+
+def _unit_goal_over_rates(groups, column, rates, table_id):
+    '''Nilai per unit manfaat kolom sasaran untuk setiap kelompok dan suku bunga: array (suku bunga, kelompok).'''
+    g, e, x, r = groups[:4]
+    matrices = [commutation_matrix(gender, rates, table_id) for gender in GENDERS]
+    j = MEMBER_VALUE_COLUMNS.index(column)
+    hasil = np.empty((len(rates), len(g)))
+    for baris in range(len(rates)):
+        D = np.vstack([Dx[baris] for Dx, _ in matrices])
+        N = np.vstack([Nx[baris] for _, Nx in matrices])
+        hasil[baris] = member_unit_values(D, N, g, e, x, r)[j]
+    return hasil
+
+
+def _illinois(f, a, fa, b, fb, ftol, xtol=1e-15, max_iter=100):
+    '''Regula falsi (varian Illinois) pada selang [a, b] dengan f(a) dan f(b) berlawanan tanda.'''
+    evaluasi = 0
+    c = a
+    for _ in range(max_iter):
+        c = b - fb * (b - a) / (fb - fa)
+        fc = f(c)
+        evaluasi += 1
+        if abs(fc) <= ftol or abs(c - b) <= xtol:
+            break
+        if fc * fb < 0:
+            a, fa = b, fb
+        else:
+            fa = fa / 2
+        b, fb = c, fc
+    return c, evaluasi
+
+
+def solve(df_members, i, k, s, unknown, goal, target, method='EAN', target_benefit=None, table_id=DEFAULT_TABLE_ID):
+    '''
+    Mencari nilai `unknown` ('k', 'gaji', 'manfaat' atau 'i') agar total sasaran seluruh peserta
+    sama dengan `target`. df_members harus sudah lolos validate_members (i, k, s dalam desimal).
+
+    goal: 'nc' (total Iuran Normal metode `method`), 'al' (total Kewajiban Aktuaria metode
+    `method`) atau 'rasio' (rasio penggantian total B_r / total S_{r-1}).
+    Untuk 'gaji', hasil pada portofolio adalah faktor pengali seluruh gaji (satu peserta: gaji
+    awal). Untuk 'manfaat', semua peserta memakai satu target manfaat B_r yang sama.
+    Jika target_benefit diisi, B_r tetap dan tidak bergantung pada k maupun gaji.
+
+    Mengembalikan dict: variabel, nilai (solusi), nilai_awal, target, hasil (nilai sasaran
+    pada solusi) dan evaluasi (jumlah evaluasi valuasi tambahan).
+    '''
+    if unknown not in SOLVER_UNKNOWNS:
+        raise ValueError(f"Variabel tidak dikenal: {unknown}")
+    if goal not in SOLVER_GOALS:
+        raise ValueError(f"Sasaran tidak dikenal: {goal}")
+    if df_members.empty:
+        raise ValueError("Tidak ada peserta untuk dicari solusinya.")
+    if target_benefit is not None and unknown in ('k', 'gaji'):
+        raise ValueError("Dengan target manfaat, B_r tidak bergantung pada k maupun gaji.")
+    if goal == 'rasio' and unknown in ('gaji', 'i'):
+        raise ValueError("Rasio penggantian tidak bergantung pada gaji maupun suku bunga.")
+    target = float(target)
+
+    groups = _member_groups(df_members, k, s, target_benefit)
+    jumlah, total_B, total_S = groups[4:]
+    satu_peserta = len(df_members) == 1
+
+    if unknown == 'i':
+        f = lambda rate: total_B @ _unit_goal_over_rates(groups, goal_column(goal, method), (rate,), table_id)[0] - target
+        # Seluruh grid slider dievaluasi sekaligus untuk mencari selang yang mengapit akar
+        selisih = total_B @ _unit_goal_over_rates(groups, goal_column(goal, method), SOLVER_RATE_GRID, table_id).T - target
+        akar = np.flatnonzero(selisih == 0)
+        apit = np.flatnonzero(np.sign(selisih[:-1]) * np.sign(selisih[1:]) < 0)
+        if len(akar):
+            idx = akar[np.argmin(np.abs(SOLVER_RATE_GRID[akar] - float(i)))]
+            nilai, evaluasi = SOLVER_RATE_GRID[idx], 0
+        elif len(apit):
+            idx = apit[np.argmin(np.abs(SOLVER_RATE_GRID[apit] - float(i)))]
+            a, b = SOLVER_RATE_GRID[idx], SOLVER_RATE_GRID[idx + 1]
+            nilai, evaluasi = _illinois(f, a, selisih[idx], b, selisih[idx + 1], ftol=1e-12 * max(abs(target), 1.0))
+        else:
+            raise ValueError(
+                f"Target tidak tercapai pada suku bunga {SOLVER_RATE_GRID[0]:.1%}-{SOLVER_RATE_GRID[-1]:.1%} "
+                f"(rentang {selisih.min() + target:,.2f} s.d. {selisih.max() + target:,.2f}).")
+        return {
+            'variabel': unknown, 'nilai': float(nilai), 'nilai_awal': float(i), 'target': target,
+            'hasil': float(f(nilai) + target), 'evaluasi': evaluasi + len(SOLVER_RATE_GRID),
+        }
+
+    # k, gaji dan manfaat: nilai sasaran linear (sebanding) terhadap variabel
+    if goal == 'rasio':
+        nilai_goal = lambda total_benefit: total_benefit.sum() / total_S.sum()
+        unit = None
+    else:
+        unit = _unit_goal_over_rates(groups, goal_column(goal, method), (i,), table_id)[0]
+        nilai_goal = lambda total_benefit: total_benefit @ unit
+
+    if unknown == 'manfaat':
+        # Portofolio: nilai awal adalah rata-rata B_r peserta
+        nilai_awal = float(target_benefit) if target_benefit is not None else float(total_B.sum() / jumlah.sum())
+        per_unit = nilai_goal(jumlah.astype(np.float64))
+        if per_unit == 0:
+            raise ValueError("Nilai sasaran nol untuk manfaat berapa pun; target tidak dapat dicapai.")
+        nilai = target / per_unit
+        total_solusi = jumlah * nilai
+    else:
+        sekarang = nilai_goal(total_B)
+        if sekarang == 0:
+            raise ValueError("Nilai sasaran saat ini nol sehingga tidak dapat diskalakan.")
+        faktor = target / sekarang
+        nilai_awal = float(k) if unknown == 'k' else (float(df_members['gaji'].iloc[0]) if satu_peserta else 1.0)
+        nilai = nilai_awal * faktor
+        total_solusi = total_B * faktor
+    return {
+        'variabel': unknown, 'nilai': float(nilai), 'nilai_awal': nilai_awal, 'target': target,
+        'hasil': float(nilai_goal(total_solusi)), 'evaluasi': 0 if unit is None else 1,
+    }
+
+
+def solve_member(jenis_kelamin, x_entry, x_now, r, i, k, gaji_masuk, s, unknown, goal, target, method='EAN',
+                 target_benefit=None, table_id=DEFAULT_TABLE_ID):
+    '''Solver untuk satu peserta dengan parameter sidebar; lihat `solve`.'''
+    df_member = pd.DataFrame({
+        'jenis_kelamin': [jenis_kelamin], 'usia_masuk': [x_entry], 'usia_valuasi': [x_now],
+        'usia_pensiun': [r], 'gaji': [float(gaji_masuk)],
+    })
+    return solve(df_member, i, k, s, unknown, goal, target, method, target_benefit, table_id)
@@ -0,0 +1,151 @@
+'''
+Valuasi dengan suku bunga stokastik (Monte Carlo).
+
+Lintasan suku bunga tahunan dibangkitkan dengan model Vasicek, CIR, atau bootstrap dari
+riwayat imbal hasil, lalu diubah menjadi faktor diskonto P(t) = prod_{u<t} 1/(1+r_u).
+Mortalita tetap deterministik (tabel registri yang dipilih lewat table_id), sehingga seluruh
+liabilitas peserta maupun portofolio dapat diringkas menjadi vektor bobot per tahun t dan nilai
+tiap lintasan cukup dihitung dengan perkalian matriks P @ W. Lintasan dibagi ke beberapa proses
+per blok.
+
+Dengan volatilitas nol dan r0 = b = i, setiap lintasan sama dengan perhitungan
+deterministik build_commutation_table (pemeriksaan nol-volatilitas).
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from danapensiun.commutation import commutation_table
+from danapensiun.mortality import DEFAULT_TABLE_ID, GENDERS
+
+STOCHASTIC_MODELS = ('vasicek', 'cir', 'bootstrap')
+STOCHASTIC_METRICS = ('PVFB', 'Kewajiban Aktuaria (EAN)', 'Kewajiban Aktuaria (AAN)', 'Kewajiban Aktuaria (PUC)')
+DEFAULT_LEVELS = (0.5, 0.75, 0.9, 0.95, 0.99, 0.995)
+
+
+def liability_weights(df_valued, i, table_id=DEFAULT_TABLE_ID):
+    '''
+    Meringkas peserta yang sudah divaluasi (keluaran portfolio.calculate_portfolio_values)
+    menjadi matriks bobot W berbentuk (jumlah tahun + 1, 4) sehingga untuk faktor diskonto
+    P (lintasan, tahun + 1): [PVFB, AL EAN, AL AAN, AL PUC] = P @ W.
+
+    Iuran normal EAN/AAN memakai basis pendanaan deterministik (suku bunga i); yang stokastik
+    adalah nilai kini manfaat dan iuran masa depan.
+    '''
+    lx = np.vstack([commutation_table(gender, i, table_id)['lx'].to_numpy(dtype=np.float64) for gender in GENDERS])
+    g = (df_valued['jenis_kelamin'] == 'Perempuan').to_numpy(dtype=np.int64)
+    e = df_valued['usia_masuk'].to_numpy(dtype=np.int64)
+    x = df_valued['usia_valuasi'].to_numpy(dtype=np.int64)
+    r = df_valued['usia_pensiun'].to_numpy(dtype=np.int64)
+    B_r = df_valued['Manfaat Pensiun (Br)'].to_numpy(dtype=np.float64)
+    nc_ean = df_valued['Iuran Normal (EAN)'].to_numpy(dtype=np.float64)
+    nc_aan = df_valued['Iuran Normal (AAN)'].to_numpy(dtype=np.float64)
+
+    n_years = r - x
+    horizon = int(n_years.max()) if len(n_years) else 0
+    l_x = lx[g, x]
+
+    # Manfaat dibayar di usia r -> jatuh pada t = r - x
+    manfaat = B_r * lx[g, r] / l_x
+    W = np.zeros((horizon + 1, len(STOCHASTIC_METRICS)), dtype=np.float64)
+    W[:, 0] = np.bincount(n_years, weights=manfaat, minlength=horizon + 1)
+    W[:, 3] = np.bincount(n_years, weights=manfaat * (x - e) / (r - e), minlength=horizon + 1)
+
+    # Iuran masa depan dibayar di awal tahun t = 0 .. r-x-1 selama peserta hidup
+    for t in range(horizon):
+        aktif = n_years > t
+        peluang_hidup = np.where(aktif, lx[g, np.minimum(x + t, lx.shape[1] - 1)] / l_x, 0.0)
+        W[t, 1] -= np.sum(nc_ean * peluang_hidup)
+        W[t, 2] -= np.sum(nc_aan * peluang_hidup)
+    W[:, 1] += W[:, 0]
+    W[:, 2] += W[:, 0]
+    return W
+
+
+def _rate_paths(rng, model, n_paths, horizon, params):
+    '''Membangkitkan lintasan suku bunga tahunan (n_paths, horizon) untuk satu blok.'''
+    if model == 'bootstrap':
+        history = np.asarray(params['history'], dtype=np.float64)
+        return history[rng.integers(0, len(history), size=(n_paths, horizon))]
+
+    a, b, sigma = params['a'], params['b'], params['sigma']
+    rates = np.empty((n_paths, horizon), dtype=np.float64)
+    current = np.full(n_paths, params['r0'], dtype=np.float64)
+    for t in range(horizon):
+        rates[:, t] = current
+        shock = rng.standard_normal(n_paths)
+        if model == 'cir':
+            current = np.maximum(current + a * (b - current) + sigma * np.sqrt(np.maximum(current, 0.0)) * shock, 0.0)
+        else:
+            current = current + a * (b - current) + sigma * shock
+    return rates
+
+
+def discount_factors(rates):
+    '''P(t) = prod_{u<t} 1/(1+r_u) untuk t = 0 .. horizon, per lintasan.'''
+    P = np.ones((rates.shape[0], rates.shape[1] + 1), dtype=np.float64)
+    np.cumprod(1.0 / (1.0 + rates), axis=1, out=P[:, 1:])
+    return P
+
+
+def _simulate_chunk(task):
+    '''Dijalankan di proses pekerja: satu blok lintasan -> nilai per lintasan (n_paths, 4).'''
+    seed, n_paths, model, params, W = task
+    rng = np.random.default_rng(seed)
+    P = discount_factors(_rate_paths(rng, model, n_paths, W.shape[0] - 1, params))
+    return P @ W
+
+
+def simulate(W, model='vasicek', params=None, n_paths=10_000, chunk_size=50_000, workers=None, seed=None):
+    '''
+    Menjalankan simulasi Monte Carlo dan mengembalikan array (n_paths, 4) berisi
+    [PVFB, AL EAN, AL AAN, AL PUC] per lintasan.
+
+    Lintasan dibagi per blok chunk_size dengan seed turunan (SeedSequence.spawn), sehingga
+    hasil sama berapa pun jumlah proses. workers=1 menjalankan semuanya di proses ini.
+    '''
+    if model not in STOCHASTIC_MODELS:
+        raise ValueError(f"Model tidak dikenal: {model}")
+    params = dict(params or {})
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(child, size, model, params, W) for child, size in zip(seeds, sizes)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    return np.vstack(results)
+
+
+def deterministic_values(W, i):
+    '''Nilai dengan suku bunga datar i (volatilitas nol), sebagai pembanding.'''
+    v_pow = np.power(1.0 / (1.0 + float(i)), np.arange(W.shape[0], dtype=np.float64))
+    return v_pow @ W
+
+
+def summarize(values, deterministic=None, levels=DEFAULT_LEVELS):
+    '''
+    Ringkasan distribusi per metrik: rata-rata, simpangan baku, persentil, VaR dan CTE.
+    VaR_a adalah persentil a dikurangi rata-rata; CTE_a adalah rata-rata lintasan di atas persentil a.
+    '''
+    rows = []
+    for j, metric in enumerate(STOCHASTIC_METRICS):
+        col = values[:, j]
+        mean = col.mean()
+        row = {'Metrik': metric, 'Rata-rata': mean, 'Simpangan Baku': col.std(ddof=1) if len(col) > 1 else 0.0}
+        if deterministic is not None:
+            row['Deterministik'] = deterministic[j]
+        for level in levels:
+            q = np.quantile(col, level)
+            row[f'P{level * 100:g}'] = q
+        tail_level = max(levels)
+        q_tail = np.quantile(col, tail_level)
+        row[f'VaR {tail_level * 100:g}%'] = q_tail - mean
+        row[f'CTE {tail_level * 100:g}%'] = col[col >= q_tail].mean()
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('Metrik')
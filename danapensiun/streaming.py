@@ -0,0 +1,78 @@
+'''
+Valuasi portofolio bertahap (streaming) untuk file peserta CSV yang terlalu besar untuk dibaca sekaligus.
+
+File dibaca per potongan (chunk) berukuran tetap. Setiap potongan divalidasi dengan aturan yang
+sama seperti sidebar (portfolio.validate_members), dinilai dengan calculate_portfolio_values, lalu
+hanya jumlahnya yang disimpan: total dana, jumlah (V, V', V'') untuk sensitivitas suku bunga,
+jumlah penolakan per alasan dan contoh peserta yang ditolak. Hasil per peserta dapat ditulis
+langsung ke file CSV keluaran per potongan. Memori puncak ditentukan oleh chunk_size, bukan oleh
+jumlah peserta.
+
+Total dijumlahkan per potongan, sehingga dapat berbeda dari value_portfolio hanya pada digit
+pembulatan float64 terakhir.
+'''
+import numpy as np
+import pandas as pd
+
+from danapensiun.commutation import commutation_table
+from danapensiun.mortality import DEFAULT_TABLE_ID
+from danapensiun.portfolio import calculate_portfolio_values, normalize_member_columns, validate_members
+from danapensiun.sensitivity import rate_jet_totals, rate_sensitivity_frame
+
+STREAM_CHUNK_SIZE = 100_000
+# Jumlah peserta ditolak yang disimpan utuh sebagai contoh; sisanya hanya dihitung per alasan
+REJECTED_SAMPLE_SIZE = 1_000
+
+
+def iter_member_chunks(source, chunk_size=STREAM_CHUNK_SIZE):
+    '''Membaca file peserta CSV per chunk_size baris; indeks baris berlanjut antar potongan.'''
+    name = getattr(source, 'name', str(source)).lower()
+    if name.endswith(('.xlsx', '.xls')):
+        raise ValueError("Pembacaan bertahap hanya untuk file CSV; simpan file XLSX sebagai CSV terlebih dahulu.")
+    with pd.read_csv(source, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield normalize_member_columns(chunk)
+
+
+def stream_portfolio(source, r_default, i, k, s, table_id=DEFAULT_TABLE_ID, chunk_size=STREAM_CHUNK_SIZE, output=None):
+    '''
+    Memvalidasi dan menilai file peserta CSV per potongan (i, k, s dalam desimal).
+    Jika output (file teks terbuka) diberikan, hasil per peserta ditulis ke sana sebagai CSV.
+
+    Mengembalikan (total dana, sensitivitas suku bunga total, contoh peserta ditolak beserta
+    alasannya, jumlah penolakan per alasan). Total sama bentuknya dengan value_portfolio;
+    sensitivitas None jika tidak ada peserta valid.
+    '''
+    comm_laki = commutation_table('Laki-Laki', i, table_id)
+    comm_perempuan = commutation_table('Perempuan', i, table_id)
+    totals = {}
+    jet_totals = None
+    rejected_samples = []
+    rejected_sampled = 0
+    rejected_counts = pd.Series(dtype=np.int64)
+    header = True
+
+    for chunk in iter_member_chunks(source, chunk_size):
+        df_valid, alasan = validate_members(chunk, r_default)
+        valid_mask = alasan == ''
+        if not valid_mask.all():
+            rejected_counts = rejected_counts.add(alasan[~valid_mask].value_counts(), fill_value=0)
+            if rejected_sampled < REJECTED_SAMPLE_SIZE:
+                sample = chunk[~valid_mask].assign(alasan=alasan[~valid_mask]).head(REJECTED_SAMPLE_SIZE - rejected_sampled)
+                rejected_samples.append(sample)
+                rejected_sampled += len(sample)
+
+        hasil, chunk_totals = calculate_portfolio_values(df_valid[valid_mask], comm_laki, comm_perempuan, i, k, s)
+        if hasil.empty:
+            continue
+        for kolom, nilai in chunk_totals.items():
+            totals[kolom] = totals.get(kolom, 0) + nilai
+        chunk_jets = rate_jet_totals(hasil, hasil['Manfaat Pensiun (Br)'], i, table_id)
+        jet_totals = chunk_jets if jet_totals is None else {m: jet_totals[m] + v for m, v in chunk_jets.items()}
+        if output is not None:
+            hasil.to_csv(output, index=False, header=header)
+            header = False
+
+    ditolak = pd.concat(rejected_samples) if rejected_samples else pd.DataFrame()
+    rate_sens = rate_sensitivity_frame(jet_totals) if jet_totals is not None else None
+    return totals, rate_sens, ditolak, rejected_counts.astype(np.int64).to_dict()
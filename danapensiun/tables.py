@@ -0,0 +1,40 @@
+'''
+Persiapan tabel untuk grid dashboard tanpa pandas Styler per sel.
+
+Format angka (mis. CURRENCY_FORMAT) diserahkan ke konfigurasi kolom grid, sehingga tidak ada
+string yang dibentuk di Python per sel. Kolom Decimal dikonversi ke float64 sekali per kolom,
+dan penanda baris dibentuk dari mask boolean tervektorisasi.
+'''
+import numpy as np
+import pandas as pd
+
+# Format printf untuk konfigurasi kolom grid (pemisah ribuan dengan ",")
+CURRENCY_FORMAT = 'Rp %,.2f'
+
+
+def display_numbers(df):
+    '''Salinan df dengan kolom Decimal (dtype object) sebagai float64 agar grid dapat memformatnya.'''
+    kolom_objek = [kolom for kolom in df.columns if df[kolom].dtype == object]
+    if not kolom_objek:
+        return df
+    df = df.copy()
+    for kolom in kolom_objek:
+        df[kolom] = _to_float(df[kolom])
+    return df
+
+
+def _to_float(series):
+    '''Decimal/angka ke float64; kolom teks dibiarkan apa adanya.'''
+    try:
+        return series.astype(np.float64)
+    except (TypeError, ValueError):
+        return series
+
+
+def highlight_styles(df, mask, css):
+    '''
+    Gaya untuk Styler.apply(..., axis=None): baris dengan mask True diberi css, sisanya kosong.
+    Dibentuk sekali dari mask, tanpa callback per baris.
+    '''
+    baris = np.where(np.asarray(mask, dtype=bool), css, '')
+    return pd.DataFrame(np.repeat(baris[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
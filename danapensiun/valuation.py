@@ -0,0 +1,450 @@
+'''Valuasi aktuaria satu peserta: metode EAN, AAN dan PUC berdasarkan tabel komutasi.'''
+import itertools
+import operator
+import sys
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from danapensiun.cache import memoize
+from danapensiun.commutation import commutation_matrix, decimal_commutation_table, rate_bp
+from danapensiun.mortality import DEFAULT_TABLE_ID
+from danapensiun.profiling import stage
+
+NA_COLUMNS = {
+    'ean': 'Iuran Normal (EAN)',
+    'aan': 'Iuran Normal (AAN)',
+    'puc': 'Iuran Normal (PUC)',
+}
+
+# 'float': NumPy float64 dari kubus komutasi, cepat dan tervektorisasi; 'decimal': referensi eksak,
+# tabel komutasi Decimal (decimal_commutation_table) dan aritmetika Decimal
+BACKENDS = ('float', 'decimal')
+
+# Kolom nilai df_actuarial_full (setelah 'Usia'), sekaligus urutan baris ActuarialSchedule.values
+VALUE_COLUMNS = (
+    'Iuran Normal (EAN)',
+    'Iuran Normal (AAN)',
+    'Iuran Normal (PUC)',
+    'Kewajiban Aktuaria (EAN)',
+    'Kewajiban Aktuaria (AAN)',
+    'Kewajiban Aktuaria (PUC)',
+    'PVFB',
+)
+
+# Metrik di usia valuasi x dan kolom VALUE_COLUMNS asalnya: cukup dibaca dari baris usia x
+AGE_METRIC_COLUMNS = {
+    'PVFB_x_now': 'PVFB',
+    'NC_ean_now': 'Iuran Normal (EAN)',
+    'AL_ean_now': 'Kewajiban Aktuaria (EAN)',
+    'AL_aan_now': 'Kewajiban Aktuaria (AAN)',
+    'NC_aan_x_now': 'Iuran Normal (AAN)',
+}
+
+
+class ActuarialSchedule:
+    '''
+    Hasil valuasi per usia e .. r-1 dalam satu blok array berbentuk (kolom, usia) beserta metriknya.
+
+    Backend float menyimpan satu blok float64 kontigu; backend decimal menyimpan Decimal eksak dalam
+    array objek (tidak dibulatkan ke sen, karena nilai per unit manfaat adalah pecahan rupiah).
+    Kolom dan DataFrame dari frame() adalah view atas blok yang sama, tanpa salinan.
+    '''
+    __slots__ = ('usia', 'values', 'metrics')
+
+    def __init__(self, usia, values, metrics):
+        self.usia = usia
+        self.values = values
+        self.metrics = metrics
+
+    @classmethod
+    def from_frame(cls, metrics, df_actuarial_full):
+        if df_actuarial_full.empty:
+            return cls(np.empty(0, dtype=np.int64), np.empty((len(VALUE_COLUMNS), 0)), metrics)
+        usia = df_actuarial_full['Usia'].to_numpy(dtype=np.int64)
+        values = np.ascontiguousarray(df_actuarial_full[list(VALUE_COLUMNS)].to_numpy().T)
+        return cls(usia, values, metrics)
+
+    def __len__(self):
+        return len(self.usia)
+
+    @property
+    def nbytes(self):
+        '''Perkiraan memori (dipakai lapisan cache), termasuk objek Decimal dan metrik.'''
+        total = self.usia.nbytes + self.values.nbytes + sys.getsizeof(self.metrics)
+        if self.values.dtype == object:
+            total += sum(sys.getsizeof(v) for v in self.values.flat)
+        return total + sum(sys.getsizeof(v) for v in self.metrics.values())
+
+    def column(self, name):
+        '''Nilai satu kolom untuk semua usia (view).'''
+        return self.values[VALUE_COLUMNS.index(name)]
+
+    def frame(self):
+        '''DataFrame dengan kolom Usia dan VALUE_COLUMNS; kolom nilai adalah view atas self.values.'''
+        df = pd.DataFrame(self.values.T, columns=list(VALUE_COLUMNS))
+        df.insert(0, 'Usia', self.usia)
+        return df
+
+    def at_age(self, x_now):
+        '''
+        Jadwal yang sama (blok nilai dibagi, tanpa salinan) dengan metrik AGE_METRIC_COLUMNS untuk
+        usia valuasi x_now, dibaca dari baris usianya. x_now harus di antara e dan r-1.
+        '''
+        j = int(x_now - self.usia[0])
+        if not 0 <= j < len(self.usia):
+            raise ValueError(f"Usia valuasi {x_now} di luar jadwal {self.usia[0]}-{self.usia[-1]}")
+        konversi = (lambda v: v) if self.values.dtype == object else float
+        # Urutan metrik sama dengan hasil calculate_unit_benefit_values: PVFB_e, metrik usia x, NA
+        metrics = {key: value for key, value in self.metrics.items() if key == 'PVFB_entry_AAN'}
+        metrics.update({key: konversi(self.column(kolom)[j]) for key, kolom in AGE_METRIC_COLUMNS.items()})
+        metrics.update(self.metrics)
+        return ActuarialSchedule(self.usia, self.values, metrics)
+
+    def scaled(self, B_r, Sr_minus_1=Decimal(0)):
+        '''
+        Mengalikan hasil per unit manfaat dengan B_r. Mengembalikan (metrics, df_actuarial_full).
+        Hasil backend float diskalakan dengan float(B_r); B_r dan S_{r-1} sendiri tetap Decimal.
+        '''
+        faktor = B_r if self.values.dtype == object else float(B_r)
+        metrics = {'Sr_minus_1': Sr_minus_1, 'B_r': B_r}
+        metrics.update({key: value * faktor for key, value in self.metrics.items()})
+        return metrics, ActuarialSchedule(self.usia, self.values * faktor, metrics).frame()
+
+
+def accumulate_final_values(df_actuarial_full, r, i):
+    '''
+    Nilai akhir (NA) iuran EAN, AAN dan PUC di usia pensiun: jumlah NC_x * (1+i)^(r-x).
+    Faktor akumulasi dibentuk sekali sebagai deret geometri (tanpa pangkat baru per baris),
+    lalu dikalikan dengan ketiga kolom iuran sekaligus (dot product). Juga mengembalikan suku
+    pertama, kedua dan terakhir yang ditampilkan di tab formula.
+    Kolom iuran float64 diakumulasi dengan float; kolom Decimal tetap dengan Decimal.
+    '''
+    if df_actuarial_full is None or df_actuarial_full.empty:
+        return _accumulate_final_values(None, None, r, i)
+    return _accumulate_final_values(
+        df_actuarial_full['Usia'].to_numpy(dtype=np.int64), df_actuarial_full[list(NA_COLUMNS.values())].to_numpy(), r, i)
+
+
+def _accumulate_final_values(usia, iuran, r, i):
+    '''accumulate_final_values untuk array: usia (n,) dan iuran (n, 3) berurutan seperti NA_COLUMNS.'''
+    metrics = {}
+    if usia is None or len(usia) == 0:
+        for metode in NA_COLUMNS:
+            for suffix in ('total', 'term_first', 'term_second', 'term_last'):
+                metrics[f'NA_{metode}_{suffix}'] = Decimal(0)
+        return metrics
+
+    # (1+i)^1, (1+i)^2, ..., (1+i)^(r-e) -> faktor untuk usia x adalah pangkat r-x
+    pangkat = r - usia
+    if iuran.dtype == object:
+        growth = Decimal(1) + i
+        faktor_per_pangkat = list(itertools.accumulate([growth] * int(pangkat.max()), operator.mul))
+        faktor = np.array([faktor_per_pangkat[p - 1] for p in pangkat], dtype=object)
+        zero = Decimal(0)
+    else:
+        faktor = (1.0 + float(i)) ** pangkat.astype(np.float64)
+        zero = 0.0
+    totals = faktor @ iuran
+    suku = iuran * faktor[:, None]
+
+    for j, metode in enumerate(NA_COLUMNS):
+        metrics[f'NA_{metode}_total'] = totals[j]
+        metrics[f'NA_{metode}_term_first'] = suku[0, j]
+        metrics[f'NA_{metode}_term_second'] = suku[1, j] if len(suku) > 1 else zero
+        metrics[f'NA_{metode}_term_last'] = suku[-1, j]
+    return metrics
+
+
+def calculate_unit_benefit_values(comm_table, x_entry, x_now, r, i):
+    '''
+    Menghitung nilai aktuaria dengan LOGIKA YANG BENAR untuk EAN (Basis Usia Masuk e),
+    untuk manfaat pensiun satu satuan (B_r = 1).
+    PVFB, NC, AL dan NA semuanya linear terhadap B_r, sehingga hasil untuk B_r sebenarnya
+    cukup didapat lewat scale_actuarial_values.
+    '''
+    if comm_table is None or comm_table.empty:
+         return {}, pd.DataFrame() 
+
+    # --- 1. Mapping Data Komutasi ---
+    D = comm_table.set_index('x')['Dx'].to_dict()
+    N = comm_table.set_index('x')['Nx'].to_dict()
+    
+    def get_D(x): return D.get(x, Decimal(0))
+    def get_N(x): return N.get(x, Decimal(0))
+    
+    metrics = {}
+    actuarial_data = []
+    
+    # --- 2. Parameter Kunci (e dan r) ---
+    D_entry = get_D(x_entry)  # De
+    N_entry = get_N(x_entry)  # Ne
+    D_r = get_D(r)            # Dr
+    N_r = get_N(r)            # Nr
+
+    # --- 3. Hitung PVFB Awal (PVFB_e) per unit manfaat ---
+    B_r = Decimal(1)
+
+    # PVFB_e = Br * (Dr / De)
+    if D_entry > 0:
+        PVFB_at_entry = B_r * (D_r / D_entry)
+    else:
+        PVFB_at_entry = Decimal(0)
+        
+    metrics['PVFB_entry_AAN'] = PVFB_at_entry 
+
+    # --- 4. HITUNG NC EAN (PERBAIKAN UTAMA: PAKAI De) ---
+    # Rumus Draf Eq (14): NC = PVFB_e * (De / (Ne - Nr))
+    # Pembagi (Anuitas di usia e) = (Ne - Nr) / De
+    
+    pembilang_annuitas = N_entry - N_r
+    
+    if D_entry > 0 and pembilang_annuitas != 0:
+        # Ini bentuk lain dari PVFB_e / a_ddot_e
+        # Sama dengan: PVFB_e * (De / (Ne - Nr))
+        NC_EAN_FIXED = PVFB_at_entry * (D_entry / pembilang_annuitas)
+    else:
+        NC_EAN_FIXED = Decimal(0)
+
+    # --- 5. LOOP PERHITUNGAN TAHUNAN ---
+
+    with stage('loop'):
+        for x_loop in range(x_entry, r):
+            D_x = get_D(x_loop)
+            N_x = get_N(x_loop)
+            # Variabel Dinamis Tahun Berjalan
+            if D_x > 0:
+                PVFB_x = B_r * (D_r / D_x)
+                anuitas_x_term = (N_x - N_r) / D_x # a_ddot_{x:r-x|}
+            else:
+                PVFB_x = Decimal(0)
+                anuitas_x_term = Decimal(0)
+
+            # ==========================================
+            # METODE EAN (Entry Age Normal)
+            # ==========================================
+            nc_ean_x = NC_EAN_FIXED 
+            al_ean_x = PVFB_x - (nc_ean_x * anuitas_x_term)
+
+            # ==========================================
+            # METODE AAN (Attained Age Normal)
+            # ==========================================
+            if anuitas_x_term > 0:
+                nc_aan_x = PVFB_at_entry / anuitas_x_term
+            else:
+                nc_aan_x = Decimal(0)
+            al_aan_x = PVFB_x - (nc_aan_x * anuitas_x_term)
+
+            # ==========================================
+            # METODE PUC (Projected Unit Credit)
+            # ==========================================
+            # PUC: NC = PVFB_x / (r-e)
+            # AL = ((x-e)/(r-e)) * PVFB_x
+            if r > x_entry:
+                accrual_fraction = Decimal(x_loop - x_entry) / Decimal(r - x_entry)
+                nc_puc_x = PVFB_x / Decimal(r - x_entry)
+                al_puc_x = accrual_fraction * PVFB_x
+            else:
+                accrual_fraction = Decimal(0)
+                nc_puc_x = Decimal(0)
+                al_puc_x = Decimal(0)
+
+            actuarial_data.append({
+                "Usia": x_loop,
+                "Iuran Normal (EAN)": nc_ean_x, 
+                "Iuran Normal (AAN)": nc_aan_x,
+                "Iuran Normal (PUC)": nc_puc_x,
+                "Kewajiban Aktuaria (EAN)": al_ean_x,
+                "Kewajiban Aktuaria (AAN)": al_aan_x,
+                "Kewajiban Aktuaria (PUC)": al_puc_x,
+                "PVFB": PVFB_x
+            })
+
+        df_actuarial_full = pd.DataFrame(actuarial_data)
+    
+    # --- 6. Output Dashboard (Usia Valuasi) ---
+    metrics['PVFB_x_now'] = B_r * (get_D(r) / get_D(x_now)) if get_D(x_now) > 0 else Decimal(0)
+    
+    try:
+        row_now = df_actuarial_full[df_actuarial_full['Usia'] == x_now]
+        if not row_now.empty:
+            metrics['NC_ean_now'] = row_now['Iuran Normal (EAN)'].values[0]
+            metrics['AL_ean_now'] = row_now['Kewajiban Aktuaria (EAN)'].values[0]
+            metrics['AL_aan_now'] = row_now['Kewajiban Aktuaria (AAN)'].values[0]
+            metrics['NC_aan_x_now'] = row_now['Iuran Normal (AAN)'].values[0]
+        else:
+            raise IndexError
+    except IndexError:
+        metrics['NC_ean_now'] = Decimal(0)
+        metrics['AL_ean_now'] = Decimal(0)
+        metrics['AL_aan_now'] = Decimal(0)
+        metrics['NC_aan_x_now'] = Decimal(0)
+
+    # --- 7. Nilai Akhir (Future Value) & Data Formula Visual ---
+    with stage('nilai_akhir'):
+        metrics.update(accumulate_final_values(df_actuarial_full, r, i))
+
+    return metrics, df_actuarial_full
+
+
+def calculate_unit_benefit_values_float(Dx, Nx, x_entry, x_now, r, i):
+    '''
+    Versi float64 dari calculate_unit_benefit_values: rumus yang sama, tetapi seluruh usia
+    e .. r-1 dihitung sekaligus dengan NumPy. Dx dan Nx adalah array float per usia.
+    Mengembalikan ActuarialSchedule; nilai ditulis langsung ke satu blok (kolom, usia).
+    '''
+    usia = np.arange(x_entry, r)
+    D_entry, N_entry = Dx[x_entry], Nx[x_entry]
+    D_r, N_r = Dx[r], Nx[r]
+    D_x, N_x = Dx[usia], Nx[usia]
+
+    PVFB_at_entry = D_r / D_entry if D_entry > 0 else 0.0
+    pembilang_annuitas = N_entry - N_r
+    NC_EAN_FIXED = PVFB_at_entry * (D_entry / pembilang_annuitas) if D_entry > 0 and pembilang_annuitas != 0 else 0.0
+
+    values = np.empty((len(VALUE_COLUMNS), len(usia)), dtype=np.float64)
+    nc_ean_x, nc_aan_x, nc_puc_x, al_ean_x, al_aan_x, al_puc_x, PVFB_x = values
+
+    with stage('loop'):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.copyto(PVFB_x, np.where(D_x > 0, D_r / D_x, 0.0))
+            anuitas_x_term = np.where(D_x > 0, (N_x - N_r) / D_x, 0.0)
+            np.copyto(nc_aan_x, np.where(anuitas_x_term > 0, PVFB_at_entry / anuitas_x_term, 0.0))
+        nc_ean_x.fill(NC_EAN_FIXED)
+        np.divide(PVFB_x, r - x_entry, out=nc_puc_x)
+        np.subtract(PVFB_x, nc_ean_x * anuitas_x_term, out=al_ean_x)
+        np.subtract(PVFB_x, nc_aan_x * anuitas_x_term, out=al_aan_x)
+        # Di usia masuk AL EAN dan AAN nol menurut definisi (PVFB = NC * anuitas): tulis 0 eksak
+        # alih-alih sisa pembatalan float64 (mis. -0.0 atau -1e-17)
+        al_ean_x[:1] = 0.0
+        al_aan_x[:1] = 0.0
+        np.multiply((usia - x_entry) / (r - x_entry), PVFB_x, out=al_puc_x)
+
+    metrics = {
+        'PVFB_entry_AAN': float(PVFB_at_entry),
+        'PVFB_x_now': float(D_r / Dx[x_now]) if Dx[x_now] > 0 else 0.0,
+    }
+    j = x_now - x_entry
+    if 0 <= j < len(usia):
+        metrics['NC_ean_now'] = float(nc_ean_x[j])
+        metrics['AL_ean_now'] = float(al_ean_x[j])
+        metrics['AL_aan_now'] = float(al_aan_x[j])
+        metrics['NC_aan_x_now'] = float(nc_aan_x[j])
+    else:
+        metrics.update(NC_ean_now=0.0, AL_ean_now=0.0, AL_aan_now=0.0, NC_aan_x_now=0.0)
+
+    with stage('nilai_akhir'):
+        # Tiga baris pertama blok adalah kolom iuran NA_COLUMNS (EAN, AAN, PUC)
+        metrics.update(_accumulate_final_values(usia, values[:len(NA_COLUMNS)].T, r, i))
+
+    return ActuarialSchedule(usia, values, metrics)
+
+
+def projected_benefit(x_entry, r, k, gaji_masuk, s):
+    '''Mengembalikan (B_r, S_{r-1}): manfaat pensiun tahunan dari gaji yang diproyeksikan.'''
+    # S_{r-1} = S_e * (1+s)^(r-e-1)
+    Sr_minus_1 = ((Decimal(1) + s)**(r - x_entry - 1)) * gaji_masuk
+    # B_r = k * (r - e) * S_{r-1}
+    B_r = k * Decimal(r - x_entry) * Sr_minus_1
+    return B_r, Sr_minus_1
+
+
+def scale_actuarial_values(unit_metrics, unit_df, B_r, Sr_minus_1=Decimal(0)):
+    '''Mengalikan hasil per unit manfaat dengan B_r. Mengembalikan (metrics, df_actuarial_full).'''
+    return ActuarialSchedule.from_frame(unit_metrics, unit_df).scaled(B_r, Sr_minus_1)
+
+
+def calculate_actuarial_values_excel_logic(comm_table, x_entry, x_now, r, i, k, gaji_masuk, s):
+    '''Nilai aktuaria untuk manfaat berbasis gaji: B_r = k * (r - e) * S_{r-1}.'''
+    B_r, Sr_minus_1 = projected_benefit(x_entry, r, k, gaji_masuk, s)
+    unit_metrics, unit_df = calculate_unit_benefit_values(comm_table, x_entry, x_now, r, i)
+    return scale_actuarial_values(unit_metrics, unit_df, B_r, Sr_minus_1)
+
+
+def _unit_schedule(jenis_kelamin, x_entry, x_now, r, i, backend, table_id):
+    '''Nilai per unit manfaat lengkap untuk satu x_now, tanpa cache.'''
+    if backend == 'float':
+        Dx, Nx = commutation_matrix(jenis_kelamin, (i,), table_id)
+        return calculate_unit_benefit_values_float(Dx[0], Nx[0], x_entry, x_now, r, i)
+    if backend != 'decimal':
+        raise ValueError(f"Backend tidak dikenal: {backend}")
+    return ActuarialSchedule.from_frame(*calculate_unit_benefit_values(decimal_commutation_table(jenis_kelamin, i, table_id), x_entry, x_now, r, i))
+
+
+def _base_schedule_key(jenis_kelamin, x_entry, r, i, backend='decimal', table_id=DEFAULT_TABLE_ID):
+    return (table_id, jenis_kelamin, rate_bp(i), x_entry, r, backend)
+
+
+@memoize(key=_base_schedule_key)
+def base_schedule(jenis_kelamin, x_entry, r, i, backend='decimal', table_id=DEFAULT_TABLE_ID):
+    '''
+    Jadwal per unit manfaat (B_r = 1) untuk usia e .. r-1 beserta metrik yang tidak bergantung
+    pada usia valuasi (PVFB_e, NA), di-cache per (tabel, gender, i dalam bp, e, r, backend).
+    Usia valuasi hanya memilih baris (ActuarialSchedule.at_age); gaji, k, s dan target manfaat
+    hanya menskalakan hasil (ActuarialSchedule.scaled), sehingga keduanya tidak termasuk kunci.
+    '''
+    hasil = _unit_schedule(jenis_kelamin, x_entry, x_entry, r, i, backend, table_id)
+    metrics = {key: value for key, value in hasil.metrics.items() if key not in AGE_METRIC_COLUMNS}
+    return ActuarialSchedule(hasil.usia, hasil.values, metrics)
+
+
+def unit_benefit_values(jenis_kelamin, x_entry, x_now, r, i, backend='decimal', table_id=DEFAULT_TABLE_ID):
+    '''
+    Nilai aktuaria per unit manfaat (B_r = 1) sebagai ActuarialSchedule. Untuk e <= x < r
+    hasilnya diturunkan dari base_schedule lewat pencarian baris, sehingga mengubah usia
+    valuasi tidak menghitung ulang jadwal; usia di luar rentang itu dihitung langsung.
+    '''
+    if x_entry <= x_now < r:
+        return base_schedule(jenis_kelamin, x_entry, r, i, backend, table_id).at_age(x_now)
+    return _unit_schedule(jenis_kelamin, x_entry, x_now, r, i, backend, table_id)
+
+
+def value_member(jenis_kelamin, x_entry, x_now, r, i, k, gaji_masuk, s, target_benefit=None, backend='decimal', table_id=DEFAULT_TABLE_ID):
+    '''
+    Valuasi satu peserta berdasarkan parameter sederhana (i, k, s dalam desimal).
+    Bagian mahal (per unit manfaat) di-cache lewat base_schedule.
+    Jika target_benefit diisi, B_r memakai target tersebut alih-alih dihitung dari gaji.
+    Mengembalikan (metrics, df_actuarial_full).
+    '''
+    if target_benefit is not None:
+        B_r, Sr_minus_1 = Decimal(target_benefit), Decimal(0)
+    else:
+        B_r, Sr_minus_1 = projected_benefit(x_entry, r, k, gaji_masuk, s)
+    return unit_benefit_values(jenis_kelamin, x_entry, x_now, r, i, backend, table_id).scaled(B_r, Sr_minus_1)
+
+
+def backend_difference(jenis_kelamin, x_entry, x_now, r, i, table_id=DEFAULT_TABLE_ID):
+    '''
+    Selisih relatif maksimum antara backend float dan decimal untuk seluruh nilai per unit
+    manfaat (tabel per usia dan metrik). Karena semua nilai linear terhadap B_r, batas ini juga
+    berlaku setelah diskalakan.
+
+    Tiap kolom tabel dibandingkan terhadap nilai absolut terbesarnya dan tiap metrik terhadap
+    nilainya sendiri. AL = PVFB - NC * anuitas hampir nol di usia masuk (pembatalan), sehingga
+    kolom dan metrik AL dibandingkan terhadap PVFB terbesar agar tidak menghasilkan rasio semu.
+
+    Referensinya adalah backend decimal yang dibangun dari tabel komutasi Decimal eksak, dan
+    selisihnya dihitung dalam Decimal (nilai float64 dikonversi tanpa pembulatan), sehingga
+    galat float64 di bawah presisi float pun tetap terukur.
+    '''
+    hasil_float = unit_benefit_values(jenis_kelamin, x_entry, x_now, r, i, 'float', table_id)
+    hasil_decimal = unit_benefit_values(jenis_kelamin, x_entry, x_now, r, i, 'decimal', table_id)
+    if len(hasil_decimal) == 0:
+        return 0.0
+    exact = hasil_decimal.values
+    skala_pvfb = float(np.abs(hasil_decimal.column('PVFB').astype(np.float64)).max())
+    skala = np.abs(exact.astype(np.float64)).max(axis=1)
+    is_al = np.array([col.startswith('Kewajiban Aktuaria') for col in VALUE_COLUMNS])
+    skala = np.where(is_al, np.maximum(skala, skala_pvfb), skala)
+    selisih = _decimal_error(hasil_float.values, exact).astype(np.float64) / np.where(skala > 0, skala, 1.0)[:, None]
+
+    metrik = []
+    for key, nilai in hasil_decimal.metrics.items():
+        skala_metrik = max(abs(float(nilai)), skala_pvfb) if key.startswith('AL_') else abs(float(nilai))
+        metrik.append(float(_decimal_error(hasil_float.metrics[key], nilai)) / (skala_metrik or 1.0))
+    return float(max(selisih.max(), max(metrik)))
+
+
+# |float - Decimal| dihitung dalam Decimal, elemen demi elemen, lalu dikembalikan sebagai float64
+_decimal_error = np.frompyfunc(lambda approx, exact: float(abs(Decimal(float(approx)) - Decimal(exact))), 2, 1)
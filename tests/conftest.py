@@ -0,0 +1,14 @@
+import pytest
+
+from danapensiun.portfolio import synthetic_members, validate_members
+
+
+@pytest.fixture
+def members():
+    return synthetic_members(2_000)
+
+
+@pytest.fixture
+def valid_members(members):
+    df_valid, alasan = validate_members(members.head(300), 65)
+    return df_valid[alasan == ''].reset_index(drop=True)
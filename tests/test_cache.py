@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from danapensiun import cache
+
+MiB = 2**20
+
+
+@pytest.fixture
+def limit():
+    _, total = cache.cache_stats()
+    yield cache.set_max_bytes
+    cache.set_max_bytes(total['max_bytes'])
+
+
+def test_lru_eviction_under_byte_limit(limit):
+    @cache.memoize
+    def block(n):
+        return np.zeros(MiB // 8)
+
+    limit(3 * MiB + 4096)
+    for n in range(3):
+        block(n)
+    block(0)  # 0 menjadi yang terakhir dipakai
+    block(3)  # membuang 1, entri yang paling lama tidak dipakai
+    info = block.cache_info()
+    assert info['entries'] == 3 and info['evictions'] == 1 and info['bytes'] == 3 * MiB
+    block(1)
+    block(0)
+    assert block.cache_info()['misses'] == 5 and block.cache_info()['hits'] == 2
+
+    # Hasil yang lebih besar dari batas tidak disimpan; menurunkan batas langsung membuang entri
+    limit(MiB // 2)
+    assert block.cache_info()['entries'] == 0
+    block(9)
+    assert block.cache_info()['entries'] == 0
+    block.cache_clear()
+
+
+def test_max_mb_environment_variable():
+    kode = (
+        "import numpy as np; from danapensiun import cache\n"
+        "blok = cache.memoize(lambda n: np.zeros(2**17))\n"
+        "[blok(n) for n in range(5)]\n"
+        "_, total = cache.cache_stats()\n"
+        "assert total['max_bytes'] == 2**21 and total['entries'] == 2, total\n"
+    )
+    env = {**os.environ, 'DANAPENSIUN_CACHE_MAX_MB': '2'}
+    subprocess.run([sys.executable, '-c', kode], check=True, env=env)
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    calls = []
+
+    @cache.memoize(ttl=60)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9 and square(3) == 9 and calls == [3]
+    now[0] += 61
+    assert square(3) == 9 and calls == [3, 3]
+    assert square.cache_info()['expired'] == 1 and square.cache_info()['entries'] == 1
+    square.cache_clear()
+
+
+def test_key_function_canonicalizes_arguments():
+    @cache.memoize(key=lambda i: round(float(i) * 10_000))
+    def rate(i):
+        return i
+
+    rate(0.04)
+    rate('0.0400')
+    assert rate.cache_info()['hits'] == 1
+    rate.cache_clear()
@@ -0,0 +1,28 @@
+import json
+import subprocess
+import sys
+from decimal import Decimal
+
+from danapensiun import cli, value_member
+
+
+def test_package_imports_without_streamlit():
+    kode = "import sys; sys.modules['streamlit'] = None; import danapensiun, danapensiun.cli"
+    subprocess.run([sys.executable, '-c', kode], check=True)
+
+
+def test_value_matches_api(tmp_path):
+    output = tmp_path / 'hasil.json'
+    cli.main(['value', '--entry-age', '30', '--valuation-age', '40', '--output', str(output)])
+    payload = json.loads(output.read_text())
+    metrics, df = value_member('Laki-Laki', 30, 40, 65, Decimal('0.04'), Decimal('0.025'), Decimal(36_000_000), Decimal('0.04'))
+    assert Decimal(payload['metrics']['AL_ean_now']) == metrics['AL_ean_now']
+    assert len(payload['per_usia']) == len(df)
+
+
+def test_portfolio_csv(tmp_path, members):
+    source = tmp_path / 'peserta.csv'
+    members.head(50).to_csv(source, index=False)
+    output = tmp_path / 'hasil.csv'
+    cli.main(['portfolio', '--members', str(source), '--output', str(output)])
+    assert len(output.read_text().splitlines()) == 51
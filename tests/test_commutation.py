@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from danapensiun import commutation, valuation
+from danapensiun.mortality import mortality_table
+
+
+def _loop_commutation(qx, i, l0=commutation.DEFAULT_L0):
+    '''Rekursi per usia seperti versi awal: lx[x] = lx[x-1] * px[x-1], Nx dijumlah mundur.'''
+    lx = [float(l0)]
+    for q in qx[:-1]:
+        lx.append(lx[-1] * (1.0 - q))
+    Dx = [l * (1.0 / (1.0 + i)) ** x for x, l in enumerate(lx)]
+    Nx = list(Dx)
+    for x in range(len(Nx) - 2, -1, -1):
+        Nx[x] += Nx[x + 1]
+    return np.array(lx), np.array(Dx), np.array(Nx)
+
+
+@pytest.mark.parametrize('i', [0.0, 0.04, 0.0725])
+def test_vectorized_matches_loop(i):
+    qx = mortality_table('Perempuan')['qx'].to_numpy()
+    _, lx, _, Dx, Nx = commutation.commutation_arrays(qx, i)
+    for vektor, loop in zip((lx, Dx, Nx), _loop_commutation(qx, i)):
+        np.testing.assert_allclose(vektor, loop, rtol=1e-13)
+
+
+def test_table_columns_are_numpy_backed():
+    df = commutation.build_commutation_table(mortality_table('Laki-Laki'), Decimal('0.04'))
+    assert df['lx'].dtype == np.float64
+    assert isinstance(df['Dx'].iloc[0], Decimal)
+    _, lx, _, Dx, _ = commutation.commutation_arrays(df['qx'].to_numpy(), 0.04)
+    assert (df['lx'].to_numpy() == lx).all()
+    assert (df['Dx'].to_numpy(dtype=np.float64) == Dx).all()
+
+
+def test_decimal_table_is_exact_and_close_to_float():
+    exact = commutation.decimal_commutation_table('Laki-Laki', Decimal('0.04'))
+    assert exact['lx'].iloc[1] == Decimal(100000) * (1 - Decimal('0.00979'))
+    assert abs(exact['Nx'].iloc[0] - sum(exact['Dx'])) < Decimal('1e-20')
+    approx = commutation.commutation_table('Laki-Laki', Decimal('0.04'))
+    np.testing.assert_allclose(approx['Nx'].to_numpy(dtype=np.float64), exact['Nx'].to_numpy(dtype=np.float64), rtol=1e-13)
+
+
+@pytest.mark.parametrize('args', [
+    ('Laki-Laki', 30, 40, 65, Decimal('0.04')),
+    ('Perempuan', 18, 59, 60, Decimal('0.15')),
+    ('Laki-Laki', 45, 45, 55, Decimal('0.0425')),
+])
+def test_float_backend_agrees_with_decimal(args):
+    assert valuation.backend_difference(*args) < 1e-13
+
+
+def test_cube_reload_and_fingerprint(tmp_path):
+    qx = [mortality_table(gender)['qx'].to_numpy() for gender in ('Laki-Laki', 'Perempuan')]
+    path = tmp_path / 'cube.npy'
+    assert commutation.load_commutation_cube(path, qx) is None
+    cube = commutation.load_or_build_commutation_cube(path, qx)
+    dimuat = commutation.load_commutation_cube(path, qx)
+    assert isinstance(dimuat, np.memmap)
+    np.testing.assert_array_equal(dimuat, cube)
+
+    # qx berubah: kubus lama ditolak lalu dibangun ulang
+    qx_baru = [qx[0] * 1.01, qx[1]]
+    assert commutation.load_commutation_cube(path, qx_baru) is None
+    baru = commutation.load_or_build_commutation_cube(path, qx_baru)
+    assert commutation.load_commutation_cube(path, qx_baru) is not None
+    assert not np.array_equal(baru[0], cube[0])
+
+
+def test_cube_slice_matches_computed_rates():
+    grid = [k / 1000 for k in range(0, commutation.CUBE_RATE_STEPS, 7)]
+    assert all(commutation.rate_index(rate) is not None for rate in grid)
+    assert commutation.rate_index(0.04005) is None and commutation.rate_index(0.151) is None
+    Dx, Nx = commutation.commutation_matrix('Perempuan', grid)
+    qx = mortality_table('Perempuan')['qx'].to_numpy()
+    for baris, rate in enumerate(grid):
+        _, _, _, D, N = commutation.commutation_arrays(qx, rate)
+        np.testing.assert_allclose(Dx[baris], D, rtol=1e-13)
+        np.testing.assert_allclose(Nx[baris], N, rtol=1e-13)
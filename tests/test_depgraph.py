@@ -0,0 +1,72 @@
+import pytest
+
+from danapensiun import cache, depgraph
+
+
+@pytest.fixture
+def graph():
+    graph = depgraph.DependencyGraph()
+    calls = []
+
+    @graph.node('a', 'b')
+    def total(a, b):
+        calls.append('total')
+        return a + b
+
+    @graph.node('total', 'c')
+    def scaled(total, c):
+        calls.append('scaled')
+        return [total * c]
+
+    graph.calls = calls
+    yield graph
+    depgraph._node_value.cache_clear()
+
+
+def test_transitive_inputs_and_dependents(graph):
+    assert graph.input_names('scaled') == ('a', 'b', 'c')
+    assert graph.dependents('c') == ['scaled']
+    assert graph.dependents('a') == ['total', 'scaled']
+
+
+def test_recomputes_only_affected_nodes(graph):
+    graph.set_inputs(a=1, b=2, c=10)
+    assert graph.get('scaled') == [30]
+    assert graph.computed == ['scaled', 'total']
+
+    graph.set_inputs(c=20)
+    assert graph.get('scaled') == [60]
+    assert graph.computed == ['scaled'] and graph.calls == ['total', 'scaled', 'scaled']
+
+    # Kembali ke input sebelumnya: hasil lama masih ada di cache bersama
+    graph.set_inputs(c=10)
+    assert graph.get('scaled') == [30] and graph.computed == []
+    assert [row['dihitung_ulang'] for row in graph.describe()] == [False, False]
+
+
+def test_node_values_live_in_bounded_shared_cache(graph):
+    graph.set_inputs(a=1, b=2, c=10)
+    graph.get('scaled')
+    assert depgraph._node_value.cache_info()['entries'] == 2
+
+    _, total = cache.cache_stats()
+    try:
+        cache.set_max_bytes(0)
+        assert depgraph._node_value.cache_info()['entries'] == 0
+    finally:
+        cache.set_max_bytes(total['max_bytes'])
+    graph.set_inputs()
+    graph.get('scaled')
+    assert graph.computed == ['scaled', 'total']
+
+
+def test_graphs_with_same_node_names_do_not_collide(graph):
+    other = depgraph.DependencyGraph()
+
+    @other.node('a', 'b')
+    def total(a, b):
+        return a * b
+
+    graph.set_inputs(a=3, b=4)
+    other.set_inputs(a=3, b=4)
+    assert graph.get('total') == 7 and other.get('total') == 12
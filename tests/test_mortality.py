@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from danapensiun import mortality
+
+
+def _write_table(directory, table_id, qx_laki, qx_perempuan, **meta):
+    ages = range(len(qx_laki))
+    lines = ['x,Laki-Laki,Perempuan', *(f'{x},{l},{p}' for x, l, p in zip(ages, qx_laki, qx_perempuan))]
+    (directory / f'{table_id}.csv').write_text('\n'.join(lines) + '\n')
+    (directory / f'{table_id}.json').write_text(json.dumps({'name': table_id, 'data': f'{table_id}.csv', **meta}))
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setenv(mortality.MORTALITY_PATH_ENV, str(tmp_path))
+    mortality.available_tables.cache_clear()
+    mortality.qx_matrix.cache_clear()
+    yield tmp_path
+    monkeypatch.delenv(mortality.MORTALITY_PATH_ENV)
+    mortality.available_tables.cache_clear()
+    mortality.qx_matrix.cache_clear()
+
+
+def test_registry_listing(registry):
+    _write_table(registry, 'X', [0.1, 0.2, 1.0], [0.05, 0.1, 1.0], version='2')
+    (registry / 'catatan.json').write_text('{"bukan": "manifest"}')
+    (registry / 'rusak.json').write_text('{')
+    assert mortality.table_ids() == ['TMI2023', 'X']
+    assert mortality.table_info('X')['manifest'] == registry / 'X.json'
+    assert mortality.table_label('X') == 'X (versi 2)'
+    with pytest.raises(ValueError):
+        mortality.table_info('Y')
+
+
+def test_env_directory_takes_priority(registry):
+    _write_table(registry, mortality.DEFAULT_TABLE_ID, [0.1, 1.0], [0.1, 1.0])
+    assert mortality.table_info(mortality.DEFAULT_TABLE_ID)['manifest'].parent == registry
+
+
+def test_compiled_table_is_memory_mapped(registry):
+    _write_table(registry, 'X', [0.1, 0.2, 1.5], [0.05, 0.1, 1.0])
+    qx = mortality.qx_matrix('X')
+    assert isinstance(qx, np.memmap)
+    np.testing.assert_array_equal(qx, [[0.1, 0.2, 1.0], [0.05, 0.1, 1.0]])
+
+
+def test_blend_manifest(registry):
+    _write_table(registry, 'X', [0.1, 0.2, 1.0], [0.05, 0.1, 1.0])
+    blend = {'table': 'X', 'weights': {'Laki-Laki': 0.6, 'Perempuan': 0.4}}
+    (registry / 'U.json').write_text(json.dumps({'name': 'Unisex', 'blend': blend}))
+    (registry / 'UU.json').write_text(json.dumps({'name': 'Unisex lagi', 'blend': {**blend, 'table': 'U'}}))
+    (registry / 'B.json').write_text(json.dumps({'name': 'Bobot salah', 'blend': {**blend, 'weights': {'Laki-Laki': 0.6}}}))
+    qx = mortality.qx_matrix('U')
+    np.testing.assert_allclose(qx, np.vstack([[0.08, 0.16, 1.0]] * 2))
+    with pytest.raises(ValueError, match='berbasis tabel dengan data CSV'):
+        mortality.qx_matrix('UU')
+    with pytest.raises(ValueError, match='berjumlah 1'):
+        mortality.qx_matrix('B')
+
+
+def test_invalid_ages_rejected(registry):
+    (registry / 'G.csv').write_text('x,Laki-Laki,Perempuan\n0,0.1,0.1\n2,1,1\n')
+    (registry / 'G.json').write_text(json.dumps({'name': 'G', 'data': 'G.csv'}))
+    with pytest.raises(ValueError, match='tanpa celah'):
+        mortality.qx_matrix('G')
+
+
+def test_recompile_removes_only_own_stale_files(registry):
+    _write_table(registry, 'X', [0.1, 0.2, 1.0], [0.05, 0.1, 1.0])
+    _write_table(registry, 'X.v2', [0.2, 0.3, 1.0], [0.1, 0.2, 1.0])
+    lama = mortality.compile_table('X')
+    v2 = mortality.compile_table('X.v2')
+
+    _write_table(registry, 'X', [0.15, 0.2, 1.0], [0.05, 0.1, 1.0])
+    baru = mortality.compile_table('X')
+    assert baru != lama and baru.exists() and not lama.exists()
+    assert v2.exists()
+    assert sorted(p.name for p in registry.glob('*.npy')) == sorted([baru.name, v2.name])
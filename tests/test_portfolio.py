@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from danapensiun import commutation, portfolio, valuation
+
+I, K, S = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+
+
+def test_portfolio_matches_single_member_valuation(members):
+    hasil, totals, ditolak = portfolio.value_portfolio(members.head(25), 65, I, K, S)
+    assert ditolak.empty and totals['Jumlah Peserta'] == 25
+    for _, baris in hasil.iterrows():
+        metrics, _ = valuation.value_member(
+            baris['jenis_kelamin'], int(baris['usia_masuk']), int(baris['usia_valuasi']), int(baris['usia_pensiun']),
+            I, K, Decimal(int(baris['gaji'])), S)
+        assert baris['Kewajiban Aktuaria (EAN)'] == pytest.approx(float(metrics['AL_ean_now']), rel=1e-12, abs=1e-6)
+        assert baris['Iuran Normal (AAN)'] == pytest.approx(float(metrics['NC_aan_x_now']), rel=1e-12)
+
+
+def test_validate_reasons():
+    df = pd.DataFrame({
+        'jenis_kelamin': ['L', 'P', 'x', 'L', 'L', 'L', 'L'],
+        'usia_masuk': [30, 30, 30, 10, 30, 30, 30],
+        'usia_valuasi': [40, 29, 40, 40, 40, 40, 40],
+        'usia_pensiun': [65, 65, 65, 65, 70, 65, 40],
+        'gaji': [5e6, 5e6, 5e6, 5e6, 5e6, 5e5, 5e6],
+    })
+    df_valid, alasan = portfolio.validate_members(df, 65)
+    assert alasan.tolist() == [
+        '', 'Usia valuasi tidak boleh lebih kecil dari usia masuk', 'Jenis kelamin tidak dikenali', 'Usia masuk harus 18-60',
+        'Usia pensiun harus 55-65', 'Gaji minimal Rp 1.000.000', 'Usia valuasi harus lebih kecil dari usia pensiun',
+    ]
+    assert df_valid['jenis_kelamin'].iloc[1] == 'Perempuan'
+
+
+def test_validate_rejects_fractional_ages(members):
+    members = members.head(4).astype({'usia_masuk': float, 'usia_valuasi': float, 'usia_pensiun': float})
+    members.loc[1, 'usia_masuk'] = 30.7
+    members.loc[2, 'usia_valuasi'] = members.loc[2, 'usia_masuk'] + 0.5
+    members.loc[3, 'usia_pensiun'] = 60.2
+    _, alasan = portfolio.validate_members(members, 65)
+    assert alasan.iloc[0] == ''
+    assert (alasan.iloc[1:] == 'Usia masuk, usia valuasi dan usia pensiun harus bilangan bulat').all()
+
+
+def test_parallel_matches_serial(members):
+    comm_laki = commutation.commutation_table('Laki-Laki', I)
+    comm_perempuan = commutation.commutation_table('Perempuan', I)
+    serial, total_serial = portfolio.calculate_portfolio_values(members, comm_laki, comm_perempuan, I, K, S)
+    paralel, total_paralel = portfolio.calculate_portfolio_values(
+        members, comm_laki, comm_perempuan, I, K, S, workers=3, min_chunk_size=500)
+    assert total_paralel == total_serial
+    pd.testing.assert_frame_equal(paralel, serial)
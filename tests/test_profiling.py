@@ -0,0 +1,38 @@
+from danapensiun import profiling
+
+
+def test_stage_without_profiler_is_noop():
+    with profiling.stage('kosong'):
+        pass
+
+
+def test_nested_stage_paths():
+    profiler = profiling.StageProfiler()
+    with profiler.activate():
+        with profiling.stage('valuasi'):
+            with profiling.stage('nilai_akhir'):
+                pass
+    df = profiler.to_frame()
+    assert df['stage'].tolist() == ['valuasi', 'valuasi/nilai_akhir']
+    assert df['depth'].tolist() == [0, 1]
+
+
+def test_fragment_rerun_gets_its_own_profiler():
+    log = []
+    rerun = profiling.StageProfiler()
+    with rerun.activate():
+        # Rerun penuh: tahap fragmen masuk ke profiler rerun
+        with profiling.fragment(log.extend):
+            with profiling.stage('tab'):
+                pass
+        assert [record['stage'] for record in rerun.records] == ['tab'] and log == []
+
+        # Rerun fragmen saja: profiler rerun sudah diekspor dan ditutup
+        log.extend(rerun.close())
+        with profiling.fragment(log.extend):
+            with profiling.stage('tab'):
+                pass
+    assert len(rerun.records) == 1
+    assert [record['stage'] for record in log] == ['tab', 'tab']
+    assert log[0]['run_id'] != log[1]['run_id']
+    assert profiling.to_jsonl(log).count('\n') == 2
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from danapensiun import portfolio, projection
+
+I, K, S = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+
+
+@pytest.mark.parametrize('policy', projection.ENTRANT_POLICIES)
+def test_ean_puc_assets_track_liability(valid_members, policy):
+    hasil = projection.project_fund(valid_members, I, K, S, years=25, entrant_policy=policy, new_entrants=12)
+    for metode in ('EAN', 'PUC'):
+        np.testing.assert_allclose(hasil[f'Aset ({metode})'], hasil[f'Kewajiban Aktuaria ({metode})'], rtol=1e-9)
+    # Pada AAN iuran normal berubah menurut usia sehingga aset menyimpang dari AL
+    assert not np.allclose(hasil['Aset (AAN)'], hasil['Kewajiban Aktuaria (AAN)'], rtol=1e-9)
+
+
+def test_first_year_matches_portfolio_valuation(valid_members):
+    hasil = projection.project_fund(valid_members, I, K, S, years=1)
+    _, totals, _ = portfolio.value_portfolio(valid_members, 65, I, K, S)
+    for metode in projection.PROJECTION_METHODS:
+        assert hasil[f'Kewajiban Aktuaria ({metode})'].iloc[0] == pytest.approx(totals[f'Kewajiban Aktuaria ({metode})'], rel=1e-12)
+        assert hasil[f'Iuran Normal ({metode})'].iloc[0] == pytest.approx(totals[f'Iuran Normal ({metode})'], rel=1e-12)
+
+
+def test_entrant_policies(valid_members):
+    jumlah = len(valid_members)
+    ganti = projection.project_fund(valid_members, I, K, S, years=15, entrant_policy='ganti')
+    assert ganti['Peserta Aktif'].to_numpy() == pytest.approx(jumlah, rel=1e-12)
+
+    tetap = projection.project_fund(valid_members, I, K, S, years=15, entrant_policy='tetap', new_entrants=12)
+    assert tetap['Peserta Baru'].tolist() == [0.0] + [12.0] * 14
+
+    tertutup = projection.project_fund(valid_members, I, K, S, years=15, entrant_policy='tertutup')
+    assert (tertutup['Peserta Baru'] == 0).all()
+    assert (np.diff(tertutup['Peserta Aktif']) < 0).all()
+
+    with pytest.raises(ValueError):
+        projection.project_fund(valid_members, I, K, S, entrant_policy='lain')
+
+
+def test_initial_assets_and_asset_return(valid_members):
+    hasil = projection.project_fund(valid_members, I, K, S, years=3, initial_assets=1e9, asset_return=0.06)
+    assert hasil['Aset (EAN)'].iloc[0] == 1e9
+    aset_1 = (1e9 + hasil['Iuran Normal (EAN)'].iloc[0]) * 1.06 - hasil['Manfaat Dibayar'].iloc[1]
+    assert hasil['Aset (EAN)'].iloc[1] == pytest.approx(aset_1, rel=1e-12)
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from danapensiun import portfolio, rollforward
+
+I, K, S = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+
+
+def _snapshots():
+    peserta = portfolio.synthetic_members(1_000, seed=1).astype({'gaji': float})
+    df_awal, _ = portfolio.validate_members(peserta.assign(id_peserta=range(len(peserta))), 65)
+    # Setahun kemudian: sebagian keluar (meninggal atau pensiun), gaji naik, ada peserta baru
+    rng = np.random.default_rng(2)
+    lanjut = df_awal[(df_awal['usia_valuasi'] + 1 < df_awal['usia_pensiun']) & (rng.random(len(df_awal)) > 0.05)].copy()
+    lanjut['usia_valuasi'] += 1
+    lanjut['gaji'] *= 1.06
+    baru = portfolio.synthetic_members(50, seed=3).astype({'gaji': float}).assign(id_peserta=lambda df: df.index + 10_000)
+    baru['usia_valuasi'] = baru['usia_masuk']
+    df_akhir, _ = portfolio.validate_members(pd.concat([lanjut, baru], ignore_index=True), 65)
+    return df_awal, df_akhir
+
+
+@pytest.mark.parametrize('i_akhir', [None, Decimal('0.035')])
+def test_attribution_identity(i_akhir):
+    df_awal, df_akhir = _snapshots()
+    ringkasan, _ = rollforward.roll_forward(df_awal, df_akhir, I, K, S, i_akhir)
+    for metode in rollforward.ROLLFORWARD_METHODS:
+        kolom = ringkasan[metode]
+        diharapkan = kolom['AL Awal'] + kolom['Iuran Normal'] + kolom['Bunga'] + kolom['Manfaat Dibayar'] + kolom['Penyesuaian Metode']
+        assert kolom['AL Diharapkan'] == pytest.approx(diharapkan, rel=1e-12)
+        akhir = kolom[['AL Diharapkan', 'Mortalitas', 'Gaji', 'Data Lainnya', 'Peserta Baru', 'Perubahan Suku Bunga']].sum()
+        assert kolom['AL Akhir'] == pytest.approx(akhir, rel=1e-10)
+
+
+def test_al_akhir_matches_portfolio_valuation():
+    df_awal, df_akhir = _snapshots()
+    ringkasan, _ = rollforward.roll_forward(df_awal, df_akhir, I, K, S)
+    _, totals, _ = portfolio.value_portfolio(df_akhir, 65, I, K, S)
+    for metode in rollforward.ROLLFORWARD_METHODS:
+        assert ringkasan.loc['AL Akhir', metode] == pytest.approx(totals[f'Kewajiban Aktuaria ({metode})'], rel=1e-12)
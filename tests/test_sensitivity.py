@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from danapensiun import portfolio, sensitivity, valuation
+
+RATES = (0.0, 0.035, 0.04, 0.1)
+SALARY_INCREASES = (0.0, 0.04, 0.08)
+K, S = Decimal('0.025'), Decimal('0.04')
+
+
+def test_grid_matches_single_member_valuation():
+    grid = sensitivity.sensitivity_grid('Laki-Laki', 30, 40, 65, 0.025, 36_000_000, RATES, SALARY_INCREASES)
+    for a, i in enumerate(RATES):
+        for b, s in enumerate(SALARY_INCREASES):
+            _, df = valuation.value_member(
+                'Laki-Laki', 30, 40, 65, Decimal(str(i)), Decimal('0.025'), Decimal(36_000_000), Decimal(str(s)), backend='float')
+            baris = df[df['Usia'] == 40].iloc[0]
+            for metric in sensitivity.SENSITIVITY_METRICS:
+                assert grid[metric][a, b] == pytest.approx(float(baris[metric]), rel=1e-12), (metric, i, s)
+
+
+def test_grid_target_benefit_ignores_salary_growth():
+    grid = sensitivity.sensitivity_grid('Perempuan', 25, 50, 60, 0.025, 36_000_000, RATES, SALARY_INCREASES, target_benefit=100_000_000)
+    for values in grid.values():
+        assert values.shape == (len(RATES), len(SALARY_INCREASES))
+        np.testing.assert_array_equal(values, values[:, :1].repeat(len(SALARY_INCREASES), axis=1))
+
+
+def test_grid_to_frame_long_format():
+    grid = sensitivity.sensitivity_grid('Laki-Laki', 30, 40, 65, 0.025, 36_000_000, RATES, SALARY_INCREASES)
+    df = sensitivity.grid_to_frame(grid, RATES, SALARY_INCREASES)
+    assert len(df) == len(RATES) * len(SALARY_INCREASES)
+    baris = df[(df['Suku Bunga (i) %'] == 3.5) & (df['Kenaikan Gaji (s) %'] == 8.0)].iloc[0]
+    assert baris['PVFB'] == grid['PVFB'][1, 2]
+
+
+@pytest.mark.parametrize('i', ['0.04', '0.0725'])
+def test_rate_sensitivities_match_finite_differences(members, i):
+    i, h = Decimal(i), Decimal('0.00001')
+    hasil, totals, _ = portfolio.value_portfolio(members.head(300), 65, i, K, S)
+    _, naik, _ = portfolio.value_portfolio(members.head(300), 65, i + h, K, S)
+    _, turun, _ = portfolio.value_portfolio(members.head(300), 65, i - h, K, S)
+    df = sensitivity.rate_sensitivities(hasil, hasil['Manfaat Pensiun (Br)'], i)
+    h = float(h)
+    for metric in sensitivity.SENSITIVITY_METRICS:
+        nilai = totals[metric]
+        d1 = (naik[metric] - turun[metric]) / (2 * h)
+        d2 = (naik[metric] - 2 * nilai + turun[metric]) / h**2
+        assert df.loc[metric, 'Nilai'] == pytest.approx(nilai, rel=1e-12)
+        assert df.loc[metric, 'Durasi Modifikasi'] == pytest.approx(-d1 / nilai, rel=1e-6), metric
+        assert df.loc[metric, 'Konveksitas'] == pytest.approx(d2 / nilai, rel=1e-4), metric
+        assert df.loc[metric, 'PV01'] == pytest.approx(-d1 * 1e-4, rel=1e-6), metric
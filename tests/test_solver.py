@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+import pytest
+
+from danapensiun import portfolio, solver
+
+I, K, S = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+
+
+def _total(df_members, i, k, kolom):
+    _, totals, _ = portfolio.value_portfolio(df_members, 65, i, k, S)
+    return totals[kolom]
+
+
+@pytest.mark.parametrize('method', ['EAN', 'AAN', 'PUC'])
+def test_solve_k_round_trip(valid_members, method):
+    kolom = solver.goal_column('al', method)
+    target = 1.2 * _total(valid_members, I, K, kolom)
+    hasil = solver.solve(valid_members, I, K, S, 'k', 'al', target, method)
+    assert hasil['nilai'] == pytest.approx(1.2 * float(K), rel=1e-12)
+    assert _total(valid_members, I, Decimal(str(hasil['nilai'])), kolom) == pytest.approx(target, rel=1e-9)
+
+
+def test_solve_rate_round_trip(valid_members):
+    kolom = solver.goal_column('nc', 'EAN')
+    target = _total(valid_members, Decimal('0.0625'), K, kolom)
+    hasil = solver.solve(valid_members, I, K, S, 'i', 'nc', target, 'EAN')
+    assert hasil['nilai'] == pytest.approx(0.0625, abs=1e-9)
+    assert hasil['hasil'] == pytest.approx(target, rel=1e-9)
+
+
+def test_solve_member_round_trip():
+    hasil = solver.solve_member('Perempuan', 30, 42, 60, I, K, Decimal('6000000'), S, 'gaji', 'nc', 2_000_000, 'AAN')
+    ulang = solver.solve_member('Perempuan', 30, 42, 60, I, K, Decimal(str(hasil['nilai'])), S, 'gaji', 'nc', 2_000_000, 'AAN')
+    assert hasil['hasil'] == pytest.approx(2_000_000, rel=1e-12)
+    assert ulang['nilai'] == pytest.approx(hasil['nilai'], rel=1e-12)
+
+
+def test_solve_target_benefit_fixes_br(valid_members):
+    with pytest.raises(ValueError):
+        solver.solve(valid_members, I, K, S, 'k', 'al', 1e9, target_benefit=1e8)
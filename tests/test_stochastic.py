@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from danapensiun import portfolio, stochastic
+
+I, K, S = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+
+
+@pytest.fixture
+def weights(members):
+    hasil, _, _ = portfolio.value_portfolio(members.head(200), 65, I, K, S)
+    return hasil, stochastic.liability_weights(hasil, I)
+
+
+def test_zero_volatility_matches_deterministic(weights):
+    hasil, W = weights
+    params = {'a': 0.1, 'b': float(I), 'sigma': 0.0, 'r0': float(I)}
+    for model in ('vasicek', 'cir'):
+        values = stochastic.simulate(W, model, params, n_paths=8, workers=1, seed=1)
+        np.testing.assert_allclose(values, np.broadcast_to(stochastic.deterministic_values(W, I), values.shape), rtol=1e-12)
+    deterministik = stochastic.deterministic_values(W, I)
+    for j, metode in enumerate(('EAN', 'AAN', 'PUC'), start=1):
+        assert deterministik[j] == pytest.approx(hasil[f'Kewajiban Aktuaria ({metode})'].sum(), rel=1e-9)
+
+
+def test_result_independent_of_workers(weights):
+    _, W = weights
+    params = {'a': 0.1, 'b': 0.05, 'sigma': 0.01, 'r0': 0.04}
+    serial = stochastic.simulate(W, 'vasicek', params, n_paths=3_000, chunk_size=1_000, workers=1, seed=7)
+    paralel = stochastic.simulate(W, 'vasicek', params, n_paths=3_000, chunk_size=1_000, workers=3, seed=7)
+    np.testing.assert_array_equal(serial, paralel)
+
+
+def test_summarize_tail_metrics():
+    values = np.tile(np.arange(1, 1001, dtype=np.float64)[:, None], (1, len(stochastic.STOCHASTIC_METRICS)))
+    ringkasan = stochastic.summarize(values)
+    assert ringkasan['Rata-rata'].tolist() == [500.5] * 4
+    assert (ringkasan['CTE 99.5%'] > ringkasan['P99.5']).all()
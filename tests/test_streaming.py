@@ -0,0 +1,36 @@
+import io
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from danapensiun import portfolio, sensitivity, streaming
+
+I, K, S = Decimal('0.04'), Decimal('0.025'), Decimal('0.04')
+
+
+def test_streaming_matches_in_memory(members):
+    members = members.astype({'usia_valuasi': float})
+    members.loc[::97, 'usia_masuk'] = 10
+    members.loc[::89, 'usia_valuasi'] = 40.5
+    hasil, totals, ditolak = portfolio.value_portfolio(members, 65, I, K, S)
+    output = io.StringIO()
+    stream_totals, rate_sens, _, rejected_counts = streaming.stream_portfolio(
+        io.StringIO(members.to_csv(index=False)), 65, I, K, S, chunk_size=300, output=output)
+    assert stream_totals.keys() == totals.keys()
+    for kolom, nilai in totals.items():
+        assert stream_totals[kolom] == pytest.approx(nilai, rel=1e-12), kolom
+    assert sum(rejected_counts.values()) == len(ditolak)
+
+    expected = sensitivity.rate_sensitivities(hasil, hasil['Manfaat Pensiun (Br)'], I)
+    pd.testing.assert_frame_equal(rate_sens, expected, rtol=1e-12)
+    output.seek(0)
+    assert len(pd.read_csv(output)) == len(hasil)
+
+
+def test_streaming_without_valid_members(members):
+    members = members.head(10).assign(usia_masuk=10)
+    totals, rate_sens, ditolak, rejected_counts = streaming.stream_portfolio(
+        io.StringIO(members.to_csv(index=False)), 65, I, K, S, chunk_size=4)
+    assert totals == {} and rate_sens is None
+    assert rejected_counts == {'Usia masuk harus 18-60': 10} and len(ditolak) == 10
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+import pytest
+
+from danapensiun import valuation
+
+I = Decimal('0.04')
+
+# Nilai dari perhitungan Decimal versi awal danapensiun-app.py (build_commutation_table dan
+# calculate_actuarial_values_excel_logic), 15 digit signifikan
+BASELINE = [
+    (('Laki-Laki', 30, 40, 65, '0.04', '0.025', '5000000', '0.04'), {
+        'B_r': 16600133.9900743, 'PVFB_x_now': 4850948.1752682,
+        'NC_ean_now': 173478.715163094, 'AL_ean_now': 2191655.57124226,
+        'AL_aan_now': 1633851.20728517, 'NC_aan_x_now': 209867.032953001,
+        'NA_ean_total': 13288177.0702725, 'NA_aan_total': 26045236.6915805,
+    }),
+    (('Perempuan', 25, 25, 60, '0.0725', '0.02', '3000000', '0.05'), {
+        'B_r': 11032030.7351845, 'PVFB_x_now': 827350.512604602,
+        'NC_ean_now': 62372.1249323664, 'AL_ean_now': 0.0,
+        'AL_aan_now': 0.0, 'NC_aan_x_now': 62372.1249323664,
+        'NA_ean_total': 9766772.80664561, 'NA_aan_total': 13527175.4725699,
+    }),
+    (('Laki-Laki', 45, 64, 65, '0.1', '0.03', '12000000', '0'), {
+        'B_r': 7200000, 'PVFB_x_now': 6401716.36363636,
+        'NC_ean_now': 94834.133246803, 'AL_ean_now': 6306882.23038956,
+        'AL_aan_now': 5554462.63126947, 'NC_aan_x_now': 847253.73236689,
+        'NA_ean_total': 5974787.42701941, 'NA_aan_total': 8999348.10431097,
+    }),
+]
+
+
+def _loop_final_values(df, r, i):
+    '''Akumulasi per baris seperti versi awal: NA = sum NC_x * (1+i)^(r-x).'''
+    totals = {}
+    for metode, kolom in valuation.NA_COLUMNS.items():
+        totals[metode] = sum(nc * (1 + i) ** (r - x) for x, nc in zip(df['Usia'], df[kolom]))
+    return totals
+
+
+@pytest.mark.parametrize('backend', valuation.BACKENDS)
+def test_accumulation_matches_row_loop(backend):
+    _, df = valuation.value_member('Perempuan', 25, 40, 60, I, Decimal('0.025'), Decimal(48_000_000), Decimal('0.05'), backend=backend)
+    metrics = valuation.accumulate_final_values(df, 60, I)
+    rate = I if backend == 'decimal' else float(I)
+    for metode, total in _loop_final_values(df, 60, rate).items():
+        assert metrics[f'NA_{metode}_total'] == pytest.approx(total, rel=1e-12)
+    kolom = valuation.NA_COLUMNS['ean']
+    assert metrics['NA_ean_term_first'] == df[kolom].iloc[0] * (1 + rate) ** 35
+    assert metrics['NA_ean_term_last'] == pytest.approx(df[kolom].iloc[-1] * (1 + rate), rel=1e-15)
+
+
+def test_accumulation_single_row_and_empty():
+    _, df = valuation.value_member('Laki-Laki', 30, 64, 65, I, Decimal('0.025'), Decimal(36_000_000), Decimal('0.04'))
+    metrics = valuation.accumulate_final_values(df.tail(1), 65, I)
+    assert metrics['NA_aan_term_second'] == 0
+    assert metrics['NA_aan_total'] == metrics['NA_aan_term_last']
+    assert all(nilai == 0 for nilai in valuation.accumulate_final_values(None, 65, I).values())
+
+
+@pytest.mark.parametrize('backend', valuation.BACKENDS)
+@pytest.mark.parametrize('params, expected', BASELINE)
+def test_value_member_matches_baseline(params, expected, backend):
+    gender, e, x, r, i, k, gaji, s = params
+    metrics, _ = valuation.value_member(gender, e, x, r, Decimal(i), Decimal(k), Decimal(gaji), Decimal(s), backend=backend)
+    for key, nilai in expected.items():
+        assert float(metrics[key]) == pytest.approx(nilai, rel=1e-12, abs=1e-6), key
+
+
+def test_decimal_backend_is_exact_reference():
+    metrics, _ = valuation.value_member('Laki-Laki', 30, 40, 65, Decimal('0.04'), Decimal('0.025'), Decimal('5000000'), Decimal('0.04'))
+    assert all(isinstance(nilai, Decimal) for nilai in metrics.values())
+    assert valuation.backend_difference('Laki-Laki', 30, 40, 65, Decimal('0.04')) < 1e-13
+
+
+def test_float_backend_al_at_entry_age_is_zero():
+    metrics, df = valuation.value_member('Perempuan', 25, 25, 60, Decimal('0.0725'), Decimal('0.02'), Decimal('3000000'), Decimal('0.05'), backend='float')
+    assert metrics['AL_ean_now'] == 0.0 and metrics['AL_aan_now'] == 0.0
+    assert str(metrics['AL_ean_now']) == '0.0'
+    assert df['Kewajiban Aktuaria (EAN)'].iloc[0] == 0.0